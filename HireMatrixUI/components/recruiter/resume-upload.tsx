@@ -19,17 +19,24 @@ function getErrorMessage(error: unknown): string {
   return error instanceof Error ? error.message : "Failed to upload resume. Please try again.";
 }
 
+type UploadResponse = {
+  job_id: string | null;
+  files: { filename: string; item_index: number; status_url: string }[];
+  duplicates: { filename: string; sha256: string; job_id: string | null; item_index: number | null }[];
+  rejected: { filename: string; error: string }[];
+};
+
 export default function ResumeUpload() {
-  const [file, setFile] = useState<File | null>(null);
+  const [files, setFiles] = useState<File[]>([]);
 
   const uploadMutation = useMutation({
-    mutationFn: async () => {
-      if (!file) throw new Error("No file selected");
+    mutationFn: async (): Promise<UploadResponse> => {
+      if (files.length === 0) throw new Error("No file selected");
 
       const formData = new FormData();
-      formData.append("file", file);
+      files.forEach((file) => formData.append("files", file));
 
-      const response = await talentAPI.post("/upload-resume/", formData, {
+      const response = await talentAPI.post<UploadResponse>("/upload-resumes/", formData, {
         maxContentLength: Infinity,
         maxBodyLength: Infinity,
       });
@@ -37,7 +44,7 @@ export default function ResumeUpload() {
       return response.data;
     },
     onSuccess: () => {
-      setFile(null);
+      setFiles([]);
       const fileInput = document.getElementById("resume-file") as HTMLInputElement;
       if (fileInput) fileInput.value = "";
     },
@@ -46,27 +53,45 @@ export default function ResumeUpload() {
   return (
     <div className="space-y-4">
       <div className="space-y-2">
-        <Label htmlFor="resume-file">Select Resume File</Label>
+        <Label htmlFor="resume-file">Select Resume Files</Label>
         <Input
           id="resume-file"
           type="file"
-          accept=".pdf,.doc,.docx"
-          onChange={(e) => setFile(e.target.files?.[0] || null)}
+          multiple
+          accept=".pdf,.docx"
+          onChange={(e) => setFiles(Array.from(e.target.files ?? []))}
         />
       </div>
 
       <Button
         onClick={() => uploadMutation.mutate()}
-        disabled={uploadMutation.isPending || !file}
+        disabled={uploadMutation.isPending || files.length === 0}
         className="w-full"
       >
         <FileUp className="mr-2 h-4 w-4" />
-        {uploadMutation.isPending ? "Uploading..." : "Upload Resume"}
+        {uploadMutation.isPending
+          ? "Uploading..."
+          : files.length > 1
+            ? `Upload ${files.length} Resumes`
+            : "Upload Resume"}
       </Button>
 
-      {uploadMutation.isSuccess && (
+      {uploadMutation.isSuccess && uploadMutation.data.job_id && (
         <p className="text-sm text-green-600">
-          Resume uploaded successfully and indexed in vector database.
+          {uploadMutation.data.files.length} resume(s) queued for indexing (job{" "}
+          {uploadMutation.data.job_id.slice(0, 8)}).
+        </p>
+      )}
+
+      {uploadMutation.isSuccess && uploadMutation.data.duplicates.length > 0 && (
+        <p className="text-sm text-muted-foreground">
+          Already uploaded: {uploadMutation.data.duplicates.map((d) => d.filename).join(", ")}
+        </p>
+      )}
+
+      {uploadMutation.isSuccess && uploadMutation.data.rejected.length > 0 && (
+        <p className="text-sm text-destructive">
+          Skipped: {uploadMutation.data.rejected.map((r) => `${r.filename} (${r.error})`).join(", ")}
         </p>
       )}
 
@@ -1,7 +1,4 @@
-from openai import OpenAI
-from app.core.config import settings
-
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+from app.core import llm_gateway
 
 
 def evaluator_node(state: dict) -> dict:
@@ -20,7 +17,7 @@ Technical Score: <0-100>
 Communication Score: <0-100>
 Confidence Score: <0-100>"""
 
-    response = client.chat.completions.create(
+    response = llm_gateway.complete(
         model="gpt-4o-mini",
         messages=[{"role": "user", "content": prompt}],
     )
@@ -1,7 +1,4 @@
-from openai import OpenAI
-from app.core.config import settings
-
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+from app.core import llm_gateway
 
 
 def interviewer_node(state: dict) -> dict:
@@ -21,7 +18,7 @@ So far:
 
 Ask exactly ONE follow-up technical or behavioral question. Do not repeat previous questions. Output only the question, no preamble."""
 
-    response = client.chat.completions.create(
+    response = llm_gateway.complete(
         model="gpt-4o-mini",
         messages=[{"role": "user", "content": prompt}],
     )
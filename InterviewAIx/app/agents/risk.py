@@ -1,7 +1,4 @@
-from openai import OpenAI
-from app.core.config import settings
-
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+from app.core import llm_gateway
 
 
 def risk_node(state: dict) -> dict:
@@ -13,7 +10,7 @@ def risk_node(state: dict) -> dict:
 
 Reply with exactly one word: Low, Medium, or High (hiring risk)."""
 
-    response = client.chat.completions.create(
+    response = llm_gateway.complete(
         model="gpt-4o-mini",
         messages=[{"role": "user", "content": prompt}],
     )
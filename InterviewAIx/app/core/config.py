@@ -6,5 +6,14 @@ load_dotenv()
 class Settings:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     DATABASE_URL = os.getenv("DATABASE_URL")
+    OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 60))
+
+    # Shared OpenAI gateway (app/core/llm_gateway.py); 0 RPM/TPM follows the API's headers only
+    LLM_RPM = int(os.getenv("LLM_RPM", 0))
+    LLM_TPM = int(os.getenv("LLM_TPM", 0))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+    LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", 0.5))
+    LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", 30))
 
 settings = Settings()
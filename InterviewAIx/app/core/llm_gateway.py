@@ -0,0 +1,289 @@
+"""
+Shared OpenAI gateway for the interview agents.
+
+- One pooled client (keep-alive connections, LLM_MAX_CONCURRENCY requests
+  in flight), plus one async client per event loop.
+- Requests and tokens per minute are paced by token buckets that start
+  from LLM_RPM / LLM_TPM (0: no limit until the API reports one) and
+  follow the `x-ratelimit-*` response headers; a 429 pauses every caller
+  until its `retry-after` has passed.
+- With coalesce=True, identical requests already in flight share one
+  response. Off by default: the agents' prompts are sampled, so repeated
+  calls should get independent replies.
+- Rate limits, timeouts, connection errors and 5xx are retried up to
+  LLM_MAX_RETRIES times with full-jitter exponential backoff. The SDK's
+  own retries are off.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+import httpx
+import openai
+from openai import OpenAI, AsyncOpenAI
+from app.core.config import settings
+
+_RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_MAX_CONCURRENCY,
+        max_keepalive_connections=settings.LLM_MAX_CONCURRENCY,
+    )
+
+
+client = OpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    timeout=settings.OPENAI_TIMEOUT,
+    max_retries=0,
+    http_client=httpx.Client(limits=_limits(), timeout=settings.OPENAI_TIMEOUT),
+)
+_slots = threading.BoundedSemaphore(settings.LLM_MAX_CONCURRENCY)
+_async_clients = weakref.WeakKeyDictionary()
+_async_lock = threading.Lock()
+
+
+def _async_state():
+    loop = asyncio.get_running_loop()
+    with _async_lock:
+        if loop not in _async_clients:
+            _async_clients[loop] = (
+                AsyncOpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    timeout=settings.OPENAI_TIMEOUT,
+                    max_retries=0,
+                    http_client=httpx.AsyncClient(limits=_limits(), timeout=settings.OPENAI_TIMEOUT),
+                ),
+                asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY),
+            )
+        return _async_clients[loop]
+
+
+# ---------- Rate limits ----------
+
+def _retry_after(headers) -> Optional[float]:
+    if headers is None:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+class _Bucket:
+    """Requests or tokens per minute. Reservations may overdraw; the caller waits it off."""
+
+    def __init__(self, per_minute: int):
+        self.configured = per_minute
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.capacity:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return max(-self.level * 60 / self.capacity, 0.0)
+
+    def follow(self, limit: Optional[str], remaining: Optional[str], now: float):
+        try:
+            limit = int(limit) if limit else None
+            remaining = float(remaining) if remaining else None
+        except ValueError:
+            return
+        self._refill(now)
+        if limit:
+            if not self.capacity:
+                self.level = float(limit)
+            self.capacity = float(min(limit, self.configured) if self.configured else limit)
+        if remaining is not None and self.capacity:
+            self.level = min(self.level, remaining)
+
+
+class _Scheduler:
+
+    def __init__(self, rpm: int, tpm: int):
+        self._lock = threading.Lock()
+        self.buckets = {"requests": _Bucket(rpm), "tokens": _Bucket(tpm)}
+        self.paused_until = 0.0
+
+    def reserve(self, tokens: int) -> float:
+        """Seconds to wait before sending a request of `tokens`."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.buckets["requests"].reserve(1, now), self.buckets["tokens"].reserve(tokens, now))
+            return max(wait, self.paused_until - now)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def follow(self, headers):
+        with self._lock:
+            now = time.monotonic()
+            for kind, bucket in self.buckets.items():
+                bucket.follow(
+                    headers.get(f"x-ratelimit-limit-{kind}"),
+                    headers.get(f"x-ratelimit-remaining-{kind}"),
+                    now,
+                )
+
+
+scheduler = _Scheduler(settings.LLM_RPM, settings.LLM_TPM)
+
+
+def _request_tokens(request: dict) -> int:
+    # ~4 characters per token, plus the completion allowance
+    text = "".join(str(message.get("content") or "") for message in request.get("messages", []))
+    return len(text) // 4 + 1 + (request.get("max_tokens") or 0)
+
+
+# ---------- Retries ----------
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in _RETRY_STATUSES
+
+
+def _backoff(error: Exception, attempt: int) -> float:
+    """Full jitter, or the server's retry-after when it asks for longer."""
+    delay = random.uniform(0, min(settings.LLM_RETRY_MAX_SECONDS, settings.LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+    response = getattr(error, "response", None)
+    retry_after = _retry_after(response.headers if response is not None else None)
+    if retry_after is not None:
+        retry_after = min(retry_after, settings.LLM_RETRY_MAX_SECONDS)
+        if isinstance(error, openai.RateLimitError):
+            scheduler.pause(retry_after)
+        delay = max(delay, retry_after + random.uniform(0, settings.LLM_RETRY_BASE_SECONDS))
+    return delay
+
+
+# ---------- Requests ----------
+
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+class _Abandoned(Exception):
+    """The leader stopped (cancelled, interrupted) before a response: followers send their own."""
+
+
+def _join(request: dict):
+    """(key, future, leader) for an identical request already in flight, or a new one."""
+    key = hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    with _inflight_lock:
+        if key in _inflight:
+            return key, _inflight[key], False
+        _inflight[key] = Future()
+        return key, _inflight[key], True
+
+
+def _settle(key: str, future: Future, result=None, error: Optional[BaseException] = None):
+    with _inflight_lock:
+        _inflight.pop(key, None)
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def _send(request: dict):
+    tokens = _request_tokens(request)
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        time.sleep(scheduler.reserve(tokens))
+        try:
+            with _slots:
+                raw = client.chat.completions.with_raw_response.create(**request)
+            scheduler.follow(raw.headers)
+            return raw.parse()
+        except Exception as e:
+            if attempt == settings.LLM_MAX_RETRIES or not _retryable(e):
+                raise
+            time.sleep(_backoff(e, attempt))
+
+
+async def _asend(request: dict):
+    api, slots = _async_state()
+    tokens = _request_tokens(request)
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        await asyncio.sleep(scheduler.reserve(tokens))
+        try:
+            async with slots:
+                raw = await api.chat.completions.with_raw_response.create(**request)
+            scheduler.follow(raw.headers)
+            return raw.parse()
+        except Exception as e:
+            if attempt == settings.LLM_MAX_RETRIES or not _retryable(e):
+                raise
+            await asyncio.sleep(_backoff(e, attempt))
+
+
+def complete(coalesce: bool = False, **request):
+    """`chat.completions.create(**request)` through the shared client, limits and retries."""
+    if not coalesce:
+        return _send(request)
+    while True:
+        key, future, leader = _join(request)
+        if leader:
+            break
+        try:
+            return future.result()
+        except _Abandoned:
+            continue
+    try:
+        response = _send(request)
+    except openai.OpenAIError as e:
+        _settle(key, future, error=e)
+        raise
+    except BaseException:
+        # Our cancellation or bug is not the followers' failure
+        _settle(key, future, error=_Abandoned())
+        raise
+    _settle(key, future, response)
+    return response
+
+
+async def acomplete(coalesce: bool = False, **request):
+    if not coalesce:
+        return await _asend(request)
+    while True:
+        key, future, leader = _join(request)
+        if leader:
+            break
+        try:
+            # Shielded: a cancelled follower must not cancel the shared future
+            return await asyncio.shield(asyncio.wrap_future(future))
+        except _Abandoned:
+            continue
+    try:
+        response = await _asend(request)
+    except openai.OpenAIError as e:
+        _settle(key, future, error=e)
+        raise
+    except BaseException:
+        _settle(key, future, error=_Abandoned())
+        raise
+    _settle(key, future, response)
+    return response
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from email.utils import formatdate
+import httpx
+import openai
+import pytest
+from openai import AsyncOpenAI, OpenAI
+from app.core import llm_gateway
+from app.core.config import settings
+from app.core.llm_gateway import _Bucket, _retry_after
+
+REQUEST = dict(model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}])
+
+
+def _completion(content: str = "ok", headers=None) -> httpx.Response:
+    return httpx.Response(200, headers=headers or {}, json={
+        "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+    })
+
+
+def _error(status: int, headers=None) -> httpx.Response:
+    return httpx.Response(status, headers=headers or {}, json={"error": {"message": "nope"}})
+
+
+class FakeAPI:
+    """Queued responses (the last one repeats), served through httpx's mock transport."""
+
+    def __init__(self):
+        self.responses = [_completion()]
+        self.requests = 0
+        self.entered = asyncio.Event()
+        self.release = None  # asyncio.Event the next async request waits on
+
+    def _next(self) -> httpx.Response:
+        self.requests += 1
+        return self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        return self._next()
+
+    async def ahandle(self, request: httpx.Request) -> httpx.Response:
+        release, self.release = self.release, None
+        self.entered.set()
+        if release is not None:
+            await release.wait()
+        return self._next()
+
+
+@pytest.fixture
+def api(monkeypatch):
+    fake = FakeAPI()
+    monkeypatch.setattr(llm_gateway, "client", OpenAI(
+        api_key="test", base_url="http://fake/v1", max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(fake.handle)),
+    ))
+
+    state = {}
+
+    def async_state():
+        if not state:
+            state["value"] = (
+                AsyncOpenAI(api_key="test", base_url="http://fake/v1", max_retries=0,
+                            http_client=httpx.AsyncClient(transport=httpx.MockTransport(fake.ahandle))),
+                asyncio.Semaphore(8),
+            )
+        return state["value"]
+
+    monkeypatch.setattr(llm_gateway, "_async_state", async_state)
+    monkeypatch.setattr(llm_gateway, "scheduler", llm_gateway._Scheduler(0, 0))
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 3)
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_SECONDS", 0.001)
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX_SECONDS", 0.01)
+    return fake
+
+
+def test_retry_after_forms():
+    assert _retry_after(httpx.Headers({"retry-after-ms": "1500", "retry-after": "9"})) == 1.5
+    assert _retry_after(httpx.Headers({"retry-after": "3"})) == 3.0
+    in_ten = _retry_after(httpx.Headers({"retry-after": formatdate(time.time() + 10, usegmt=True)}))
+    assert 8 <= in_ten <= 10
+    assert _retry_after(httpx.Headers({"retry-after": "soon"})) is None
+    assert _retry_after(None) is None
+
+
+def test_bucket_follows_reported_limits():
+    bucket = _Bucket(0)
+    assert bucket.reserve(10 ** 6, now=0.0) == 0.0
+
+    bucket.follow("60", "0", now=0.0)
+    assert bucket.reserve(1, now=0.0) == pytest.approx(1.0)
+    assert bucket.reserve(1, now=5.0) == pytest.approx(0.0)
+
+    configured = _Bucket(30)
+    configured.follow("60", None, now=configured.updated)
+    assert configured.capacity == 30
+
+
+def test_scheduler_reads_ratelimit_headers(api):
+    api.responses = [_completion(headers={
+        "x-ratelimit-limit-requests": "120", "x-ratelimit-remaining-requests": "0",
+    })]
+    llm_gateway.complete(**REQUEST)
+    assert llm_gateway.scheduler.buckets["requests"].capacity == 120
+    assert llm_gateway.scheduler.reserve(1) == pytest.approx(0.5, abs=0.05)
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_rate_limits_and_server_errors(api, status):
+    api.responses = [_error(status, {"retry-after-ms": "1"}), _error(status), _completion("done")]
+    assert llm_gateway.complete(**REQUEST).choices[0].message.content == "done"
+    assert api.requests == 3
+
+
+def test_bad_request_is_not_retried(api):
+    api.responses = [_error(400), _completion()]
+    with pytest.raises(openai.BadRequestError):
+        llm_gateway.complete(**REQUEST)
+    assert api.requests == 1
+
+
+def _run_with_follower(api, cancel_leader: bool, **options):
+    async def run():
+        release = api.release = asyncio.Event()
+        leader = asyncio.create_task(llm_gateway.acomplete(**options, **REQUEST))
+        await api.entered.wait()
+        follower = asyncio.create_task(llm_gateway.acomplete(**options, **REQUEST))
+        for _ in range(5):
+            await asyncio.sleep(0)
+        if cancel_leader:
+            leader.cancel()
+        release.set()
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    return asyncio.run(run())
+
+
+def test_requests_are_not_coalesced_by_default(api):
+    leader, follower = _run_with_follower(api, cancel_leader=False)
+    assert api.requests == 2
+    assert follower is not leader
+
+
+def test_coalesced_follower_gets_the_leaders_response(api):
+    leader, follower = _run_with_follower(api, cancel_leader=False, coalesce=True)
+    assert api.requests == 1
+    assert follower is leader
+
+
+def test_coalesced_follower_does_not_get_the_leaders_cancellation(api):
+    leader, follower = _run_with_follower(api, cancel_leader=True, coalesce=True)
+    assert isinstance(leader, asyncio.CancelledError)
+    assert follower.choices[0].message.content == "ok"
+    assert not llm_gateway._inflight
@@ -0,0 +1,251 @@
+"""
+Candidate metadata store.
+
+Full candidate metadata (name, skills, file path, source, ...) lives once
+per resume in SQLite (METADATA_DB_PATH), keyed by resume_id. Chunks in
+Chroma carry only resume_id plus the fields search filters on
+(FILTER_FIELDS), and retrieval results are hydrated from here in one
+bulk lookup. The resume text is kept alongside, so collections can be
+rebuilt (app/migration.py) without the original files.
+
+Move an existing collection to the slim layout:
+    python -m app.candidates --backfill
+"""
+import argparse
+import json
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .db import get_connection, ensure_schema
+
+# Metadata fields copied onto chunks because `where` filters use them
+FILTER_FIELDS = ("experience", "location")
+
+# SQLite's default limit on bound parameters per statement
+_SQL_VARS = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    resume_id TEXT PRIMARY KEY,
+    metadata TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_candidates_updated ON candidates (updated_at);
+CREATE TABLE IF NOT EXISTS candidate_texts (
+    resume_id TEXT PRIMARY KEY,
+    resume_text TEXT NOT NULL
+);
+"""
+
+
+def _connection():
+    ensure_schema(SCHEMA)
+    return get_connection()
+
+
+def filter_metadata(resume_id: str, metadata: Dict) -> Dict:
+    """The slim metadata stored on chunks and resume vectors."""
+    slim = {"resume_id": resume_id}
+    for field in FILTER_FIELDS:
+        value = metadata.get(field)
+        if isinstance(value, (str, int, float, bool)):
+            slim[field] = value
+    return slim
+
+
+def upsert_candidates(entries: Iterable[Tuple[str, Dict]], texts: Optional[Dict[str, str]] = None):
+    """
+    Store (resume_id, metadata) pairs, replacing earlier versions, and
+    the resume texts in `texts` ({resume_id: text}) in the same transaction.
+    """
+    now = time.time()
+    conn = _connection()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO candidates (resume_id, metadata, updated_at) VALUES (?, ?, ?)",
+            [
+                (resume_id, json.dumps({**metadata, "resume_id": resume_id}, default=str), now)
+                for resume_id, metadata in entries
+            ],
+        )
+        if texts:
+            conn.executemany(
+                "INSERT OR REPLACE INTO candidate_texts (resume_id, resume_text) VALUES (?, ?)",
+                [(resume_id, text) for resume_id, text in texts.items() if text is not None],
+            )
+
+
+def get_candidates(resume_ids: List[str]) -> Dict[str, Dict]:
+    """Bulk lookup: {resume_id: metadata} for the ids that are stored."""
+    conn = _connection()
+    found = {}
+    resume_ids = list(dict.fromkeys(resume_ids))
+
+    for i in range(0, len(resume_ids), _SQL_VARS):
+        part = resume_ids[i:i + _SQL_VARS]
+        rows = conn.execute(
+            f"SELECT resume_id, metadata FROM candidates "
+            f"WHERE resume_id IN ({','.join('?' * len(part))})",
+            part,
+        ).fetchall()
+        found.update((resume_id, json.loads(metadata)) for resume_id, metadata in rows)
+
+    return found
+
+
+def get_texts(resume_ids: List[str]) -> Dict[str, str]:
+    """Bulk lookup: {resume_id: resume text} for the ids that have one."""
+    conn = _connection()
+    found = {}
+    resume_ids = list(dict.fromkeys(resume_ids))
+
+    for i in range(0, len(resume_ids), _SQL_VARS):
+        part = resume_ids[i:i + _SQL_VARS]
+        found.update(conn.execute(
+            f"SELECT resume_id, resume_text FROM candidate_texts "
+            f"WHERE resume_id IN ({','.join('?' * len(part))})",
+            part,
+        ).fetchall())
+
+    return found
+
+
+def sample_texts(count: int) -> List[str]:
+    """Up to `count` stored resume texts, chosen at random."""
+    rows = _connection().execute(
+        "SELECT resume_text FROM candidate_texts ORDER BY RANDOM() LIMIT ?", (count,)
+    ).fetchall()
+    return [text for (text,) in rows]
+
+
+def count_candidates(updated_since: Optional[float] = None) -> int:
+    return _connection().execute(
+        "SELECT COUNT(*) FROM candidates WHERE updated_at >= ?", (updated_since or 0,)
+    ).fetchone()[0]
+
+
+def list_candidates(
+    after: str = "",
+    limit: int = 1000,
+    updated_since: Optional[float] = None,
+) -> List[Tuple[str, Dict]]:
+    """One page of (resume_id, metadata) in resume_id order, starting after `after`."""
+    rows = _connection().execute(
+        "SELECT resume_id, metadata FROM candidates "
+        "WHERE resume_id > ? AND updated_at >= ? ORDER BY resume_id LIMIT ?",
+        (after, updated_since or 0, limit),
+    ).fetchall()
+    return [(resume_id, json.loads(metadata)) for resume_id, metadata in rows]
+
+
+def iter_candidates(batch_size: int = 5000) -> Iterator[List[Tuple[str, Dict]]]:
+    """Every stored candidate, as pages of (resume_id, metadata)."""
+    after = ""
+    while True:
+        page = list_candidates(after, batch_size)
+        if not page:
+            break
+        yield page
+        after = page[-1][0]
+
+
+def get_candidate(resume_id: str) -> Optional[Dict]:
+    return get_candidates([resume_id]).get(resume_id)
+
+
+def update_candidate(resume_id: str, fields: Dict) -> Optional[Dict]:
+    """
+    Merge `fields` into a candidate's metadata. A single row write, unless a
+    filter field changed: then the chunks' filter copies are updated too.
+    Returns the new metadata, or None for an unknown resume_id.
+    """
+    current = get_candidate(resume_id)
+    if current is None:
+        return None
+
+    fields = {key: value for key, value in fields.items() if key != "resume_id"}
+    updated = {**current, **fields}
+    upsert_candidates([(resume_id, updated)])
+
+    if any(field in fields for field in FILTER_FIELDS):
+        from .vectorstore import get_collection, get_resume_collection
+
+        collection, resume_collection = get_collection(), get_resume_collection()
+        slim = filter_metadata(resume_id, updated)
+        chunk_ids = collection.get(where={"resume_id": resume_id}, include=[])["ids"]
+        if chunk_ids:
+            collection.update(ids=chunk_ids, metadatas=[slim] * len(chunk_ids))
+        if resume_collection.get(ids=[resume_id], include=[])["ids"]:
+            resume_collection.update(ids=[resume_id], metadatas=[slim])
+
+    if "skills" in fields:
+        from . import skill_index
+
+        skill_index.index_skills([(resume_id, updated.get("skills"))])
+
+    return updated
+
+
+def hydrate(candidates: List[Dict]) -> List[Dict]:
+    """
+    Replace each retrieval result's chunk metadata with the stored
+    candidate metadata (one bulk lookup). Resumes indexed before the
+    store existed keep their chunk metadata.
+    """
+    stored = get_candidates([c["resume_id"] for c in candidates])
+    for candidate in candidates:
+        metadata = stored.get(candidate["resume_id"])
+        if metadata is not None:
+            candidate["metadata"] = {**(candidate.get("metadata") or {}), **metadata}
+    return candidates
+
+
+def _slim_update(meta: Dict) -> Dict:
+    # Keys set to None are removed by Chroma's metadata update
+    slim = filter_metadata(meta.get("resume_id"), meta)
+    return {**{key: None for key in meta if key not in slim}, **slim}
+
+
+def backfill(batch_size: int = 1000) -> int:
+    """
+    Copy full metadata from chunks into the candidate store, then strip
+    the chunks (and resume vectors) down to the filter fields.
+    Returns the number of candidates added.
+    """
+    from .vectorstore import get_collection, get_resume_collection
+
+    added = 0
+    collection, resume_collection = get_collection(), get_resume_collection()
+    for store in (collection, resume_collection):
+        ids = store.get(include=[])["ids"]
+
+        for i in range(0, len(ids), batch_size):
+            page = store.get(ids=ids[i:i + batch_size], include=["metadatas"])
+            metadatas = [meta or {} for meta in page["metadatas"]]
+
+            full = {}
+            for meta in metadatas:
+                if meta.get("resume_id"):
+                    full.setdefault(meta["resume_id"], meta)
+
+            known = get_candidates(list(full))
+            missing = [(rid, meta) for rid, meta in full.items() if rid not in known]
+            upsert_candidates(missing)
+            added += len(missing)
+
+            store.update(ids=page["ids"], metadatas=[_slim_update(meta) for meta in metadatas])
+
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Candidate store maintenance")
+    parser.add_argument("--backfill", action="store_true",
+                        help="move chunk metadata into the candidate store")
+    args = parser.parse_args()
+
+    if args.backfill:
+        print(f"Backfilled {backfill()} candidates")
+
+
+if __name__ == "__main__":
+    main()
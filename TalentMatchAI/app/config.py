@@ -8,22 +8,140 @@ ENVIRONMENT = os.getenv("ENVIRONMENT")
 LOG_LEVEL = os.getenv("LOG_LEVEL")
 
 # Chroma
-CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR")
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME")
 
+# Optional Chroma server; required when ingestion workers run as separate processes
+CHROMA_HOST = os.getenv("CHROMA_HOST")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", 8000))
+
+# Vector backend: "chroma", or "flat" for the in-process memory-mapped index
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+VECTOR_FLAT_DTYPE = os.getenv("VECTOR_FLAT_DTYPE", "int8")
+VECTOR_FLAT_BLOCK_ROWS = int(os.getenv("VECTOR_FLAT_BLOCK_ROWS", 2048))
+
+# Local metadata (dedup index, ...) lives with the Chroma data it describes
+METADATA_DB_PATH = os.getenv(
+    "METADATA_DB_PATH", os.path.join(CHROMA_PERSIST_DIR, "talentmatch.sqlite3")
+)
+
+# Duplicate detection
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", 0.85))
+
 # OpenAI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")
 LLM_MODEL = os.getenv("LLM_MODEL")
 OPENAI_TIMEOUT = int(os.getenv("OPENAI_TIMEOUT", 60))
 
+# Shared OpenAI gateway (app/llm_gateway.py). LLM_RPM / LLM_TPM cap requests and
+# tokens per minute (0: follow the API's x-ratelimit-* headers only)
+LLM_RPM = int(os.getenv("LLM_RPM", 0))
+LLM_TPM = int(os.getenv("LLM_TPM", 0))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", 0.5))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", 30))
+
+# Local embedding backends (EMBEDDING_MODEL=local:hashing[-DIM] or local:onnx)
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", os.cpu_count() or 2))
+EMBEDDING_ONNX_MODEL_PATH = os.getenv("EMBEDDING_ONNX_MODEL_PATH")
+EMBEDDING_ONNX_TOKENIZER_PATH = os.getenv("EMBEDDING_ONNX_TOKENIZER_PATH")
+
+# Reduced-dimension embeddings (unset: the model's full size). EMBEDDING_REDUCTION
+# is "truncate" (Matryoshka prefix) or "pca" (projection fitted by app.dimensions)
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS") or 0) or None
+EMBEDDING_REDUCTION = os.getenv("EMBEDDING_REDUCTION", "truncate")
+EMBEDDING_PCA_DIR = os.getenv("EMBEDDING_PCA_DIR", os.path.join(CHROMA_PERSIST_DIR, "pca"))
+
+# Chunking: "section" (section-aware, token budgeted) or "fixed" (800/100 chars)
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "section")
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", 300))
+CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", 60))
+# Word-window overlap for over-long lines; capped at half the chunk budget
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 30))
+
+# Embedding engine
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", 20000))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 256))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", 4))
+
+# Embedding cache
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+# Shared by the API, workers and tools when they share CHROMA_PERSIST_DIR
+EMBEDDING_CACHE_PATH = (
+    os.getenv("EMBEDDING_CACHE_PATH") or os.path.join(CHROMA_PERSIST_DIR, "embedding_cache.sqlite3")
+)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 500000))
+
 # Search tuning
 TOP_K = int(os.getenv("TOP_K", 10))
 SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", 0.7))
+# Resumes shortlisted per requested candidate before the chunk rerank
+RESUME_SHORTLIST_FACTOR = int(os.getenv("RESUME_SHORTLIST_FACTOR", 3))
+
+# Skill filtering: above SKILL_FILTER_MAX_IDS surviving resumes the skill
+# gate is applied after the vector query instead of inside it
+SKILL_FILTER_MAX_IDS = int(os.getenv("SKILL_FILTER_MAX_IDS", 2000))
+PREFERRED_SKILL_WEIGHT = float(os.getenv("PREFERRED_SKILL_WEIGHT", 0.05))
+
+# Search cache
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1000))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 1000))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 3600))
+SCORE_CACHE_SIZE = int(os.getenv("SCORE_CACHE_SIZE", 20000))
+
+# LLM candidate scoring
+SCORING_BATCH_TOKENS = int(os.getenv("SCORING_BATCH_TOKENS", 6000))
+SCORING_BATCH_SIZE = int(os.getenv("SCORING_BATCH_SIZE", 8))
+SCORING_CONCURRENCY = int(os.getenv("SCORING_CONCURRENCY", 4))
+SCORING_EXCERPT_CHARS = int(os.getenv("SCORING_EXCERPT_CHARS", 1200))
 
 # Performance
 MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", 100))
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", 500))
 MAX_RESUME_LENGTH = int(os.getenv("MAX_RESUME_LENGTH", 20000))
 
 # Intake
-UPLOAD_DIR = os.getenv("UPLOAD_DIR")
\ No newline at end of file
+UPLOAD_DIR = os.getenv("UPLOAD_DIR")
+# Uploads are streamed to disk UPLOAD_CHUNK_BYTES at a time
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", 1024 * 1024))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 20 * 1024 * 1024))
+MAX_UPLOAD_FILES = int(os.getenv("MAX_UPLOAD_FILES", 500))
+
+# Text extraction
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", os.cpu_count() or 2))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", 30))
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", 50))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 8))
+
+# Resume structuring: regex fast-path, then up to STRUCTURE_BATCH_SIZE resumes
+# per LLM request, each trimmed to STRUCTURE_MAX_CHARS of relevant sections
+STRUCTURE_BATCH_SIZE = int(os.getenv("STRUCTURE_BATCH_SIZE", 8))
+STRUCTURE_CONCURRENCY = int(os.getenv("STRUCTURE_CONCURRENCY", 4))
+STRUCTURE_MAX_CHARS = int(os.getenv("STRUCTURE_MAX_CHARS", 4000))
+STRUCTURE_CACHE_ENABLED = os.getenv("STRUCTURE_CACHE_ENABLED", "true").lower() == "true"
+
+# Intake pipeline
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 32))
+PIPELINE_STRUCTURE_CONCURRENCY = int(os.getenv("PIPELINE_STRUCTURE_CONCURRENCY", 8))
+PIPELINE_INDEX_BATCH = int(os.getenv("PIPELINE_INDEX_BATCH", 25))
+
+# Ingestion job queue
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(CHROMA_PERSIST_DIR, "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 300))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1.0))
+
+# Collection migrations (re-embedding / re-chunking into a shadow collection)
+MIGRATION_BATCH_RESUMES = int(os.getenv("MIGRATION_BATCH_RESUMES", 200))
+# Also run live /search queries against a built shadow collection and record overlap
+MIGRATION_DUAL_READ = os.getenv("MIGRATION_DUAL_READ", "false").lower() == "true"
+
+# Observability: requests slower than SLOW_REQUEST_SECONDS are counted; with
+# PROFILE_SLOW_REQUESTS their sampled stacks are written to PROFILE_DIR
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", 2.0))
+PROFILE_SLOW_REQUESTS = os.getenv("PROFILE_SLOW_REQUESTS", "false").lower() == "true"
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.01))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
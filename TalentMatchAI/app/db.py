@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import threading
+from .config import METADATA_DB_PATH
+
+_local = threading.local()
+
+
+def get_connection(path: str = METADATA_DB_PATH) -> sqlite3.Connection:
+    """
+    Return this thread's SQLite connection to `path`
+    (WAL mode, created on first use).
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        connections[path] = conn
+
+    return conn
+
+
+_ready_schemas = set()
+_schema_lock = threading.Lock()
+
+
+def ensure_schema(schema: str, path: str = METADATA_DB_PATH):
+    """Create the tables in `schema` once per process."""
+    key = (path, schema)
+    if key in _ready_schemas:
+        return
+
+    with _schema_lock:
+        if key not in _ready_schemas:
+            get_connection(path).executescript(schema)
+            _ready_schemas.add(key)
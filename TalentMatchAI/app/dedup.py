@@ -0,0 +1,174 @@
+import hashlib
+import re
+from typing import Iterable, Optional, Tuple
+import numpy as np
+from .config import NEAR_DUPLICATE_THRESHOLD
+from .db import get_connection, ensure_schema
+
+# MinHash / LSH parameters: 16 bands x 8 rows puts the LSH
+# candidate threshold around 0.7 Jaccard similarity
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+
+_WORD_RE = re.compile(r"\w+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resume_hashes (
+    content_hash TEXT PRIMARY KEY,
+    resume_id TEXT NOT NULL,
+    indexed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS resume_signatures (
+    resume_id TEXT PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    resume_id TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, resume_id)
+);
+"""
+
+
+def _connection():
+    ensure_schema(SCHEMA)
+    return get_connection()
+
+
+def normalize_resume(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the normalized resume text (exact-duplicate key)."""
+    return hashlib.sha256(normalize_resume(text).encode("utf-8")).hexdigest()
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """
+    MinHash signature over word shingles.
+    Returns None for texts too short to compare meaningfully.
+    """
+    words = normalize_resume(text).split()
+    if len(words) < SHINGLE_SIZE:
+        return None
+
+    shingles = {
+        " ".join(words[i:i + SHINGLE_SIZE])
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+    hashes = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+            for s in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+    # (a * h + b) mod p for every permutation at once
+    permuted = np.bitwise_and(
+        (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME, _MAX_HASH
+    )
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def _band_buckets(signature: np.ndarray) -> Iterable[Tuple[int, int]]:
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS].tobytes()
+        bucket = int.from_bytes(hashlib.blake2b(rows, digest_size=8).digest(), "little", signed=True)
+        yield band, bucket
+
+
+def find_exact(text_hash: str) -> Optional[Tuple[str, bool]]:
+    """Return (resume_id, indexed) for a known content hash, else None."""
+    row = _connection().execute(
+        "SELECT resume_id, indexed FROM resume_hashes WHERE content_hash = ?",
+        (text_hash,),
+    ).fetchone()
+    return (row[0], bool(row[1])) if row else None
+
+
+def find_near_duplicate(signature: Optional[np.ndarray]) -> Optional[str]:
+    """
+    Return the resume_id of the most similar known resume whose
+    estimated Jaccard similarity reaches NEAR_DUPLICATE_THRESHOLD.
+    """
+    if signature is None:
+        return None
+
+    conn = _connection()
+    candidates = set()
+    for band, bucket in _band_buckets(signature):
+        rows = conn.execute(
+            "SELECT resume_id FROM lsh_buckets WHERE band = ? AND bucket = ?",
+            (band, bucket),
+        ).fetchall()
+        candidates.update(row[0] for row in rows)
+
+    best_id, best_similarity = None, NEAR_DUPLICATE_THRESHOLD
+    for resume_id in candidates:
+        row = conn.execute(
+            "SELECT signature FROM resume_signatures WHERE resume_id = ?",
+            (resume_id,),
+        ).fetchone()
+        if row is None:
+            continue
+
+        other = np.frombuffer(row[0], dtype=np.uint32)
+        similarity = float(np.mean(other == signature))
+        if similarity >= best_similarity:
+            best_id, best_similarity = resume_id, similarity
+
+    return best_id
+
+
+def register(text_hash: str, resume_id: str, signature: Optional[np.ndarray]):
+    """
+    Record a resume version before it is embedded. It only counts as an
+    exact duplicate once `mark_indexed` confirms it reached the vector store.
+    The resume's earlier versions are forgotten: re-ingesting one of them
+    later is an update, not a duplicate of the current version.
+    """
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "DELETE FROM resume_hashes WHERE resume_id = ? AND content_hash != ?",
+            (resume_id, text_hash),
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO resume_hashes (content_hash, resume_id) VALUES (?, ?)",
+            (text_hash, resume_id),
+        )
+
+        # The latest version's signature represents the resume
+        conn.execute("DELETE FROM resume_signatures WHERE resume_id = ?", (resume_id,))
+        conn.execute("DELETE FROM lsh_buckets WHERE resume_id = ?", (resume_id,))
+        if signature is not None:
+            conn.execute(
+                "INSERT INTO resume_signatures (resume_id, signature) VALUES (?, ?)",
+                (resume_id, signature.tobytes()),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO lsh_buckets (band, bucket, resume_id) VALUES (?, ?, ?)",
+                [(band, bucket, resume_id) for band, bucket in _band_buckets(signature)],
+            )
+
+
+def mark_indexed(text_hashes: Iterable[str]):
+    conn = _connection()
+    with conn:
+        conn.executemany(
+            "UPDATE resume_hashes SET indexed = 1 WHERE content_hash = ?",
+            [(h,) for h in text_hashes],
+        )
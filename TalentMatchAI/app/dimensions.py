@@ -0,0 +1,155 @@
+"""
+Reduced-dimension embeddings.
+
+An embedding model can be served at fewer dimensions than it produces,
+which shrinks the vector index and speeds up every query:
+
+    EMBEDDING_DIMENSIONS=256 EMBEDDING_REDUCTION=truncate
+        keep the first 256 components and re-normalize (Matryoshka).
+        OpenAI text-embedding-3 models are trained for this and return
+        the shortened vectors directly via the API's `dimensions` option.
+    EMBEDDING_DIMENSIONS=256 EMBEDDING_REDUCTION=pca
+        project onto the top principal components of our own corpus,
+        fitted once with:
+            python -m app.dimensions fit-pca --dimensions 256
+
+Internally the dimension is part of the model name
+(`text-embedding-3-small@256`, `local:onnx@pca128`), so the embedding
+cache, query vectors and collection generations keep reduced and full
+vectors apart. Move an existing collection to a new size with a
+migration: `python -m app.migration start --embedding-model MODEL@256`.
+"""
+import argparse
+import os
+import random
+import re
+from typing import List, Optional, Tuple
+import numpy as np
+from .config import EMBEDDING_PCA_DIR
+
+METHODS = ("truncate", "pca")
+
+_SPEC_RE = re.compile(r"^(?P<base>.+)@(?P<pca>pca)?(?P<dimensions>\d+)$")
+
+_projections = {}
+
+
+def model_spec(model: str, dimensions: Optional[int] = None, method: str = "truncate") -> str:
+    """The model name that carries an output dimension, e.g. `text-embedding-3-small@256`."""
+    if not dimensions:
+        return model
+    if method not in METHODS:
+        raise ValueError(f"EMBEDDING_REDUCTION must be one of {METHODS}")
+    return f"{model}@{'pca' if method == 'pca' else ''}{dimensions}"
+
+
+def parse_spec(spec: str) -> Tuple[str, Optional[int], str]:
+    """(base model, dimensions or None, method)"""
+    match = _SPEC_RE.match(spec)
+    if not match:
+        return spec, None, "truncate"
+    return match["base"], int(match["dimensions"]), "pca" if match["pca"] else "truncate"
+
+
+def _normalized(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+# ---------- PCA ----------
+
+def pca_path(base_model: str, dimensions: int) -> str:
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", base_model)
+    return os.path.join(EMBEDDING_PCA_DIR, f"{safe}-{dimensions}.npz")
+
+
+def fit_pca(matrix: np.ndarray, dimensions: int) -> np.ndarray:
+    """
+    Top `dimensions` principal directions, one per row. Fitted and applied
+    without centering: projecting raw vectors keeps their dot products
+    (what cosine search ranks by) as intact as `dimensions` allows, while
+    subtracting the mean shifts every document's score by a different amount.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if dimensions > min(matrix.shape):
+        raise ValueError(f"Need at least {dimensions} sample vectors to fit {dimensions} components")
+
+    _, _, vt = np.linalg.svd(matrix, full_matrices=False)
+    return vt[:dimensions]
+
+
+def save_pca(base_model: str, components: np.ndarray) -> str:
+    path = pca_path(base_model, len(components))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez(path, components=components)
+    _projections.pop(path, None)
+    return path
+
+
+def load_pca(base_model: str, dimensions: int) -> np.ndarray:
+    path = pca_path(base_model, dimensions)
+    found = _projections.get(path)
+    if found is None:
+        if not os.path.exists(path):
+            raise RuntimeError(
+                f"No PCA projection for {base_model}@pca{dimensions}; "
+                f"run `python -m app.dimensions fit-pca --dimensions {dimensions}`"
+            )
+        with np.load(path) as data:
+            found = _projections[path] = data["components"]
+    return found
+
+
+# ---------- Reduction ----------
+
+def reduce(matrix: np.ndarray, dimensions: int, method: str = "truncate",
+           components: Optional[np.ndarray] = None) -> np.ndarray:
+    """Reduce full-size embeddings (rows) to `dimensions`, L2-normalized."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if method == "pca":
+        return _normalized(matrix @ components.T)
+    return _normalized(matrix[:, :dimensions])
+
+
+def sample_texts(sample: int, seed: int = 0) -> List[str]:
+    """Up to `sample` chunks drawn from resumes in the candidate store."""
+    from .candidates import iter_candidates, get_texts
+    from .utils import chunk_text
+
+    resume_ids = [resume_id for page in iter_candidates() for resume_id, _ in page]
+    random.Random(seed).shuffle(resume_ids)
+
+    chunks = []
+    for i in range(0, len(resume_ids), 200):
+        for text in get_texts(resume_ids[i:i + 200]).values():
+            chunks.extend(chunk_text(text))
+        if len(chunks) >= sample:
+            break
+    return chunks[:sample]
+
+
+def fit_corpus_pca(base_model: str, dimensions: int, sample: int = 5000) -> str:
+    """Fit and save a PCA projection for `base_model` on chunks of our own resumes."""
+    from .embeddings import iter_embeddings
+
+    texts = sample_texts(sample)
+    vectors = [vector for batch in iter_embeddings(texts, base_model) for vector in batch]
+    return save_pca(base_model, fit_pca(np.asarray(vectors, dtype=np.float32), dimensions))
+
+
+def main():
+    from .config import EMBEDDING_MODEL
+
+    parser = argparse.ArgumentParser(description="Reduced-dimension embeddings")
+    commands = parser.add_subparsers(dest="command", required=True)
+    fit = commands.add_parser("fit-pca", help="fit a PCA projection on the candidate store")
+    fit.add_argument("--dimensions", type=int, required=True)
+    fit.add_argument("--model", default=EMBEDDING_MODEL, help="full-size model to reduce")
+    fit.add_argument("--sample", type=int, default=5000, help="chunks to fit on")
+    args = parser.parse_args()
+
+    path = fit_corpus_pca(args.model, args.dimensions, args.sample)
+    print(f"Saved {path}; serve it as {model_spec(args.model, args.dimensions, 'pca')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Embedding backends, selected by EMBEDDING_MODEL:
+
+    text-embedding-3-small   OpenAI embeddings API (any non-"local:" name)
+    local:hashing            NumPy hashing vectorizer, no model files needed
+    local:hashing-768        ... with an explicit output dimension
+    local:onnx               ONNX sentence encoder (EMBEDDING_ONNX_MODEL_PATH
+                             and EMBEDDING_ONNX_TOKENIZER_PATH; needs
+                             onnxruntime and tokenizers installed)
+
+Any of them with an "@DIM" or "@pcaDIM" suffix serves reduced-dimension
+vectors (see app/dimensions.py).
+
+Local backends embed whole batches with vectorized NumPy code and split
+large batches across a shared thread pool, so bulk indexing runs at local
+speed without network calls.
+"""
+import re
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import numpy as np
+from .config import (
+    LOCAL_EMBEDDING_THREADS,
+    EMBEDDING_ONNX_MODEL_PATH,
+    EMBEDDING_ONNX_TOKENIZER_PATH,
+)
+from . import llm_gateway
+from . import dimensions as reduction
+
+_TOKEN_RE = re.compile(r"\w+")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=LOCAL_EMBEDDING_THREADS)
+        return _pool
+
+
+class EmbeddingProvider(ABC):
+    """Turns a batch of texts into one vector per text, in order."""
+
+    name = "base"
+    # False when recomputing is cheaper than a cache lookup
+    cacheable = True
+    # Longest input the model embeds without truncation (None: no limit)
+    max_input_tokens = None
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """One vector per text, in input order."""
+
+
+class OpenAIProvider(EmbeddingProvider):
+
+    max_input_tokens = 8191
+
+    # Trained so that a prefix of the vector is itself a usable embedding
+    supports_dimensions = False
+
+    def __init__(self, model: str):
+        self.name = model
+        self.supports_dimensions = model.startswith("text-embedding-3")
+
+    def embed(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        options = {"dimensions": dimensions} if dimensions else {}
+        response = llm_gateway.embed("embed", model=self.name, input=texts, **options)
+        ordered = sorted(response.data, key=lambda item: item.index)
+        return [item.embedding for item in ordered]
+
+
+class LocalProvider(EmbeddingProvider):
+    """Shared batching for CPU backends: split big batches over the thread pool."""
+
+    sub_batch_size = 64
+
+    @abstractmethod
+    def embed_matrix(self, texts: List[str]) -> np.ndarray:
+        """One L2-normalized row per text."""
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if len(texts) <= self.sub_batch_size:
+            return self.embed_matrix(texts).tolist()
+
+        parts = [
+            texts[i:i + self.sub_batch_size]
+            for i in range(0, len(texts), self.sub_batch_size)
+        ]
+        matrices = _get_pool().map(self.embed_matrix, parts)
+        return np.vstack(list(matrices)).tolist()
+
+
+class HashingProvider(LocalProvider):
+    """
+    Signed feature hashing of word unigrams and bigrams with sublinear
+    term frequency, L2-normalized. Deterministic across processes.
+    """
+
+    sub_batch_size = 256
+    cacheable = False
+
+    def __init__(self, dimensions: int = 768):
+        self.name = f"local:hashing-{dimensions}"
+        self.dimensions = dimensions
+
+    def embed_matrix(self, texts: List[str]) -> np.ndarray:
+        rows, hashes = [], []
+        for row, text in enumerate(texts):
+            tokens = _TOKEN_RE.findall(text.lower())
+            features = tokens + [a + " " + b for a, b in zip(tokens, tokens[1:])]
+            hashes.extend(zlib.crc32(f.encode("utf-8")) for f in features)
+            rows.extend([row] * len(features))
+
+        hashes = np.asarray(hashes, dtype=np.uint32)
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = (hashes % self.dimensions).astype(np.int64)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(matrix, (rows, columns), signs)
+
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+
+class OnnxProvider(LocalProvider):
+    """
+    Sentence encoder exported to ONNX (e.g. all-MiniLM-L6-v2):
+    mean-pooled last hidden state, L2-normalized.
+    """
+
+    max_length = 256
+    max_input_tokens = max_length
+
+    def __init__(self, model_path: str, tokenizer_path: str):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                "local:onnx embeddings need `onnxruntime` and `tokenizers` installed"
+            ) from e
+
+        if not model_path or not tokenizer_path:
+            raise RuntimeError(
+                "local:onnx embeddings need EMBEDDING_ONNX_MODEL_PATH and "
+                "EMBEDDING_ONNX_TOKENIZER_PATH"
+            )
+
+        self.name = f"local:onnx:{model_path}"
+        self.session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+        self.tokenizer.enable_padding()
+
+    def embed_matrix(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        inputs = {name: value for name, value in inputs.items() if name in self.input_names}
+
+        hidden = self.session.run(None, inputs)[0]
+        mask = inputs["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+class ReducedProvider(EmbeddingProvider):
+    """
+    A backend's vectors cut down to `dimensions`: the leading components
+    (Matryoshka truncation) or a PCA projection fitted on our corpus.
+    """
+
+    def __init__(self, base: EmbeddingProvider, dimensions: int, method: str, base_model: str):
+        self.name = reduction.model_spec(base_model, dimensions, method)
+        self.base = base
+        self.dimensions = dimensions
+        self.method = method
+        self.cacheable = base.cacheable
+        self.max_input_tokens = base.max_input_tokens
+        self.components = reduction.load_pca(base_model, dimensions) if method == "pca" else None
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if self.method == "truncate" and getattr(self.base, "supports_dimensions", False):
+            # The API shortens and re-normalizes server-side: smaller responses
+            return self.base.embed(texts, dimensions=self.dimensions)
+
+        matrix = np.asarray(self.base.embed(texts), dtype=np.float32)
+        return reduction.reduce(matrix, self.dimensions, self.method, self.components).tolist()
+
+
+_providers = {}
+
+
+def get_provider(model: str) -> EmbeddingProvider:
+    """Return the (cached) backend for an EMBEDDING_MODEL value."""
+    provider = _providers.get(model)
+    if provider is not None:
+        return provider
+
+    base_model, dimensions, method = reduction.parse_spec(model)
+    if dimensions:
+        provider = ReducedProvider(get_provider(base_model), dimensions, method, base_model)
+    elif model.startswith("local:hashing"):
+        suffix = model[len("local:hashing"):].lstrip("-")
+        provider = HashingProvider(int(suffix) if suffix else 768)
+    elif model == "local:onnx":
+        provider = OnnxProvider(EMBEDDING_ONNX_MODEL_PATH, EMBEDDING_ONNX_TOKENIZER_PATH)
+    elif model.startswith("local:"):
+        raise ValueError(f"Unknown local embedding backend: {model}")
+    else:
+        provider = OpenAIProvider(model)
+
+    _providers[model] = provider
+    return provider
@@ -1,11 +1,117 @@
-from openai import OpenAI
-from .config import OPENAI_API_KEY, EMBEDDING_MODEL
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional
+from .config import (
+    EMBEDDING_BATCH_TOKENS,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_CONCURRENCY,
+)
+from .embedding_cache import cache
+from .embedding_providers import get_provider
+from .utils import estimate_tokens
+from .vectorstore import active_generation
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+_pool = ThreadPoolExecutor(max_workers=EMBEDDING_CONCURRENCY)
 
-def get_embedding(text: str):
-    response = client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=text
-    )
-    return response.data[0].embedding
+
+def active_model() -> str:
+    """Embedding model of the collection being served."""
+    return active_generation()["embedding_model"]
+
+
+def _cache_for(model: str):
+    # OpenAI or a local CPU backend, depending on the model name
+    return cache if get_provider(model).cacheable else None
+
+
+def get_embedding(text: str, model: Optional[str] = None):
+    model = model or active_model()
+    vector_cache = _cache_for(model)
+
+    if vector_cache is not None:
+        cached = vector_cache.get_many(model, [text])[0]
+        if cached is not None:
+            return cached
+
+    embedding = get_provider(model).embed([text])[0]
+
+    if vector_cache is not None:
+        vector_cache.put_many(model, [text], [embedding])
+
+    return embedding
+
+
+def _request_embeddings(texts: List[str], model: str) -> List[List[float]]:
+    return get_provider(model).embed(texts)
+
+
+def get_embeddings(texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+    """
+    Embed several texts with a single provider call.
+    Cached vectors are reused; only misses are sent to the provider.
+    Returned vectors are in the same order as `texts`.
+    `model` defaults to the active generation's embedding model.
+    """
+    model = model or active_model()
+    vector_cache = _cache_for(model)
+
+    if vector_cache is None:
+        return _request_embeddings(texts, model)
+
+    vectors = vector_cache.get_many(model, texts)
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        fresh = _request_embeddings(missing_texts, model)
+        vector_cache.put_many(model, missing_texts, fresh)
+
+        for i, vector in zip(missing, fresh):
+            vectors[i] = vector
+
+    return vectors
+
+
+def pack_batches(texts: Iterable[str]) -> Iterator[List[str]]:
+    """
+    Group texts into request-sized batches that stay under
+    EMBEDDING_BATCH_TOKENS and EMBEDDING_BATCH_SIZE inputs.
+    """
+    batch = []
+    batch_tokens = 0
+
+    for text in texts:
+        tokens = estimate_tokens(text)
+
+        if batch and (
+            batch_tokens + tokens > EMBEDDING_BATCH_TOKENS
+            or len(batch) >= EMBEDDING_BATCH_SIZE
+        ):
+            yield batch
+            batch, batch_tokens = [], 0
+
+        batch.append(text)
+        batch_tokens += tokens
+
+    if batch:
+        yield batch
+
+
+def iter_embeddings(texts: Iterable[str], model: Optional[str] = None) -> Iterator[List[List[float]]]:
+    """
+    Embedding engine for bulk ingestion.
+    Packs texts into multi-input batches and keeps at most
+    EMBEDDING_CONCURRENCY batches in flight on a shared thread pool.
+    Yields one list of vectors per batch, in input order.
+    """
+    model = model or active_model()
+    in_flight = deque()
+
+    for batch in pack_batches(texts):
+        in_flight.append(_pool.submit(get_embeddings, batch, model))
+
+        if len(in_flight) >= EMBEDDING_CONCURRENCY:
+            yield in_flight.popleft().result()
+
+    while in_flight:
+        yield in_flight.popleft().result()
@@ -0,0 +1,567 @@
+"""
+In-process flat vector index (VECTOR_BACKEND=flat).
+
+A drop-in for the parts of the Chroma collection API that TalentMatchAI
+uses (upsert / update / delete / get / query / count). Each collection is
+a directory under CHROMA_PERSIST_DIR/flat/:
+
+    vectors.bin      normalized embeddings, memory-mapped int8 (one float
+                     scale per row) or float16 (VECTOR_FLAT_DTYPE)
+    index.sqlite3    ids, documents and metadata, one row per vector
+
+Filter fields (resume_id, experience, location) are also held as
+in-memory columnar arrays, so a `where` clause becomes a boolean mask and
+a query is exact cosine similarity over the masked rows: block-wise
+dot products against the memory map, merged into a running top-k.
+int8 is the default: it scans several times faster than float16 (NumPy's
+half-float conversion is slow) and loses ~1% recall@50.
+
+Upserts overwrite a known id's row in place and append new ids to the
+end of the file; deleted rows are masked out and reused if their id
+comes back. Every write bumps a version in index.sqlite3, and readers in
+other processes reload when they see a newer one. Reads and writes
+share one lock per collection.
+"""
+import json
+import os
+import shutil
+import threading
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from .config import VECTOR_FLAT_DTYPE, VECTOR_FLAT_BLOCK_ROWS
+from .db import get_connection, ensure_schema
+
+NUMERIC_FIELDS = ("experience",)
+CATEGORICAL_FIELDS = ("resume_id", "location")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rows (
+    row INTEGER PRIMARY KEY,
+    id TEXT UNIQUE NOT NULL,
+    alive INTEGER NOT NULL,
+    resume_id TEXT,
+    experience REAL,
+    location TEXT,
+    scale REAL NOT NULL DEFAULT 1,
+    document TEXT,
+    metadata TEXT NOT NULL
+);
+"""
+
+_DTYPES = {"float16": np.float16, "int8": np.int8}
+
+# SQLite's default limit on bound parameters per statement
+_SQL_VARS = 900
+
+
+def _normalized(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=-1, keepdims=True), 1e-12)
+
+
+def _numeric(value) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return np.nan
+    return float(value)
+
+
+def _filter_values(metadata: Dict) -> tuple:
+    """(resume_id, experience, location) for the rows table; None when absent."""
+    experience = _numeric(metadata.get("experience"))
+    location = metadata.get("location")
+    return (
+        metadata.get("resume_id"),
+        None if np.isnan(experience) else experience,
+        location if isinstance(location, str) else None,
+    )
+
+
+class _Column:
+    """Growable in-memory array."""
+
+    def __init__(self, dtype, fill):
+        self.dtype = dtype
+        self.fill = fill
+        self.data = np.full(1024, fill, dtype=dtype)
+
+    def reserve(self, size: int):
+        if size > len(self.data):
+            grown = np.full(max(size, 2 * len(self.data)), self.fill, dtype=self.dtype)
+            grown[:len(self.data)] = self.data
+            self.data = grown
+
+
+class _Categories:
+    """String values as int32 codes (-1 for missing)."""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value, add: bool = True) -> int:
+        if not isinstance(value, str):
+            return -1
+        found = self.codes.get(value)
+        if found is None:
+            if not add:
+                return -2  # matches nothing
+            found = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return found
+
+
+class FlatIndex:
+
+    def __init__(self, path: str, dtype: str = VECTOR_FLAT_DTYPE):
+        if dtype not in _DTYPES:
+            raise ValueError(f"VECTOR_FLAT_DTYPE must be one of {sorted(_DTYPES)}")
+
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._db_path = os.path.join(path, "index.sqlite3")
+        self._vector_path = os.path.join(path, "vectors.bin")
+        self._lock = threading.RLock()
+        self._requested_dtype = dtype
+
+        with self._lock:
+            self._load()
+
+    # ---------- Storage ----------
+
+    def _connection(self):
+        ensure_schema(SCHEMA, self._db_path)
+        return get_connection(self._db_path)
+
+    def _info(self, conn) -> Dict[str, str]:
+        return dict(conn.execute("SELECT key, value FROM info").fetchall())
+
+    def _load(self):
+        """(Re)build the in-memory columns from index.sqlite3."""
+        conn = self._connection()
+        info = self._info(conn)
+
+        self.dim = int(info["dim"]) if "dim" in info else None
+        self.dtype = info.get("dtype", self._requested_dtype)
+        self._version = int(info.get("version", 0))
+        self._vectors = None
+
+        self._ids: List[Optional[str]] = []
+        self._row_of: Dict[str, int] = {}
+        self._alive = _Column(bool, False)
+        self._scales = _Column(np.float32, 1.0)
+        self._numeric = {field: _Column(np.float32, np.nan) for field in NUMERIC_FIELDS}
+        self._categorical = {field: _Column(np.int32, -1) for field in CATEGORICAL_FIELDS}
+        self._categories = {field: _Categories() for field in CATEGORICAL_FIELDS}
+        self._rows_by_resume: Dict[str, List[int]] = {}
+
+        rows = conn.execute(
+            "SELECT row, id, alive, resume_id, experience, location, scale FROM rows ORDER BY row"
+        ).fetchall()
+        self._reserve(rows[-1][0] + 1 if rows else 0)
+        for row, row_id, alive, resume_id, experience, location, scale in rows:
+            self._set_row(row, row_id, bool(alive), {"resume_id": resume_id,
+                                                     "experience": experience,
+                                                     "location": location}, scale)
+
+        if self.dim is not None and os.path.exists(self._vector_path):
+            self._map()
+
+    def _map(self):
+        itemsize = np.dtype(_DTYPES[self.dtype]).itemsize
+        capacity = os.path.getsize(self._vector_path) // (self.dim * itemsize)
+        self._vectors = np.memmap(
+            self._vector_path, dtype=_DTYPES[self.dtype], mode="r+", shape=(capacity, self.dim)
+        ) if capacity else None
+
+    def _grow_file(self, rows: int):
+        """Make vectors.bin hold at least `rows` rows (doubling, to amortize remaps)."""
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if rows <= capacity:
+            return
+
+        itemsize = np.dtype(_DTYPES[self.dtype]).itemsize
+        new_capacity = max(rows, 2 * capacity, 1024)
+        if self._vectors is not None:
+            self._vectors.flush()
+        with open(self._vector_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * itemsize)
+        self._map()
+
+    def _reserve(self, size: int):
+        for column in (self._alive, self._scales, *self._numeric.values(), *self._categorical.values()):
+            column.reserve(size)
+        if len(self._ids) < size:
+            self._ids.extend([None] * (size - len(self._ids)))
+
+    def _set_row(self, row: int, row_id: str, alive: bool, metadata: Dict, scale: float = 1.0):
+        if self._ids[row] is not None and self._alive.data[row]:
+            self._unlink_resume(row)
+
+        self._ids[row] = row_id
+        self._row_of[row_id] = row
+        self._alive.data[row] = alive
+        self._scales.data[row] = scale
+        for field in NUMERIC_FIELDS:
+            self._numeric[field].data[row] = _numeric(metadata.get(field))
+        for field in CATEGORICAL_FIELDS:
+            self._categorical[field].data[row] = self._categories[field].code(metadata.get(field))
+
+        resume_id = metadata.get("resume_id")
+        if alive and isinstance(resume_id, str):
+            self._rows_by_resume.setdefault(resume_id, []).append(row)
+
+    def _unlink_resume(self, row: int):
+        code = self._categorical["resume_id"].data[row]
+        if code < 0:
+            return
+        rows = self._rows_by_resume.get(self._categories["resume_id"].values[code])
+        if rows and row in rows:
+            rows.remove(row)
+
+    def _refresh(self):
+        """Reload if another process wrote since we last looked (caller holds the lock)."""
+        row = self._connection().execute("SELECT value FROM info WHERE key = 'version'").fetchone()
+        if row is not None and int(row[0]) != self._version:
+            self._load()
+
+    def _begin(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        version = conn.execute("SELECT value FROM info WHERE key = 'version'").fetchone()
+        if version is not None and int(version[0]) != self._version:
+            self._load()
+        return conn
+
+    def _commit(self, conn):
+        self._version += 1
+        conn.execute(
+            "INSERT OR REPLACE INTO info (key, value) VALUES ('version', ?)", (str(self._version),)
+        )
+        conn.execute("COMMIT")
+
+    # ---------- Encoding ----------
+
+    def _encode(self, vectors: np.ndarray):
+        if self.dtype == "int8":
+            scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+
+    def _decode(self, rows: np.ndarray) -> np.ndarray:
+        block = np.asarray(self._vectors[rows], dtype=np.float32)
+        if self.dtype == "int8":
+            block *= self._scales.data[rows][:, None]
+        return block
+
+    # ---------- Filters ----------
+
+    def _mask(self, where: Optional[Dict], size: int) -> np.ndarray:
+        if not where:
+            return np.ones(size, dtype=bool)
+
+        if "$and" in where:
+            mask = np.ones(size, dtype=bool)
+            for clause in where["$and"]:
+                mask &= self._mask(clause, size)
+            return mask
+        if "$or" in where:
+            mask = np.zeros(size, dtype=bool)
+            for clause in where["$or"]:
+                mask |= self._mask(clause, size)
+            return mask
+
+        if len(where) != 1:
+            return self._mask({"$and": [{key: value} for key, value in where.items()]}, size)
+
+        (field, condition), = where.items()
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        (operator, value), = condition.items()
+
+        if field == "resume_id" and operator in ("$eq", "$in"):
+            wanted = [value] if operator == "$eq" else value
+            mask = np.zeros(size, dtype=bool)
+            rows = [row for resume_id in wanted for row in self._rows_by_resume.get(resume_id, ())]
+            if rows:
+                rows = np.asarray(rows)
+                mask[rows[rows < size]] = True
+            return mask
+
+        if field in NUMERIC_FIELDS:
+            column = self._numeric[field].data[:size]
+            if operator == "$in":
+                return np.isin(column, [_numeric(v) for v in value])
+            if operator == "$nin":
+                return ~np.isin(column, [_numeric(v) for v in value])
+            compare = {
+                "$eq": np.equal, "$ne": np.not_equal, "$gt": np.greater,
+                "$gte": np.greater_equal, "$lt": np.less, "$lte": np.less_equal,
+            }.get(operator)
+            if compare is not None:
+                return compare(column, _numeric(value))
+
+        if field in CATEGORICAL_FIELDS:
+            column = self._categorical[field].data[:size]
+            categories = self._categories[field]
+            if operator in ("$eq", "$ne"):
+                mask = column == categories.code(value, add=False)
+                return mask if operator == "$eq" else ~mask
+            if operator in ("$in", "$nin"):
+                mask = np.isin(column, [categories.code(v, add=False) for v in value])
+                return mask if operator == "$in" else ~mask
+
+        raise ValueError(f"Flat index cannot filter on {field} {operator}")
+
+    def _select(self, ids: Optional[List[str]], where: Optional[Dict]) -> np.ndarray:
+        """Live rows matching `ids` and `where`: in the order of `ids` if given, else row order."""
+        size = len(self._ids)
+        mask = self._alive.data[:size] & self._mask(where, size)
+        if ids is not None:
+            rows = np.asarray(
+                [self._row_of[i] for i in dict.fromkeys(ids) if i in self._row_of], dtype=np.int64
+            )
+            return rows[mask[rows]]
+        return np.flatnonzero(mask)
+
+    # ---------- Collection API ----------
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return int(self._alive.data[:len(self._ids)].sum())
+
+    def upsert(
+        self,
+        ids: List[str],
+        embeddings,
+        metadatas: Optional[List[Dict]] = None,
+        documents: Optional[List[str]] = None,
+    ):
+        vectors = _normalized(np.asarray(embeddings, dtype=np.float32))
+        metadatas = metadatas or [{} for _ in ids]
+        documents = documents or [None] * len(ids)
+
+        with self._lock:
+            conn = self._begin()
+            try:
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)",
+                        [("dim", str(self.dim)), ("dtype", self.dtype)],
+                    )
+                elif vectors.shape[1] != self.dim:
+                    raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match {self.dim}")
+
+                rows, new_rows, next_row = [], {}, len(self._ids)
+                for row_id in ids:
+                    row = self._row_of.get(row_id, new_rows.get(row_id))
+                    if row is None:
+                        row = new_rows[row_id] = next_row
+                        next_row += 1
+                    rows.append(row)
+
+                self._reserve(next_row)
+                self._grow_file(next_row)
+
+                encoded, scales = self._encode(vectors)
+                order = np.asarray(rows)
+                self._vectors[order] = encoded
+                self._vectors.flush()
+
+                conn.executemany(
+                    "INSERT OR REPLACE INTO rows "
+                    "(row, id, alive, resume_id, experience, location, scale, document, metadata) "
+                    "VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (row, row_id, *_filter_values(meta), float(scale), document, json.dumps(meta))
+                        for row, row_id, meta, document, scale in zip(rows, ids, metadatas, documents, scales)
+                    ],
+                )
+                self._commit(conn)
+            except Exception:
+                conn.execute("ROLLBACK")
+                self._load()
+                raise
+
+            for row, row_id, meta, scale in zip(rows, ids, metadatas, scales):
+                self._set_row(row, row_id, True, meta, float(scale))
+
+    add = upsert
+
+    def update(self, ids: List[str], metadatas: List[Dict]):
+        """Merge metadata into existing rows; a None value removes the key."""
+        with self._lock:
+            conn = self._begin()
+            try:
+                rows = [self._row_of.get(row_id) for row_id in ids]
+                current = self._metadata([row for row in rows if row is not None], conn)
+
+                updates = []
+                for row, changes in zip(rows, metadatas):
+                    if row is None or not self._alive.data[row]:
+                        continue
+                    merged = {**current.get(row, {}), **changes}
+                    merged = {key: value for key, value in merged.items() if value is not None}
+                    updates.append((row, merged))
+
+                conn.executemany(
+                    "UPDATE rows SET resume_id = ?, experience = ?, location = ?, metadata = ? WHERE row = ?",
+                    [(*_filter_values(meta), json.dumps(meta), row) for row, meta in updates],
+                )
+                self._commit(conn)
+            except Exception:
+                conn.execute("ROLLBACK")
+                self._load()
+                raise
+
+            for row, meta in updates:
+                self._set_row(row, self._ids[row], True, meta, float(self._scales.data[row]))
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None):
+        with self._lock:
+            conn = self._begin()
+            try:
+                rows = self._select(ids, where)
+                conn.executemany(
+                    "UPDATE rows SET alive = 0, document = NULL, metadata = '{}' WHERE row = ?",
+                    [(int(row),) for row in rows],
+                )
+                self._commit(conn)
+            except Exception:
+                conn.execute("ROLLBACK")
+                self._load()
+                raise
+
+            for row in rows:
+                self._unlink_resume(row)
+                self._alive.data[row] = False
+
+    def _metadata(self, rows: Iterable[int], conn=None) -> Dict[int, Dict]:
+        conn = conn or self._connection()
+        rows = [int(row) for row in rows]
+        found = {}
+        for i in range(0, len(rows), _SQL_VARS):
+            part = rows[i:i + _SQL_VARS]
+            found.update(
+                (row, json.loads(metadata))
+                for row, metadata in conn.execute(
+                    f"SELECT row, metadata FROM rows WHERE row IN ({','.join('?' * len(part))})", part
+                )
+            )
+        return found
+
+    def _documents(self, rows: Iterable[int]) -> Dict[int, Optional[str]]:
+        conn = self._connection()
+        rows = [int(row) for row in rows]
+        found = {}
+        for i in range(0, len(rows), _SQL_VARS):
+            part = rows[i:i + _SQL_VARS]
+            found.update(conn.execute(
+                f"SELECT row, document FROM rows WHERE row IN ({','.join('?' * len(part))})", part
+            ).fetchall())
+        return found
+
+    def _records(self, rows: List[int], include) -> Dict:
+        result = {"ids": [self._ids[row] for row in rows], "embeddings": None,
+                  "documents": None, "metadatas": None}
+        if "embeddings" in include:
+            result["embeddings"] = self._decode(np.asarray(rows, dtype=np.int64)).tolist() if rows else []
+        if "documents" in include:
+            documents = self._documents(rows)
+            result["documents"] = [documents.get(row) for row in rows]
+        if "metadatas" in include:
+            metadatas = self._metadata(rows)
+            result["metadatas"] = [metadatas.get(row) for row in rows]
+        return result
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include=("metadatas", "documents"),
+    ) -> Dict:
+        """Matching records; with `ids`, in that order (unknown and deleted ids are skipped)."""
+        with self._lock:
+            self._refresh()
+            rows = self._select(ids, where)
+            if offset:
+                rows = rows[offset:]
+            if limit is not None:
+                rows = rows[:limit]
+            return self._records(rows.tolist(), include)
+
+    def query(
+        self,
+        query_embeddings,
+        n_results: int = 10,
+        where: Optional[Dict] = None,
+        include=("metadatas", "documents", "distances"),
+    ) -> Dict:
+        with self._lock:
+            self._refresh()
+            return self._query(query_embeddings, n_results, where, include)
+
+    def _query(self, query_embeddings, n_results: int, where: Optional[Dict], include) -> Dict:
+        queries = _normalized(np.asarray(query_embeddings, dtype=np.float32))
+        rows = self._select(None, where)
+
+        k = min(n_results, len(rows))
+        best_scores = np.full((0, len(queries)), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((0, len(queries)), dtype=np.int64)
+
+        # Contiguous slices when nothing is filtered out, gathered rows otherwise
+        contiguous = len(rows) > 0 and rows[-1] - rows[0] + 1 == len(rows)
+
+        for start in range(0, len(rows), VECTOR_FLAT_BLOCK_ROWS):
+            block_rows = rows[start:start + VECTOR_FLAT_BLOCK_ROWS]
+            if contiguous:
+                block = self._vectors[block_rows[0]:block_rows[-1] + 1]
+            else:
+                block = self._vectors[block_rows]
+
+            # Cache-sized blocks: the dtype conversion is the expensive part
+            block_scores = np.asarray(block, dtype=np.float32) @ queries.T
+            if self.dtype == "int8":
+                block_scores *= self._scales.data[block_rows][:, None]
+
+            scores = np.vstack([best_scores, block_scores])
+            candidates = np.vstack([best_rows, np.repeat(block_rows[:, None], len(queries), axis=1)])
+            if len(scores) > k:
+                keep = np.argpartition(-scores, k - 1, axis=0)[:k]
+                scores = np.take_along_axis(scores, keep, axis=0)
+                candidates = np.take_along_axis(candidates, keep, axis=0)
+            best_scores, best_rows = scores, candidates
+
+        order = np.argsort(-best_scores, axis=0)
+        best_scores = np.take_along_axis(best_scores, order, axis=0)
+        best_rows = np.take_along_axis(best_rows, order, axis=0)
+
+        results = {"ids": [], "distances": [], "documents": None, "metadatas": None, "embeddings": None}
+        wanted = set(best_rows.ravel().tolist())
+        documents = self._documents(wanted) if "documents" in include else None
+        metadatas = self._metadata(wanted) if "metadatas" in include else None
+        if documents is not None:
+            results["documents"] = []
+        if metadatas is not None:
+            results["metadatas"] = []
+
+        for column in range(len(queries)):
+            column_rows = best_rows[:, column].tolist()
+            results["ids"].append([self._ids[row] for row in column_rows])
+            results["distances"].append((1.0 - best_scores[:, column]).tolist())
+            if documents is not None:
+                results["documents"].append([documents.get(row) for row in column_rows])
+            if metadatas is not None:
+                results["metadatas"].append([metadatas.get(row) for row in column_rows])
+
+        return results
+
+
+def drop(path: str):
+    shutil.rmtree(path, ignore_errors=True)
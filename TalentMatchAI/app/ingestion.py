@@ -1,10 +1,16 @@
+import argparse
 import uuid
 import json
-from typing import List, Dict
+from collections import deque
+from typing import Callable, List, Dict, Optional, Tuple
+import numpy as np
 from tqdm import tqdm
-from .vectorstore import collection
+from .vectorstore import active_generation, get_collection, get_resume_collection
 from .utils import chunk_text
-from .embeddings import get_embedding
+from .embeddings import iter_embeddings
+from .search_cache import bump_collection_version
+from .metrics import CHUNKS_INDEXED, RESUMES, stage, timed_iter
+from . import candidates, dedup, skill_index
 
 BATCH_SIZE = 100
 
@@ -27,47 +33,334 @@ def sanitize_metadata(metadata: Dict) -> Dict:
     return cleaned
 
 
-def ingest_bulk_resumes(resume_texts: List[str], metadatas: List[Dict]):
+def plan_resumes(resume_texts: List[str]) -> List[Dict]:
+    """
+    Dedup stage, run before anything is embedded.
+    - exact duplicates (same normalized text) of indexed resumes are skipped
+    - near duplicates (MinHash/LSH) reuse the existing resume_id; the old
+      version stays searchable until the new one is written over it
+    Returns one decision per input resume:
+    {"status": new | updated | duplicate | superseded, "resume_id", "content_hash"}
+    """
+    with stage("ingest.dedup"):
+        decisions = _plan(resume_texts)
+    for decision in decisions:
+        RESUMES.labels(decision["status"]).inc()
+    return decisions
+
+
+def _plan(resume_texts: List[str]) -> List[Dict]:
+    decisions = []
+    planned = {}  # resume_id -> position of its latest version in this batch
+    seen = set()
+
+    for resume_text in resume_texts:
+
+        text_hash = dedup.content_hash(resume_text)
+        if text_hash in seen:
+            decisions.append({"status": "duplicate", "resume_id": None, "content_hash": text_hash})
+            continue
+        seen.add(text_hash)
+
+        existing = dedup.find_exact(text_hash)
+        if existing and existing[1]:
+            decisions.append({"status": "duplicate", "resume_id": existing[0], "content_hash": text_hash})
+            continue
+
+        signature = dedup.minhash_signature(resume_text)
+
+        if existing:
+            # Registered by an ingest that never finished: redo it
+            resume_id, status = existing[0], "new"
+        else:
+            resume_id = dedup.find_near_duplicate(signature)
+            if resume_id:
+                status = "updated"
+            else:
+                resume_id, status = str(uuid.uuid4()), "new"  # ONE ID per resume
+
+        dedup.register(text_hash, resume_id, signature)
+
+        # A later version in the same batch wins
+        if resume_id in planned:
+            decisions[planned[resume_id]]["status"] = "superseded"
+        planned[resume_id] = len(decisions)
+
+        decisions.append({"status": status, "resume_id": resume_id, "content_hash": text_hash})
+
+    return decisions
+
+
+def summarize(decisions: List[Dict]) -> Dict:
+    summary = {"indexed": 0, "duplicates": 0, "updated": 0}
+    for decision in decisions:
+        if decision["status"] == "new":
+            summary["indexed"] += 1
+        elif decision["status"] == "updated":
+            summary["updated"] += 1
+        else:
+            summary["duplicates"] += 1
+    return summary
+
+
+def _iter_chunks(entries: List[Tuple], generation: Dict):
+    """
+    Yield (chunk, metadata, chunk_id, resume_id, chunk_index) for every chunk
+    still to be written. Chunk ids are derived from the resume_id so
+    re-ingesting is idempotent and an interrupted resume can skip ahead.
+    """
+    for resume_id, resume_text, metadata, start_chunk in entries:
+
+        # Chunks only carry resume_id and filter fields; the rest lives in the candidate store
+        metadata_cleaned = sanitize_metadata(candidates.filter_metadata(resume_id, metadata))
+
+        for index, chunk in enumerate(chunk_text(resume_text, generation)):
+            if index >= start_chunk:
+                yield chunk, metadata_cleaned, f"{resume_id}-{index}", resume_id, index
+
+
+def count_chunks(resume_text: str) -> int:
+    return len(chunk_text(resume_text))
+
+
+def _pooled_vectors(sums: Dict[str, np.ndarray], counts: Dict[str, int]) -> Dict[str, List[float]]:
+    pooled = {}
+    for resume_id, total in sums.items():
+        mean = total / counts[resume_id]
+        pooled[resume_id] = (mean / max(np.linalg.norm(mean), 1e-12)).tolist()
+    return pooled
+
+
+def upsert_resume_vectors(
+    entries: List[Tuple],
+    sums: Dict[str, np.ndarray],
+    counts: Dict[str, int],
+    generation: Optional[Dict] = None
+):
+    """
+    Write one mean-pooled vector per resume to the resume-level collection.
+    Chunks written by an earlier attempt (start_chunk > 0) are read back
+    from the chunk collection so the mean covers the whole resume.
+    """
+    generation = generation or active_generation()
+    collection = get_collection(generation)
+    resume_collection = get_resume_collection(generation)
+
+    for resume_id, _, _, start_chunk in entries:
+        if start_chunk <= 0:
+            continue
+        existing = collection.get(
+            ids=[f"{resume_id}-{index}" for index in range(start_chunk)],
+            include=["embeddings"]
+        )
+        for emb in existing.get("embeddings") or []:
+            sums[resume_id] = sums.get(resume_id, 0) + np.asarray(emb, dtype=np.float32)
+            counts[resume_id] = counts.get(resume_id, 0) + 1
+
+    pooled = _pooled_vectors(sums, counts)
+    metadata_by_id = {
+        resume_id: sanitize_metadata(candidates.filter_metadata(resume_id, metadata))
+        for resume_id, _, metadata, _ in entries
+    }
+
+    resume_ids = [resume_id for resume_id in metadata_by_id if resume_id in pooled]
+    for i in range(0, len(resume_ids), BATCH_SIZE):
+        batch = resume_ids[i:i + BATCH_SIZE]
+        resume_collection.upsert(
+            ids=batch,
+            embeddings=[pooled[resume_id] for resume_id in batch],
+            metadatas=[metadata_by_id[resume_id] for resume_id in batch]
+        )
+
+
+def _drop_stale_chunks(collection, totals: Dict[str, int]):
+    """
+    Delete chunks of earlier versions: any chunk of these resumes other
+    than the `totals[resume_id]` chunks just written.
+    """
+    resume_ids = list(totals)
+    for i in range(0, len(resume_ids), BATCH_SIZE):
+        batch = resume_ids[i:i + BATCH_SIZE]
+        current = {f"{resume_id}-{index}" for resume_id in batch for index in range(totals[resume_id])}
+        found = collection.get(where={"resume_id": {"$in": batch}}, include=[])
+        stale = [chunk_id for chunk_id in found["ids"] if chunk_id not in current]
+        if stale:
+            collection.delete(ids=stale)
+
+
+def write_vectors(
+    entries: List[Tuple],
+    generation: Dict,
+    on_progress: Optional[Callable[[str, int], None]] = None
+):
+    """
+    Chunk, embed and upsert resumes into the collections of `generation`
+    (with its chunking strategy and embedding model), then write their
+    pooled resume-level vectors. Chunks left over from a previous version
+    of a resume are deleted only once the new ones are written.
+    `entries` holds (resume_id, resume_text, metadata, start_chunk) tuples.
+    After every collection write, `on_progress(resume_id, chunks_done)` is
+    called for each resume touched by that write.
+    """
+    collection = get_collection(generation)
+
+    # Chunks per resume once this write is done (earlier attempts wrote the first start_chunk)
+    totals = {resume_id: start_chunk for resume_id, _, _, start_chunk in entries}
+    # Chunks handed to the embedding engine whose vectors have not come back yet:
+    # chunking is lazy, so only the batches in flight are held, not the whole import
+    pending = deque()
+
+    def feed():
+        for record in timed_iter("ingest.chunk", _iter_chunks(entries, generation)):
+            pending.append(record)
+            _, _, _, resume_id, index = record
+            totals[resume_id] = max(totals[resume_id], index + 1)
+            yield record[0]
 
     documents = []
     metadata_batch = []
     embeddings = []
     ids = []
+    written = {}
+
+    # Running per-resume sums for the pooled resume vectors
+    sums = {}
+    counts = {}
 
-    for resume_text, metadata in tqdm(zip(resume_texts, metadatas)):
+    def flush():
+        with stage("ingest.write"):
+            collection.upsert(
+                documents=documents,
+                metadatas=metadata_batch,
+                embeddings=embeddings,
+                ids=ids
+            )
+        CHUNKS_INDEXED.inc(len(ids))
+        if on_progress:
+            for resume_id, chunks_done in written.items():
+                on_progress(resume_id, chunks_done)
+        documents.clear()
+        metadata_batch.clear()
+        embeddings.clear()
+        ids.clear()
+        written.clear()
 
-        resume_id = str(uuid.uuid4())  # ONE ID per resume
-        chunks = chunk_text(resume_text)
+    with tqdm(unit="chunk") as progress:
 
-        for chunk in chunks:
-            emb = get_embedding(chunk)
+        # Embedding engine yields vectors batch by batch, in chunk order
+        for batch_embeddings in timed_iter("ingest.embed", iter_embeddings(
+            feed(), generation["embedding_model"]
+        )):
 
-            # Copy metadata and attach resume_id
-            metadata_with_id = metadata.copy()
-            metadata_with_id["resume_id"] = resume_id
+            for emb in batch_embeddings:
+                chunk, metadata, chunk_id, resume_id, index = pending.popleft()
+                documents.append(chunk)
+                metadata_batch.append(metadata)
+                embeddings.append(emb)
+                ids.append(chunk_id)
+                written[resume_id] = index + 1
 
-            # 🔥 SANITIZE BEFORE STORING
-            metadata_cleaned = sanitize_metadata(metadata_with_id)
+                sums[resume_id] = sums.get(resume_id, 0) + np.asarray(emb, dtype=np.float32)
+                counts[resume_id] = counts.get(resume_id, 0) + 1
 
-            documents.append(chunk)
-            metadata_batch.append(metadata_cleaned)
-            embeddings.append(emb)
-            ids.append(str(uuid.uuid4()))  # unique chunk id
+                if len(documents) >= BATCH_SIZE:
+                    flush()
 
-            if len(documents) >= BATCH_SIZE:
-                collection.add(
-                    documents=documents,
-                    metadatas=metadata_batch,
-                    embeddings=embeddings,
-                    ids=ids
-                )
-                documents, metadata_batch, embeddings, ids = [], [], [], []
+            progress.update(len(batch_embeddings))
 
     # Add remaining batch
     if documents:
-        collection.add(
-            documents=documents,
-            metadatas=metadata_batch,
-            embeddings=embeddings,
-            ids=ids
+        flush()
+
+    with stage("ingest.resume_vectors"):
+        upsert_resume_vectors(entries, sums, counts, generation)
+
+    with stage("ingest.write"):
+        _drop_stale_chunks(collection, totals)
+
+
+def index_resumes(
+    entries: List[Tuple],
+    on_progress: Optional[Callable[[str, int], None]] = None
+):
+    """
+    Store the candidates' metadata and text, write their chunks and pooled
+    vectors to the active collection, then record their skills in the
+    skill index. Arguments as for `write_vectors`.
+    """
+    with stage("ingest.index"):
+        candidates.upsert_candidates(
+            ((resume_id, metadata) for resume_id, _, metadata, _ in entries),
+            texts={resume_id: resume_text for resume_id, resume_text, _, _ in entries},
+        )
+
+        write_vectors(entries, active_generation(), on_progress)
+
+        # Skill bitmaps only after the chunks are searchable
+        skill_index.index_skills(
+            (resume_id, metadata.get("skills")) for resume_id, _, metadata, _ in entries
         )
+
+
+def ingest_bulk_resumes(resume_texts: List[str], metadatas: List[Dict]) -> Dict:
+    """
+    Dedup, chunk, embed and index resumes.
+    Returns counts of indexed, duplicate and updated resumes.
+    """
+    try:
+        decisions = plan_resumes(resume_texts)
+
+        index_resumes([
+            (decision["resume_id"], resume_text, metadata, 0)
+            for decision, resume_text, metadata in zip(decisions, resume_texts, metadatas)
+            if decision["status"] in ("new", "updated")
+        ])
+        dedup.mark_indexed(decision["content_hash"] for decision in decisions)
+    finally:
+        # Cached /search results no longer reflect the collection
+        bump_collection_version()
+
+    return summarize(decisions)
+
+
+def backfill_resume_vectors(batch_size: int = 5000):
+    """Build resume-level vectors for chunks indexed before they existed."""
+    sums, counts, metadatas = {}, {}, {}
+    offset = 0
+    collection = get_collection()
+
+    while True:
+        page = collection.get(include=["embeddings", "metadatas"], limit=batch_size, offset=offset)
+        ids = page.get("ids") or []
+        if not ids:
+            break
+
+        for emb, meta in zip(page["embeddings"], page["metadatas"]):
+            resume_id = meta.get("resume_id")
+            if not resume_id:
+                continue
+            sums[resume_id] = sums.get(resume_id, 0) + np.asarray(emb, dtype=np.float32)
+            counts[resume_id] = counts.get(resume_id, 0) + 1
+            metadatas[resume_id] = meta
+        offset += len(ids)
+
+    upsert_resume_vectors(
+        [(resume_id, None, meta, 0) for resume_id, meta in metadatas.items()],
+        sums,
+        counts
+    )
+    return len(metadatas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index maintenance")
+    parser.add_argument("--backfill-resume-vectors", action="store_true",
+                        help="build resume-level vectors from the existing chunks")
+    args = parser.parse_args()
+
+    if args.backfill_resume_vectors:
+        print(f"Backfilled {backfill_resume_vectors()} resume vectors")
+
+
+if __name__ == "__main__":
+    main()
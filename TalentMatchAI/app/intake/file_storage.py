@@ -1,24 +1,313 @@
+"""
+Content-addressed resume file store.
+
+Files are stored once per SHA-256 as UPLOAD_DIR/ab/cd/<sha256>.<ext>.
+They are hashed while being copied in UPLOAD_CHUNK_BYTES pieces to a
+temporary file, which is renamed into place only when complete. A
+manifest table in METADATA_DB_PATH records each file and the job item
+that ingested it, so a file that is already stored and queued or
+indexed is refused before anything parses or embeds it again.
+
+    python -m app.intake.file_storage lookup SHA256 [...]
+    python -m app.intake.file_storage verify [--fix]
+    python -m app.intake.file_storage gc [--unreferenced --older-than DAYS] [--dry-run]
+"""
+import argparse
+import hashlib
+import io
 import os
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
 from uuid import uuid4
+from ..config import UPLOAD_DIR as CONFIGURED_UPLOAD_DIR, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_BYTES
+from ..db import get_connection, ensure_schema
+
+UPLOAD_DIR = CONFIGURED_UPLOAD_DIR or "uploads"
+TMP_DIR = os.path.join(UPLOAD_DIR, "tmp")
+
+SUPPORTED_EXTENSIONS = {"pdf", "docx"}
 
-UPLOAD_DIR = "uploads"
+# Partial writes older than this are left over from a crash
+STALE_PART_SECONDS = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_files (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    original_name TEXT,
+    job_id TEXT,
+    item_index INTEGER,
+    created_at REAL NOT NULL
+);
+"""
 
 # Ensure upload directory exists
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+os.makedirs(TMP_DIR, exist_ok=True)
+
+
+class UploadRejected(ValueError):
+    """Raised when an uploaded file is refused (type or size)."""
+
+
+@dataclass
+class StoredFile:
+    sha256: str
+    path: str
+    size: int
+    # Same content is already stored and queued or indexed
+    duplicate: bool = False
+    job_id: Optional[str] = None
+    item_index: Optional[int] = None
+
+
+def _connection():
+    ensure_schema(SCHEMA)
+    return get_connection()
+
+
+def _extension(original_filename: str) -> str:
+    name = original_filename or ""
+    return name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+
+def shard_path(sha256: str, extension: str) -> str:
+    return os.path.join(UPLOAD_DIR, sha256[:2], sha256[2:4], f"{sha256}.{extension}")
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ---------- Manifest ----------
+
+def lookup(hashes: Iterable[str]) -> Dict[str, Dict]:
+    """{sha256: manifest row} for the stored files among `hashes`."""
+    hashes = list(dict.fromkeys(hashes))
+    columns = ("sha256", "path", "size", "original_name", "job_id", "item_index", "created_at")
+    found = {}
+    for i in range(0, len(hashes), 500):
+        page = hashes[i:i + 500]
+        rows = _connection().execute(
+            f"SELECT {', '.join(columns)} FROM upload_files WHERE sha256 IN ({','.join('?' * len(page))})",
+            page,
+        ).fetchall()
+        found.update((row[0], dict(zip(columns, row))) for row in rows)
+    return found
+
+
+def _iter_manifest(batch_size: int = 1000) -> Iterator[List[Dict]]:
+    after = ""
+    while True:
+        rows = _connection().execute(
+            "SELECT sha256, path, size, job_id, item_index, created_at FROM upload_files "
+            "WHERE sha256 > ? ORDER BY sha256 LIMIT ?",
+            (after, batch_size),
+        ).fetchall()
+        if not rows:
+            return
+        yield [dict(zip(("sha256", "path", "size", "job_id", "item_index", "created_at"), row))
+               for row in rows]
+        after = rows[-1][0]
+
+
+def link(sha256: str, job_id: str, item_index: int):
+    """Record the job item that ingests a stored file."""
+    conn = _connection()
+    conn.execute(
+        "UPDATE upload_files SET job_id = ?, item_index = ? WHERE sha256 = ?",
+        (job_id, item_index, sha256),
+    )
+    conn.commit()
+
+
+def _remove(hashes: List[str]):
+    conn = _connection()
+    conn.executemany("DELETE FROM upload_files WHERE sha256 = ?", [(h,) for h in hashes])
+    conn.commit()
+
 
+def _live(row: Dict) -> bool:
+    """Whether the item that ingested this file is still queued, running or done."""
+    from .. import jobs
 
-def save_file(file_bytes: bytes, original_filename: str) -> str:
+    if row["job_id"] is None:
+        return False
+    item = jobs.get_item(row["job_id"], row["item_index"])
+    return item is not None and item["status"] != "failed"
+
+
+# ---------- Writes ----------
+
+def store_stream(source: BinaryIO, original_filename: str) -> StoredFile:
+    """
+    Copy an uploaded file into the store, hashing it on the way.
+    Blocking: call it off the event loop.
+    """
+    extension = _extension(original_filename)
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise UploadRejected(f"Unsupported file type: {original_filename}")
+
+    digest = hashlib.sha256()
+    partial_path = os.path.join(TMP_DIR, f"{uuid4()}.part")
+    written = 0
+
+    try:
+        with open(partial_path, "wb") as f:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > MAX_UPLOAD_BYTES:
+                    raise UploadRejected(
+                        f"{original_filename} is larger than {MAX_UPLOAD_BYTES} bytes"
+                    )
+                digest.update(chunk)
+                f.write(chunk)
+
+        sha256 = digest.hexdigest()
+        existing = lookup([sha256]).get(sha256)
+        if existing and os.path.exists(existing["path"]):
+            os.remove(partial_path)
+            return StoredFile(sha256, existing["path"], existing["size"], duplicate=_live(existing),
+                              job_id=existing["job_id"], item_index=existing["item_index"])
+
+        path = shard_path(sha256, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(partial_path, path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    conn = _connection()
+    conn.execute(
+        "INSERT OR REPLACE INTO upload_files (sha256, path, size, original_name, created_at) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (sha256, path, written, original_filename, time.time()),
+    )
+    conn.commit()
+    return StoredFile(sha256, path, written)
+
+
+def store_bytes(file_bytes: bytes, original_filename: str) -> StoredFile:
+    return store_stream(io.BytesIO(file_bytes), original_filename)
+
+
+# ---------- Maintenance ----------
+
+def verify(fix: bool = False) -> Dict[str, List[str]]:
+    """Re-hash every stored file; with `fix`, drop rows whose file is missing or corrupt."""
+    missing, corrupt = [], []
+    for rows in _iter_manifest():
+        for row in rows:
+            if not os.path.exists(row["path"]):
+                missing.append(row["sha256"])
+            elif file_hash(row["path"]) != row["sha256"]:
+                corrupt.append(row["sha256"])
+
+    if fix:
+        for sha256 in corrupt:
+            os.remove(lookup([sha256])[sha256]["path"])
+        _remove(missing + corrupt)
+    return {"missing": missing, "corrupt": corrupt}
+
+
+def _candidate_paths() -> set:
+    from ..candidates import iter_candidates
+
+    return {
+        metadata.get("file_path")
+        for page in iter_candidates()
+        for _, metadata in page
+        if metadata.get("file_path")
+    }
+
+
+def gc(unreferenced: bool = False, older_than: float = 7 * 86400, dry_run: bool = False) -> Dict[str, int]:
     """
-    Save resume file to local storage.
-    Returns stored file path.
+    Delete stale partial writes, shard files missing from the manifest and
+    manifest rows whose file is gone. With `unreferenced`, also delete
+    files older than `older_than` seconds that no live job item or
+    candidate points at.
     """
+    now = time.time()
+    known, removed_rows, removed_files = set(), [], []
+    referenced = _candidate_paths() if unreferenced else set()
+
+    for rows in _iter_manifest():
+        for row in rows:
+            if not os.path.exists(row["path"]):
+                removed_rows.append(row["sha256"])
+            elif (
+                unreferenced
+                and now - row["created_at"] > older_than
+                and row["path"] not in referenced
+                and not _live(row)
+            ):
+                removed_rows.append(row["sha256"])
+                removed_files.append(row["path"])
+            else:
+                known.add(os.path.abspath(row["path"]))
+
+    for name in os.listdir(TMP_DIR):
+        path = os.path.join(TMP_DIR, name)
+        if now - os.path.getmtime(path) > STALE_PART_SECONDS:
+            removed_files.append(path)
+
+    # Only the two-level shard directories belong to the store
+    doomed = {os.path.abspath(path) for path in removed_files}
+    for first in os.listdir(UPLOAD_DIR):
+        first_path = os.path.join(UPLOAD_DIR, first)
+        if len(first) != 2 or not os.path.isdir(first_path):
+            continue
+        for root, _, names in os.walk(first_path):
+            for name in names:
+                path = os.path.abspath(os.path.join(root, name))
+                if path not in known and path not in doomed:
+                    removed_files.append(path)
+
+    if not dry_run:
+        for path in removed_files:
+            if os.path.exists(path):
+                os.remove(path)
+        _remove(removed_rows)
+    return {"rows_removed": len(removed_rows), "files_removed": len(removed_files)}
+
 
-    file_extension = original_filename.split(".")[-1]
-    new_filename = f"{uuid4()}.{file_extension}"
+def main():
+    parser = argparse.ArgumentParser(description="Resume file store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    find = commands.add_parser("lookup", help="show manifest rows for SHA-256 hashes")
+    find.add_argument("hashes", nargs="+")
+    check = commands.add_parser("verify", help="re-hash every stored file")
+    check.add_argument("--fix", action="store_true", help="drop missing or corrupt files")
+    collect = commands.add_parser("gc", help="delete orphaned and unreferenced files")
+    collect.add_argument("--unreferenced", action="store_true")
+    collect.add_argument("--older-than", type=float, default=7, help="days (with --unreferenced)")
+    collect.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
 
-    file_path = os.path.join(UPLOAD_DIR, new_filename)
+    if args.command == "lookup":
+        found = lookup(args.hashes)
+        for sha256 in args.hashes:
+            print(found.get(sha256) or f"{sha256}: not stored")
+    elif args.command == "verify":
+        result = verify(args.fix)
+        print(f"missing {len(result['missing'])}, corrupt {len(result['corrupt'])}")
+        for sha256 in result["missing"] + result["corrupt"]:
+            print(f"  {sha256}")
+    else:
+        result = gc(args.unreferenced, args.older_than * 86400, args.dry_run)
+        print(f"{'would remove' if args.dry_run else 'removed'} "
+              f"{result['files_removed']} files, {result['rows_removed']} manifest rows")
 
-    with open(file_path, "wb") as f:
-        f.write(file_bytes)
 
-    return file_path
+if __name__ == "__main__":
+    main()
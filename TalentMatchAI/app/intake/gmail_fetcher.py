@@ -1,11 +1,33 @@
+"""
+Gmail resume intake.
+
+The first run lists unread messages in GMAIL_RESUME_LABEL; every later
+run asks the History API only for messages added to the label since the
+stored `historyId` checkpoint (falling back to a full listing when Gmail
+no longer has that much history). Messages are fetched in batched HTTP
+requests as part metadata only, and attachments are downloaded by id,
+also batched, instead of decoding each message's raw MIME. Downloaded
+message ids are recorded, so a message is never ingested twice.
+
+`fetch_resume_emails` is a generator: each attachment is handed to the
+intake pipeline as soon as it is in the file store. Attachments whose
+content is already stored and ingested are skipped.
+
+GMAIL_API_ROOT points the client at another endpoint without OAuth, such
+as the fake server in benchmarks/fake_gmail.py.
+"""
 import os
 import base64
-from email import message_from_bytes
+import json
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from .file_storage import save_file
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.errors import HttpError
+from .file_storage import store_bytes, StoredFile, SUPPORTED_EXTENSIONS
+from ..db import get_connection, ensure_schema
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,12 +38,43 @@ BASE_DIR = os.path.dirname(__file__)
 CREDENTIALS_FILE = os.path.join(BASE_DIR, "credentials.json")
 TOKEN_FILE = os.path.join(BASE_DIR, "token.json")
 
-MAX_RESULTS = int(os.getenv("GMAIL_MAX_RESULTS", 20))
+# Page size for message and history listings
+MAX_RESULTS = int(os.getenv("GMAIL_MAX_RESULTS", 100))
 RESUME_LABEL = os.getenv("GMAIL_RESUME_LABEL", "Resume Inbox")
+# API calls per batched HTTP request (Gmail allows 100; 50 avoids rate limiting)
+BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", 50))
+# Attachment bytes held in memory per batch before they are written out
+BATCH_BYTES = int(os.getenv("GMAIL_BATCH_BYTES", 25 * 1024 * 1024))
+API_ROOT = os.getenv("GMAIL_API_ROOT")
+
+# Only what is needed to find attachments, three MIME levels deep
+_PART = "partId,filename,body/attachmentId,body/size"
+MESSAGE_FIELDS = f"id,historyId,payload({_PART},parts({_PART},parts({_PART},parts({_PART}))))"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS gmail_sync (
+    label_id TEXT PRIMARY KEY,
+    history_id TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS gmail_messages (
+    message_id TEXT PRIMARY KEY,
+    files INTEGER NOT NULL,
+    processed_at REAL NOT NULL
+);
+"""
 
 
 def get_gmail_service():
     """Authenticate and return Gmail service"""
+    if API_ROOT:
+        import httplib2
+        from googleapiclient.discovery_cache import get_static_doc
+
+        document = json.loads(get_static_doc("gmail", "v1"))
+        document["rootUrl"] = API_ROOT.rstrip("/") + "/"
+        return build_from_document(document, http=httplib2.Http())
+
     creds = None
 
     try:
@@ -46,47 +99,212 @@ def get_gmail_service():
         raise RuntimeError(f"Gmail authentication failed: {str(e)}")
 
 
-def fetch_resume_emails():
+# ---------- Sync state ----------
+
+def _connection():
+    ensure_schema(SCHEMA)
+    return get_connection()
+
+
+def get_checkpoint(label_id: str) -> Optional[str]:
+    row = _connection().execute(
+        "SELECT history_id FROM gmail_sync WHERE label_id = ?", (label_id,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def _save_checkpoint(label_id: str, history_id: str):
+    conn = _connection()
+    conn.execute(
+        "INSERT OR REPLACE INTO gmail_sync (label_id, history_id, updated_at) VALUES (?, ?, ?)",
+        (label_id, str(history_id), time.time()),
+    )
+    conn.commit()
+
+
+def _processed(message_ids: List[str]) -> set:
+    found = set()
+    for i in range(0, len(message_ids), 500):
+        page = message_ids[i:i + 500]
+        found.update(row[0] for row in _connection().execute(
+            f"SELECT message_id FROM gmail_messages WHERE message_id IN ({','.join('?' * len(page))})",
+            page,
+        ))
+    return found
+
+
+def _mark_processed(message_id: str, files: int):
+    conn = _connection()
+    conn.execute(
+        "INSERT OR REPLACE INTO gmail_messages (message_id, files, processed_at) VALUES (?, ?, ?)",
+        (message_id, files, time.time()),
+    )
+    conn.commit()
+
+
+# ---------- API calls ----------
+
+def _execute_batch(service, requests: Dict[str, object], missing_ok: bool = False) -> Dict[str, dict]:
     """
-    Fetch unread PDF resumes from configured Gmail label
-    and store them locally.
+    Run {key: request} as one batched HTTP request; {key: response}.
+    With `missing_ok`, requests answered 404 (e.g. deleted mail) are left out.
     """
-    service = get_gmail_service()
-    query = f'label:"{RESUME_LABEL}" is:unread has:attachment filename:pdf'
-    
-    try:
-        results = service.users().messages().list(
+    responses, errors = {}, {}
+
+    def collect(request_id, response, exception):
+        if exception is None:
+            responses[request_id] = response
+        elif not (missing_ok and isinstance(exception, HttpError) and exception.resp.status == 404):
+            errors[request_id] = exception
+
+    batch = service.new_batch_http_request(callback=collect)
+    for key, request in requests.items():
+        batch.add(request, request_id=key)
+    batch.execute()
+
+    if errors:
+        key, error = next(iter(errors.items()))
+        raise RuntimeError(f"Gmail request {key} failed: {error}")
+    return responses
+
+
+def _label_id(service) -> str:
+    labels = service.users().labels().list(userId="me").execute().get("labels", [])
+    for label in labels:
+        if label["name"] == RESUME_LABEL:
+            return label["id"]
+    raise RuntimeError(f"Gmail label not found: {RESUME_LABEL}")
+
+
+def _listed_ids(service, label_id: str) -> List[str]:
+    """Full sync: every unread message with an attachment in the label."""
+    ids, page_token = [], None
+    while True:
+        page = service.users().messages().list(
             userId="me",
-            q=query,
+            labelIds=[label_id],
+            q="is:unread has:attachment",
             maxResults=MAX_RESULTS,
+            pageToken=page_token,
         ).execute()
-        print(results)
-        messages = results.get("messages", [])
-        stored_files = []
+        ids.extend(message["id"] for message in page.get("messages", []))
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            return ids
+
 
-        for msg in messages:
-            msg_data = service.users().messages().get(
+def _history_ids(service, label_id: str, start: str) -> Optional[Tuple[List[str], str]]:
+    """(message ids added to the label since `start`, latest historyId); None if expired."""
+    ids, page_token, latest = [], None, start
+    while True:
+        try:
+            page = service.users().history().list(
                 userId="me",
-                id=msg["id"],
-                format="raw",
+                startHistoryId=start,
+                labelId=label_id,
+                historyTypes=["messageAdded", "labelAdded"],
+                maxResults=MAX_RESULTS,
+                pageToken=page_token,
             ).execute()
+        except HttpError as e:
+            if e.resp.status == 404:
+                return None
+            raise
 
-            raw_msg = base64.urlsafe_b64decode(msg_data["raw"])
-            email_message = message_from_bytes(raw_msg)
+        for record in page.get("history", []):
+            for added in record.get("messagesAdded", []) + record.get("labelsAdded", []):
+                if label_id in added["message"].get("labelIds", [label_id]):
+                    ids.append(added["message"]["id"])
+        latest = page.get("historyId", latest)
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            return ids, latest
 
-            for part in email_message.walk():
-                if (
-                    part.get_content_disposition() == "attachment"
-                    and part.get_filename()
-                ):
-                    filename = part.get_filename()
 
-                    if filename.lower().endswith(".pdf"):
-                        file_bytes = part.get_payload(decode=True)
-                        saved_path = save_file(file_bytes, filename)
-                        stored_files.append(saved_path)
+def _attachments(payload: dict) -> List[Tuple[str, str, int]]:
+    """(filename, attachmentId, size) of resume files anywhere in a message."""
+    found, stack = [], [payload]
+    while stack:
+        part = stack.pop()
+        stack.extend(reversed(part.get("parts", [])))
+        filename = part.get("filename") or ""
+        extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+        body = part.get("body", {})
+        if body.get("attachmentId") and extension in SUPPORTED_EXTENSIONS:
+            found.append((filename, body["attachmentId"], body.get("size", 0)))
+    return found
 
-        return stored_files
 
-    except Exception as e:
+def _pack(wanted: List[tuple]) -> Iterator[List[tuple]]:
+    batch, size = [], 0
+    for entry in wanted:
+        if batch and (len(batch) >= BATCH_SIZE or size + entry[-1] > BATCH_BYTES):
+            yield batch
+            batch, size = [], 0
+        batch.append(entry)
+        size += entry[-1]
+    if batch:
+        yield batch
+
+
+# ---------- Intake ----------
+
+def _download(service, message_ids: List[str]) -> Iterator[StoredFile]:
+    messages = service.users().messages()
+    for i in range(0, len(message_ids), BATCH_SIZE):
+        ids = message_ids[i:i + BATCH_SIZE]
+        found = _execute_batch(service, {
+            message_id: messages.get(userId="me", id=message_id, format="full", fields=MESSAGE_FIELDS)
+            for message_id in ids
+        }, missing_ok=True)
+
+        wanted = [
+            (message_id, filename, attachment_id, size)
+            for message_id in ids if message_id in found
+            for filename, attachment_id, size in _attachments(found[message_id].get("payload", {}))
+        ]
+        saved = {message_id: 0 for message_id in ids}
+        for batch in _pack(wanted):
+            data = _execute_batch(service, {
+                str(n): messages.attachments().get(userId="me", messageId=message_id, id=attachment_id)
+                for n, (message_id, _, attachment_id, _) in enumerate(batch)
+            })
+            for n, (message_id, filename, _, _) in enumerate(batch):
+                stored = store_bytes(base64.urlsafe_b64decode(data[str(n)]["data"]), filename)
+                if not stored.duplicate:
+                    yield stored
+                    saved[message_id] += 1
+
+        # Reached only after the caller has taken every file of these messages
+        for message_id in ids:
+            _mark_processed(message_id, saved[message_id])
+
+
+def fetch_resume_emails() -> Iterator[StoredFile]:
+    """
+    Download resume attachments that arrived in the configured Gmail
+    label since the last run, yielding each newly stored file.
+    """
+    service = get_gmail_service()
+
+    try:
+        label_id = _label_id(service)
+        start = get_checkpoint(label_id)
+        found = _history_ids(service, label_id, start) if start else None
+
+        if found is None:
+            # First run, or history expired. Read the checkpoint before
+            # listing so mail arriving meanwhile is picked up next time.
+            latest = service.users().getProfile(userId="me").execute()["historyId"]
+            message_ids = _listed_ids(service, label_id)
+        else:
+            message_ids, latest = found
+
+        message_ids = list(dict.fromkeys(message_ids))
+        done = _processed(message_ids)
+        yield from _download(service, [m for m in message_ids if m not in done])
+
+        _save_checkpoint(label_id, latest)
+
+    except HttpError as e:
         raise RuntimeError(f"Failed to fetch emails: {str(e)}")
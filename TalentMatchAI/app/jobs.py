@@ -0,0 +1,348 @@
+"""
+Durable ingestion job queue.
+
+Jobs and their per-resume items live in SQLite (JOBS_DB_PATH), so queued
+and half-finished work survives a restart. Workers (app/worker.py)
+claim jobs with a lease; a job whose worker stops heartbeating is picked
+up again and resumes from the chunk progress recorded on its items.
+"""
+import hashlib
+import json
+import os
+import socket
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional
+from .config import JOBS_DB_PATH, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS
+from .db import get_connection, ensure_schema
+
+# Items that still need work; everything else is terminal
+OPEN_ITEM_STATUSES = ("queued", "parsed", "indexing")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    source TEXT,
+    idempotency_key TEXT UNIQUE,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    item_index INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    file_path TEXT,
+    resume_text TEXT,
+    metadata TEXT,
+    resume_id TEXT,
+    content_hash TEXT,
+    chunks_total INTEGER NOT NULL DEFAULT 0,
+    chunks_done INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job_id, item_index)
+);
+"""
+
+_ITEM_COLUMNS = (
+    "item_index", "status", "file_path", "resume_text", "metadata", "resume_id",
+    "content_hash", "chunks_total", "chunks_done", "error", "updated_at",
+)
+
+
+def _connection():
+    ensure_schema(SCHEMA, JOBS_DB_PATH)
+    return get_connection(JOBS_DB_PATH)
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def payload_key(kind: str, payload) -> str:
+    """Idempotency key derived from the request payload."""
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(kind.encode("utf-8") + b":" + encoded).hexdigest()
+
+
+def _item_row(job_id: str, index: int, item: Dict, now: float) -> tuple:
+    has_text = item.get("resume_text") is not None and item.get("metadata") is not None
+    return (
+        job_id,
+        index,
+        "parsed" if has_text else "queued",
+        item.get("file_path"),
+        item.get("resume_text"),
+        json.dumps(item["metadata"]) if item.get("metadata") is not None else None,
+        now,
+    )
+
+
+def create_job(
+    kind: str,
+    source: str,
+    items: Iterable[Dict] = (),
+    idempotency_key: Optional[str] = None,
+) -> str:
+    """
+    Enqueue a job and return its id. Items are dicts with `file_path`
+    and/or `resume_text` + `metadata`. Submitting the same idempotency key
+    again returns the existing job instead of creating a new one.
+    """
+    conn = _connection()
+    now = time.time()
+
+    with conn:
+        if idempotency_key:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+            if row:
+                return row[0]
+
+        job_id = str(uuid.uuid4())
+        conn.execute(
+            "INSERT INTO jobs (id, kind, source, idempotency_key, status, created_at) "
+            "VALUES (?, ?, ?, ?, 'queued', ?)",
+            (job_id, kind, source, idempotency_key, now),
+        )
+        conn.executemany(
+            "INSERT INTO job_items (job_id, item_index, status, file_path, resume_text, "
+            "metadata, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [_item_row(job_id, index, item, now) for index, item in enumerate(items)],
+        )
+
+    return job_id
+
+
+def add_items(job_id: str, items: Iterable[Dict]) -> List[int]:
+    """Append items to a running job (e.g. as Gmail attachments download)."""
+    conn = _connection()
+    now = time.time()
+
+    with conn:
+        start = conn.execute(
+            "SELECT COALESCE(MAX(item_index) + 1, 0) FROM job_items WHERE job_id = ?",
+            (job_id,),
+        ).fetchone()[0]
+        rows = [_item_row(job_id, start + i, item, now) for i, item in enumerate(items)]
+        conn.executemany(
+            "INSERT INTO job_items (job_id, item_index, status, file_path, resume_text, "
+            "metadata, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    return [row[1] for row in rows]
+
+
+def claim_job(worker: str) -> Optional[Dict]:
+    """
+    Atomically take the oldest queued job, or a running job whose lease
+    expired. Jobs that keep failing are given up after JOB_MAX_ATTEMPTS.
+    """
+    conn = _connection()
+    now = time.time()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT id, attempts FROM jobs "
+            "WHERE status = 'queued' OR (status = 'running' AND heartbeat_at < ?) "
+            "ORDER BY created_at LIMIT 1",
+            (now - JOB_LEASE_SECONDS,),
+        ).fetchone()
+
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+
+        job_id, attempts = row
+        if attempts >= JOB_MAX_ATTEMPTS:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, "
+                "error = COALESCE(error, 'Exceeded maximum attempts') WHERE id = ?",
+                (now, job_id),
+            )
+            conn.execute("COMMIT")
+            return claim_job(worker)
+
+        conn.execute(
+            "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+            "started_at = COALESCE(started_at, ?), heartbeat_at = ? WHERE id = ?",
+            (worker, now, now, job_id),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    return get_job(job_id, include_items=False)
+
+
+def heartbeat(job_id: str):
+    conn = _connection()
+    with conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+
+def set_payload(job_id: str, payload: Dict):
+    conn = _connection()
+    with conn:
+        conn.execute("UPDATE jobs SET payload = ? WHERE id = ?", (json.dumps(payload), job_id))
+
+
+def finish_job(job_id: str, status: str, error: Optional[str] = None):
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            (status, error, time.time(), job_id),
+        )
+
+
+def retry_or_fail(job_id: str, error: str):
+    """Put a job back in the queue, or fail it once it is out of attempts."""
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END, "
+            "error = ?, finished_at = CASE WHEN attempts < ? THEN NULL ELSE ? END WHERE id = ?",
+            (JOB_MAX_ATTEMPTS, error, JOB_MAX_ATTEMPTS, time.time(), job_id),
+        )
+
+
+def update_item(job_id: str, item_index: int, **fields):
+    if "metadata" in fields and fields["metadata"] is not None:
+        fields["metadata"] = json.dumps(fields["metadata"])
+    fields["updated_at"] = time.time()
+
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+    conn = _connection()
+    with conn:
+        conn.execute(
+            f"UPDATE job_items SET {assignments} WHERE job_id = ? AND item_index = ?",
+            (*fields.values(), job_id, item_index),
+        )
+        conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+
+def _item_dict(row) -> Dict:
+    item = dict(zip(_ITEM_COLUMNS, row))
+    if item["metadata"] is not None:
+        item["metadata"] = json.loads(item["metadata"])
+    return item
+
+
+def open_items(job_id: str) -> List[Dict]:
+    """Items that still need extraction, structuring or indexing."""
+    placeholders = ",".join("?" * len(OPEN_ITEM_STATUSES))
+    rows = _connection().execute(
+        f"SELECT {', '.join(_ITEM_COLUMNS)} FROM job_items "
+        f"WHERE job_id = ? AND status IN ({placeholders}) ORDER BY item_index",
+        (job_id, *OPEN_ITEM_STATUSES),
+    ).fetchall()
+    return [_item_dict(row) for row in rows]
+
+
+def get_item(job_id: str, item_index: int) -> Optional[Dict]:
+    row = _connection().execute(
+        f"SELECT {', '.join(_ITEM_COLUMNS)} FROM job_items WHERE job_id = ? AND item_index = ?",
+        (job_id, item_index),
+    ).fetchone()
+    return _item_dict(row) if row else None
+
+
+def queue_stats() -> Dict:
+    """Job counts by status, item counts of unfinished jobs, and the oldest queued job's age."""
+    conn = _connection()
+    jobs = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+    items = dict(conn.execute(
+        "SELECT i.status, COUNT(*) FROM job_items i JOIN jobs j ON j.id = i.job_id "
+        "WHERE j.status IN ('queued', 'running') GROUP BY i.status"
+    ).fetchall())
+    oldest = conn.execute("SELECT MIN(created_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+    return {
+        "jobs": jobs,
+        "items": items,
+        "oldest_queued_seconds": time.time() - oldest if oldest else 0.0,
+    }
+
+
+def get_job(job_id: str, include_items: bool = True) -> Optional[Dict]:
+    """
+    Job record with per-status counts, chunk progress and throughput,
+    plus per-resume progress when `include_items` is set.
+    """
+    conn = _connection()
+    row = conn.execute(
+        "SELECT id, kind, source, status, payload, attempts, worker, error, "
+        "created_at, started_at, heartbeat_at, finished_at FROM jobs WHERE id = ?",
+        (job_id,),
+    ).fetchone()
+    if row is None:
+        return None
+
+    (job_id, kind, source, status, payload, attempts, worker, error,
+     created_at, started_at, heartbeat_at, finished_at) = row
+
+    job = {
+        "job_id": job_id,
+        "kind": kind,
+        "source": source,
+        "status": status,
+        "payload": json.loads(payload),
+        "attempts": attempts,
+        "worker": worker,
+        "error": error,
+        "created_at": created_at,
+        "started_at": started_at,
+        "finished_at": finished_at,
+    }
+
+    counts = dict(conn.execute(
+        "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status",
+        (job_id,),
+    ).fetchall())
+    chunks_total, chunks_done = conn.execute(
+        "SELECT COALESCE(SUM(chunks_total), 0), COALESCE(SUM(chunks_done), 0) "
+        "FROM job_items WHERE job_id = ?",
+        (job_id,),
+    ).fetchone()
+
+    finished = sum(v for k, v in counts.items() if k not in OPEN_ITEM_STATUSES)
+    elapsed = ((finished_at or time.time()) - started_at) if started_at else 0
+
+    job["progress"] = {
+        "items": sum(counts.values()),
+        "by_status": counts,
+        "chunks_total": chunks_total,
+        "chunks_done": chunks_done,
+    }
+    job["throughput"] = {
+        "elapsed_seconds": round(elapsed, 3),
+        "resumes_per_second": round(finished / elapsed, 3) if elapsed else 0.0,
+        "chunks_per_second": round(chunks_done / elapsed, 3) if elapsed else 0.0,
+    }
+
+    if include_items:
+        rows = conn.execute(
+            "SELECT item_index, status, file_path, resume_id, chunks_total, chunks_done, error "
+            "FROM job_items WHERE job_id = ? ORDER BY item_index",
+            (job_id,),
+        ).fetchall()
+        job["items"] = [
+            dict(zip(("index", "status", "file_path", "resume_id",
+                      "chunks_total", "chunks_done", "error"), r))
+            for r in rows
+        ]
+
+    return job
@@ -0,0 +1,377 @@
+"""
+Shared OpenAI gateway: every chat and embeddings request goes through here.
+
+- One pooled client (keep-alive connections, LLM_MAX_CONCURRENCY requests
+  in flight); async callers get a client per event loop, since httpx
+  connections cannot move between loops.
+- A token-bucket scheduler for requests and tokens per minute. It starts
+  from LLM_RPM / LLM_TPM (0: no limit until the API reports one) and then
+  follows the `x-ratelimit-*` headers of every response; a 429 pauses all
+  callers until its `retry-after` has passed.
+- Identical requests already in flight are coalesced: later callers wait
+  for the first one's response (or API error) instead of sending their
+  own. If the first caller is cancelled, the others send it themselves.
+- Rate limits, timeouts, connection errors and 5xx are retried up to
+  LLM_MAX_RETRIES times with full-jitter exponential backoff (or the
+  server's `retry-after`, when longer). The SDK's own retries are off.
+
+    response = llm_gateway.complete("score", model=MODEL, messages=[...])
+    response = await llm_gateway.acomplete("structure", model=MODEL, messages=[...])
+    response = llm_gateway.embed("embed", model=name, input=texts)
+"""
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+import httpx
+import openai
+from openai import OpenAI, AsyncOpenAI
+from .config import (
+    OPENAI_API_KEY,
+    OPENAI_TIMEOUT,
+    LLM_RPM,
+    LLM_TPM,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_RETRY_MAX_SECONDS,
+)
+from .metrics import LLM_COALESCED, LLM_RETRIES, LLM_THROTTLE_SECONDS, llm_call
+from .utils import estimate_tokens
+
+_RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+# ---------- Clients ----------
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONCURRENCY,
+        max_keepalive_connections=LLM_MAX_CONCURRENCY,
+        keepalive_expiry=60,
+    )
+
+
+client = OpenAI(
+    api_key=OPENAI_API_KEY,
+    timeout=OPENAI_TIMEOUT,
+    max_retries=0,
+    http_client=httpx.Client(limits=_limits(), timeout=OPENAI_TIMEOUT),
+)
+
+_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+# event loop -> (AsyncOpenAI, asyncio.Semaphore)
+_async_clients = weakref.WeakKeyDictionary()
+_async_lock = threading.Lock()
+
+
+def async_client() -> AsyncOpenAI:
+    """The pooled async client for the running event loop."""
+    return _async_state()[0]
+
+
+def _async_state():
+    loop = asyncio.get_running_loop()
+    with _async_lock:
+        state = _async_clients.get(loop)
+        if state is None:
+            state = (
+                AsyncOpenAI(
+                    api_key=OPENAI_API_KEY,
+                    timeout=OPENAI_TIMEOUT,
+                    max_retries=0,
+                    http_client=httpx.AsyncClient(limits=_limits(), timeout=OPENAI_TIMEOUT),
+                ),
+                asyncio.Semaphore(LLM_MAX_CONCURRENCY),
+            )
+            _async_clients[loop] = state
+        return state
+
+
+# ---------- Rate limits ----------
+
+def _retry_after(headers) -> Optional[float]:
+    if headers is None:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+class _Bucket:
+    """Requests or tokens per minute. Reservations may overdraw; the caller waits it off."""
+
+    def __init__(self, per_minute: int):
+        self.configured = per_minute
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.capacity:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount`; seconds until the bucket is out of debt."""
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return max(-self.level * 60 / self.capacity, 0.0)
+
+    def follow(self, limit: Optional[str], remaining: Optional[str], now: float):
+        """Adopt the limit and remaining budget the API reported."""
+        try:
+            limit = int(limit) if limit else None
+            remaining = float(remaining) if remaining else None
+        except ValueError:
+            return
+        self._refill(now)
+        if limit:
+            if not self.capacity:
+                # First limit seen: start from what the server says is left
+                self.level = float(limit)
+            self.capacity = float(min(limit, self.configured) if self.configured else limit)
+        if remaining is not None and self.capacity:
+            self.level = min(self.level, remaining)
+
+
+class _Scheduler:
+
+    def __init__(self, rpm: int, tpm: int):
+        self._lock = threading.Lock()
+        self.buckets = {"requests": _Bucket(rpm), "tokens": _Bucket(tpm)}
+        self.paused_until = 0.0
+
+    def reserve(self, tokens: int) -> float:
+        """Seconds to wait before sending a request of `tokens`."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.buckets["requests"].reserve(1, now),
+                self.buckets["tokens"].reserve(tokens, now),
+            )
+            return max(wait, self.paused_until - now)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def follow(self, headers):
+        if headers is None or "x-ratelimit-limit-requests" not in headers and \
+                "x-ratelimit-limit-tokens" not in headers:
+            return
+        with self._lock:
+            now = time.monotonic()
+            for kind, bucket in self.buckets.items():
+                bucket.follow(
+                    headers.get(f"x-ratelimit-limit-{kind}"),
+                    headers.get(f"x-ratelimit-remaining-{kind}"),
+                    now,
+                )
+
+
+scheduler = _Scheduler(LLM_RPM, LLM_TPM)
+
+
+def _request_tokens(request: dict) -> int:
+    """Tokens the API counts against TPM: the input plus the completion allowance."""
+    if "messages" in request:
+        text = "".join(str(message.get("content") or "") for message in request["messages"])
+        return estimate_tokens(text) + (request.get("max_tokens") or 0)
+    inputs = request.get("input") or []
+    return sum(estimate_tokens(text) for text in ([inputs] if isinstance(inputs, str) else inputs))
+
+
+# ---------- Retries ----------
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in _RETRY_STATUSES
+
+
+def _backoff(error: Exception, attempt: int) -> float:
+    """Full jitter, or the server's retry-after when it asks for longer."""
+    delay = random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+    response = getattr(error, "response", None)
+    retry_after = _retry_after(response.headers if response is not None else None)
+    if retry_after is not None:
+        retry_after = min(retry_after, LLM_RETRY_MAX_SECONDS)
+        if isinstance(error, openai.RateLimitError):
+            scheduler.pause(retry_after)
+        delay = max(delay, retry_after + random.uniform(0, LLM_RETRY_BASE_SECONDS))
+    return delay
+
+
+def _reason(error: Exception) -> str:
+    status = getattr(error, "status_code", None)
+    return str(status) if status else type(error).__name__
+
+
+# ---------- Requests ----------
+
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+class _Abandoned(Exception):
+    """The leader stopped (cancelled, interrupted) before a response: followers send their own."""
+
+
+def _key(endpoint: str, request: dict) -> str:
+    payload = json.dumps([endpoint, request], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _join(key: str):
+    """(future, leader): the in-flight future for `key`, and whether this caller sends it."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future, False
+        future = _inflight[key] = Future()
+        return future, True
+
+
+def _settle(key: str, future: Future, result=None, error: Optional[BaseException] = None):
+    with _inflight_lock:
+        _inflight.pop(key, None)
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def _resource(api, endpoint: str):
+    return api.chat.completions if endpoint == "chat" else api.embeddings
+
+
+def _send(endpoint: str, operation: str, request: dict):
+    tokens = _request_tokens(request)
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        wait = scheduler.reserve(tokens)
+        if wait:
+            LLM_THROTTLE_SECONDS.labels(operation).observe(wait)
+            time.sleep(wait)
+        try:
+            with _slots, llm_call(operation, request["model"]) as call:
+                raw = _resource(client, endpoint).with_raw_response.create(**request)
+                scheduler.follow(raw.headers)
+                response = raw.parse()
+                call.record(response)
+            return response
+        except Exception as e:
+            if attempt == LLM_MAX_RETRIES or not _retryable(e):
+                raise
+            LLM_RETRIES.labels(operation, _reason(e)).inc()
+            time.sleep(_backoff(e, attempt))
+
+
+async def _asend(endpoint: str, operation: str, request: dict):
+    api, slots = _async_state()
+    tokens = _request_tokens(request)
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        wait = scheduler.reserve(tokens)
+        if wait:
+            LLM_THROTTLE_SECONDS.labels(operation).observe(wait)
+            await asyncio.sleep(wait)
+        try:
+            async with slots:
+                with llm_call(operation, request["model"]) as call:
+                    raw = await _resource(api, endpoint).with_raw_response.create(**request)
+                    scheduler.follow(raw.headers)
+                    response = raw.parse()
+                    call.record(response)
+            return response
+        except Exception as e:
+            if attempt == LLM_MAX_RETRIES or not _retryable(e):
+                raise
+            LLM_RETRIES.labels(operation, _reason(e)).inc()
+            await asyncio.sleep(_backoff(e, attempt))
+
+
+def _call(endpoint: str, operation: str, request: dict, coalesce: bool):
+    if not coalesce:
+        return _send(endpoint, operation, request)
+    key = _key(endpoint, request)
+    while True:
+        future, leader = _join(key)
+        if leader:
+            break
+        LLM_COALESCED.labels(operation).inc()
+        try:
+            return future.result()
+        except _Abandoned:
+            continue
+    try:
+        response = _send(endpoint, operation, request)
+    except openai.OpenAIError as e:
+        _settle(key, future, error=e)
+        raise
+    except BaseException:
+        # Our cancellation or bug is not the followers' failure
+        _settle(key, future, error=_Abandoned())
+        raise
+    _settle(key, future, response)
+    return response
+
+
+async def _acall(endpoint: str, operation: str, request: dict, coalesce: bool):
+    if not coalesce:
+        return await _asend(endpoint, operation, request)
+    key = _key(endpoint, request)
+    while True:
+        future, leader = _join(key)
+        if leader:
+            break
+        LLM_COALESCED.labels(operation).inc()
+        try:
+            # Shielded: a cancelled follower must not cancel the shared future
+            return await asyncio.shield(asyncio.wrap_future(future))
+        except _Abandoned:
+            continue
+    try:
+        response = await _asend(endpoint, operation, request)
+    except openai.OpenAIError as e:
+        _settle(key, future, error=e)
+        raise
+    except BaseException:
+        _settle(key, future, error=_Abandoned())
+        raise
+    _settle(key, future, response)
+    return response
+
+
+def complete(operation: str, coalesce: bool = True, **request):
+    """`chat.completions.create(**request)`, counted under `operation` in the LLM metrics."""
+    return _call("chat", operation, request, coalesce)
+
+
+async def acomplete(operation: str, coalesce: bool = True, **request):
+    return await _acall("chat", operation, request, coalesce)
+
+
+def embed(operation: str, coalesce: bool = True, **request):
+    """`embeddings.create(**request)`."""
+    return _call("embeddings", operation, request, coalesce)
+
+
+async def aembed(operation: str, coalesce: bool = True, **request):
+    return await _acall("embeddings", operation, request, coalesce)
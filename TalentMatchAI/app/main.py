@@ -1,12 +1,27 @@
-from fastapi import FastAPI, BackgroundTasks, UploadFile, File
+import json
+from typing import Any, Dict, List
+from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from .models import BulkResumeInput, JobQuery, ResumeFetchResponse
-from .ingestion import ingest_bulk_resumes
-from .retriever import retrieve_candidates
-from .scorer import score_candidates
-from app.intake.file_storage import save_file
-from app.parser.resume_parser import parse_resume, structure_resume
-from app.intake.gmail_fetcher import fetch_resume_emails
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from .config import SEARCH_BATCH_MAX_QUERIES, MAX_UPLOAD_FILES
+from .models import (
+    BulkResumeInput,
+    JobQuery,
+    BatchSearchInput,
+    ResumeFetchResponse,
+    MigrationInput,
+    MigrationCompareInput,
+)
+from .retriever import retrieve_candidates, retrieve_candidates_batch
+from .scorer import score_candidates, score_many, iter_scores, rank
+from .embedding_cache import cache as embedding_cache
+from .search_cache import query_vectors, search_results, candidate_scores, search_key, bump_collection_version
+from app.intake import file_storage
+from app.intake.file_storage import UploadRejected
+from . import jobs, metrics, migration
+from . import candidates as candidate_store
+from .worker import start_worker_threads
 
 app = FastAPI(
     title="Commercial Recruitment RAG Service",
@@ -21,17 +36,52 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-  
+
+# Request latency by route, slow-request profiles (app/metrics.py)
+app.add_middleware(metrics.MetricsMiddleware)
+
+_stop_workers = None
+
+
+@app.on_event("startup")
+def start_workers():
+    # Ingestion runs on queue workers, never on request threads
+    global _stop_workers
+    _stop_workers = start_worker_threads()
+
+
+@app.on_event("shutdown")
+def stop_workers():
+    if _stop_workers is not None:
+        _stop_workers.set()
+
 @app.post("/add-resumes")
-def add_resumes(request: BulkResumeInput, background_tasks: BackgroundTasks):
-    background_tasks.add_task(ingest_bulk_resumes, request.resumes)
-    return {"status": "Bulk resume ingestion started"}
+def add_resumes(request: BulkResumeInput):
+    payload = request.model_dump()
+    job_id = jobs.create_job(
+        "ingest",
+        "bulk",
+        [{"resume_text": r["resume_text"], "metadata": r["metadata"]} for r in payload["resumes"]],
+        idempotency_key=jobs.payload_key("ingest", payload),
+    )
+    return {
+        "job_id": job_id,
+        "status": "Bulk resume ingestion started"
+    }
 
 @app.post("/search")
 def search(job_query: JobQuery):
 
+    cache_key = search_key(job_query)
+    cached = search_results.get(cache_key)
+    if cached is not None:
+        return cached
+
     candidates = retrieve_candidates(job_query)
 
+    # Optional background comparison against a migration's shadow collection
+    migration.dual_read(job_query, candidates)
+
     if not candidates:
         return {
             "retrieved_count": 0,
@@ -39,81 +89,308 @@ def search(job_query: JobQuery):
         }
 
     scored = score_candidates(
-        job_query.job_description,
-        candidates
+        candidates,
+        job_query.job_description
     )
 
-    return {
+    response = {
         "retrieved_count": len(candidates),
         "scored_results": scored
     }
+    search_results.set(cache_key, response)
 
+    return response
 
-@app.post("/upload-resume/")
-async def upload_resume(
-    file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = None
-):
-    file_bytes = await file.read()
-    file_path = save_file(file_bytes, file.filename)
-
-    resume_text = parse_resume(file_path)
-    structured_data = structure_resume(resume_text)
-
-    metadata = {
-        "file_path": file_path,
-        "candidate_name": structured_data.get("name"),
-        "skills": structured_data.get("skills"),
-        "experience": structured_data.get("experience", 0),
-        "location": structured_data.get("location", ""),
-        "source": "upload"
+
+@app.post("/search/batch")
+def search_batch(request: BatchSearchInput):
+    """
+    Run many searches in one call: JDs are embedded together, queries
+    with the same filters share Chroma calls and scoring fans out over
+    the shared, bounded scoring pool. Results are in request order.
+    """
+    queries = request.queries
+    if len(queries) > SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {SEARCH_BATCH_MAX_QUERIES} queries per batch"
+        )
+
+    keys = [search_key(job_query) for job_query in queries]
+    responses = [search_results.get(key) for key in keys]
+
+    todo = [i for i, response in enumerate(responses) if response is None]
+    if todo:
+        candidate_lists = retrieve_candidates_batch([queries[i] for i in todo])
+
+        to_score = [(i, candidates) for i, candidates in zip(todo, candidate_lists) if candidates]
+        scored_lists = score_many([
+            (candidates, queries[i].job_description) for i, candidates in to_score
+        ])
+        scored_by_index = {i: scored for (i, _), scored in zip(to_score, scored_lists)}
+
+        for i, candidates in zip(todo, candidate_lists):
+            responses[i] = {
+                "retrieved_count": len(candidates),
+                "scored_results": scored_by_index.get(i, [])
+            }
+            search_results.set(keys[i], responses[i])
+
+    return {"count": len(responses), "results": responses}
+
+
+def _ndjson(event: dict) -> str:
+    return json.dumps(event, default=str) + "\n"
+
+
+def _preview(candidate: dict) -> dict:
+    metadata = candidate.get("metadata") or {}
+    return {
+        "resume_id": candidate.get("resume_id"),
+        "name": metadata.get("candidate_name"),
+        "score": candidate.get("score"),
+        "metadata": metadata
     }
 
-    background_tasks.add_task(
-        ingest_bulk_resumes,
-        [resume_text],
-        [metadata]
+
+@app.post("/search/stream")
+async def search_stream(job_query: JobQuery):
+    """
+    NDJSON stream: a `candidates` line with the vector-ranked list as soon
+    as retrieval finishes, a `score` line per candidate as its LLM score
+    arrives, then a `done` line with the ranked results. A cached search
+    sends only the `done` line.
+    """
+
+    async def events():
+        cache_key = search_key(job_query)
+        cached = search_results.get(cache_key)
+        if cached is not None:
+            yield _ndjson({"event": "done", **cached})
+            return
+
+        candidates = await run_in_threadpool(retrieve_candidates, job_query)
+        # Optional background comparison against a migration's shadow collection
+        await run_in_threadpool(migration.dual_read, job_query, candidates)
+        yield _ndjson({"event": "candidates", "retrieved_count": len(candidates),
+                       "candidates": [_preview(c) for c in candidates]})
+
+        scored = []
+        async for result in iter_scores(candidates, job_query.job_description):
+            scored.append(result)
+            yield _ndjson({"event": "score", **result})
+
+        response = {
+            "retrieved_count": len(candidates),
+            "scored_results": rank(scored)
+        }
+        search_results.set(cache_key, response)
+        yield _ndjson({"event": "done", **response})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+async def _store_uploads(files: List[UploadFile]):
+    """
+    Stream each upload into the file store off the event loop; returns
+    (stored, duplicates, rejected). Content that is already queued or
+    indexed, or repeated within this request, is not ingested again.
+    """
+    stored, duplicates, rejected, seen = [], [], [], {}
+    for file in files:
+        try:
+            result = await run_in_threadpool(file_storage.store_stream, file.file, file.filename)
+        except UploadRejected as exc:
+            rejected.append({"filename": file.filename, "error": str(exc)})
+            continue
+        finally:
+            await file.close()
+
+        if result.duplicate or result.sha256 in seen:
+            duplicates.append({
+                "filename": file.filename,
+                "sha256": result.sha256,
+                # Repeated within this request: filled in once the job exists
+                "job_id": result.job_id,
+                "item_index": seen.get(result.sha256, result.item_index),
+            })
+        else:
+            seen[result.sha256] = len(stored)
+            stored.append({"filename": file.filename, "file_path": result.path, "sha256": result.sha256})
+    return stored, duplicates, rejected
+
+
+async def _queue_uploads(stored: List[Dict]) -> str:
+    job_id = await run_in_threadpool(
+        jobs.create_job, "upload", "upload", [{"file_path": f["file_path"]} for f in stored]
     )
+    for index, f in enumerate(stored):
+        await run_in_threadpool(file_storage.link, f["sha256"], job_id, index)
+    return job_id
+
+
+@app.post("/upload-resume/")
+async def upload_resume(file: UploadFile = File(...)):
+    stored, duplicates, rejected = await _store_uploads([file])
+    if rejected:
+        raise HTTPException(status_code=400, detail=rejected[0]["error"])
+    if duplicates:
+        return {"status": "Resume already ingested", **duplicates[0]}
+    file_path = stored[0]["file_path"]
+
+    # Extraction and structuring happen on a queue worker
+    job_id = await _queue_uploads(stored)
 
     return {
+        "job_id": job_id,
         "status": "Resume ingestion started",
         "file_path": file_path
     }
 
+@app.post("/upload-resumes/", status_code=202)
+async def upload_resumes(files: List[UploadFile] = File(...)):
+    """
+    Multi-file upload: files are streamed to disk and queued as one job;
+    each accepted file gets a handle to poll at /jobs/{job_id}/items/{item_index}.
+    Files already ingested come back under "duplicates" with their original item.
+    """
+    if len(files) > MAX_UPLOAD_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_UPLOAD_FILES} files per upload")
+
+    stored, duplicates, rejected = await _store_uploads(files)
+    if not stored and not duplicates:
+        raise HTTPException(status_code=400, detail={"rejected": rejected})
+
+    job_id = await _queue_uploads(stored) if stored else None
+    for duplicate in duplicates:
+        duplicate["job_id"] = duplicate["job_id"] or job_id
+
+    return {
+        "job_id": job_id,
+        "status": "Resume ingestion started" if stored else "Resumes already ingested",
+        "files": [
+            {
+                "filename": f["filename"],
+                "item_index": index,
+                "status": "queued",
+                "status_url": f"/jobs/{job_id}/items/{index}",
+            }
+            for index, f in enumerate(stored)
+        ],
+        "duplicates": duplicates,
+        "rejected": rejected,
+    }
+
 @app.get("/fetch-gmail-resumes")
-def fetch_gmail(background_tasks: BackgroundTasks):
+def fetch_gmail():
+
+    # Download, parse, structure and index all run on a queue worker
+    job_id = jobs.create_job("gmail", "gmail")
+
+    return {
+        "job_id": job_id,
+        "status": "Resume ingestion started"
+    }
 
-    file_paths = fetch_resume_emails()
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str, include_items: bool = True):
+    job = jobs.get_job(job_id, include_items=include_items)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
-    resume_texts = []
-    metadatas = []
+@app.get("/jobs/{job_id}/items/{item_index}")
+def job_item_status(job_id: str, item_index: int):
+    item = jobs.get_item(job_id, item_index)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Job item not found")
+    item.pop("resume_text", None)
+    return item
 
-    for path in file_paths:
-        resume_text = parse_resume(path)
-        structured_data = structure_resume(resume_text)
+@app.get("/candidates/{resume_id}")
+def get_candidate(resume_id: str):
+    candidate = candidate_store.get_candidate(resume_id)
+    if candidate is None:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    return candidate
 
-        resume_texts.append(resume_text)
+@app.patch("/candidates/{resume_id}")
+def update_candidate(resume_id: str, fields: Dict[str, Any]):
+    candidate = candidate_store.update_candidate(resume_id, fields)
+    if candidate is None:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    bump_collection_version()
+    return candidate
 
-        metadatas.append({
-            "file_path": path,
-            "candidate_name": structured_data.get("name"),
-            "skills": structured_data.get("skills"),
-            "experience": structured_data.get("experience", 0),
-            "location": structured_data.get("location", ""),
-            "source": "gmail"
-        })
+@app.post("/migrations", status_code=201)
+def start_migration(request: MigrationInput):
+    try:
+        return migration.start_migration(request.embedding_model, request.chunk_strategy)
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
 
-    background_tasks.add_task(
-        ingest_bulk_resumes,
-        resume_texts,
-        metadatas
-    )
+@app.get("/migrations")
+def list_migrations():
+    return {"active": migration.active_generation(), "migrations": migration.list_migrations()}
 
+@app.get("/migrations/{migration_id}")
+def migration_status(migration_id: str):
+    found = migration.get_migration(migration_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Migration not found")
+    return found
+
+@app.post("/migrations/{migration_id}/compare")
+def compare_migration(migration_id: str, request: MigrationCompareInput):
+    try:
+        return migration.compare(migration_id, request.queries, request.sample, request.top_k)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Migration not found")
+
+@app.post("/migrations/{migration_id}/cutover", status_code=202)
+def cutover_migration(migration_id: str):
+    """Queue the switch; poll status_url until the migration is active."""
+    try:
+        found = migration.cutover(migration_id)
+        return {**found, "status_url": f"/migrations/{migration_id}"}
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Migration not found")
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+@app.post("/migrations/{migration_id}/cancel")
+def cancel_migration(migration_id: str):
+    try:
+        found = migration.cancel(migration_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    if found is None:
+        raise HTTPException(status_code=404, detail="Migration not found")
+    return found
+
+@app.post("/migrations/rollback", status_code=202)
+def rollback_migration():
+    """Queue the switch back; poll status_url until the migration is rolled_back."""
+    try:
+        found = migration.rollback()
+        return {**found, "status_url": f"/migrations/{found['id']}"}
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+@app.get("/cache/stats")
+def cache_stats():
     return {
-        "count": len(file_paths),
-        "status": "Resume ingestion started"
+        "embeddings": embedding_cache.stats() if embedding_cache else None,
+        "query_vectors": query_vectors.stats(),
+        "search_results": search_results.stats(),
+        "candidate_scores": candidate_scores.stats()
     }
 
+@app.get("/metrics")
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/")
 def root():
     return {"message": "Commercial Recruitment RAG Running"}
@@ -0,0 +1,385 @@
+"""
+Prometheus metrics and slow-request profiling.
+
+    talentmatch_stage_seconds{stage}                  search / ingestion stages (see below)
+    talentmatch_http_request_duration_seconds{method, route, status}
+    talentmatch_llm_requests_total{operation, model, outcome}
+    talentmatch_llm_request_seconds{operation, model}
+    talentmatch_llm_tokens_total{operation, model, kind}
+    talentmatch_llm_cost_usd_total{operation, model}  from `usage` and PRICES
+    talentmatch_llm_retries_total{operation, reason}  gateway retries (status code or error)
+    talentmatch_llm_coalesced_total{operation}        callers served by an identical in-flight request
+    talentmatch_llm_throttle_seconds{operation}       waits for rate-limit budget
+    talentmatch_resumes_total{decision}               dedup decisions (new, updated, duplicate, ...)
+    talentmatch_chunks_indexed_total
+    talentmatch_pipeline_queue_depth{queue}           items waiting between pipeline stages
+    talentmatch_jobs{status}, talentmatch_job_items{status}, talentmatch_job_queue_oldest_seconds
+    talentmatch_cache_*{cache}                        embedding / query / search / score caches
+
+Stages are named "<path>.<step>": search.filters, search.embed,
+search.shortlist, search.fetch_chunks, search.rerank, search.chunk_query,
+search.group, search.hydrate, search.score; ingest.dedup, ingest.extract,
+ingest.structure, ingest.chunk, ingest.embed, ingest.write,
+ingest.resume_vectors, ingest.index.
+
+`MetricsMiddleware` times every request. With PROFILE_SLOW_REQUESTS, a
+sampler thread also records the Python stacks of all busy threads while
+requests are in flight (every PROFILE_SAMPLE_INTERVAL seconds); requests
+slower than SLOW_REQUEST_SECONDS write those samples to PROFILE_DIR in
+collapsed-stack format (flamegraph.pl, speedscope). Samples include any
+other work running at the same time.
+
+With PROMETHEUS_MULTIPROC_DIR set, worker processes' metrics are merged
+into /metrics (prometheus_client multiprocess mode).
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter as PromCounter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from .config import PROFILE_SLOW_REQUESTS, PROFILE_SAMPLE_INTERVAL, PROFILE_DIR, SLOW_REQUEST_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# USD per million tokens: (input, output). Longest matching prefix wins;
+# other models are counted in tokens only.
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+    "text-embedding-ada-002": (0.10, 0.0),
+}
+
+STAGE_SECONDS = Histogram(
+    "talentmatch_stage_seconds", "Time spent in a search or ingestion stage", ["stage"], buckets=_BUCKETS
+)
+HTTP_SECONDS = Histogram(
+    "talentmatch_http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"], buckets=_BUCKETS,
+)
+SLOW_REQUESTS = PromCounter(
+    "talentmatch_slow_requests_total", "Requests slower than SLOW_REQUEST_SECONDS", ["route"]
+)
+LLM_REQUESTS = PromCounter(
+    "talentmatch_llm_requests_total", "OpenAI API requests", ["operation", "model", "outcome"]
+)
+LLM_SECONDS = Histogram(
+    "talentmatch_llm_request_seconds", "OpenAI API request latency", ["operation", "model"], buckets=_BUCKETS
+)
+LLM_TOKENS = PromCounter(
+    "talentmatch_llm_tokens_total", "Tokens reported in OpenAI usage", ["operation", "model", "kind"]
+)
+LLM_COST = PromCounter(
+    "talentmatch_llm_cost_usd_total", "Estimated OpenAI spend from usage and PRICES", ["operation", "model"]
+)
+LLM_RETRIES = PromCounter(
+    "talentmatch_llm_retries_total", "OpenAI requests retried by the gateway", ["operation", "reason"]
+)
+LLM_COALESCED = PromCounter(
+    "talentmatch_llm_coalesced_total", "Callers served by an identical in-flight request", ["operation"]
+)
+LLM_THROTTLE_SECONDS = Histogram(
+    "talentmatch_llm_throttle_seconds", "Time waiting for rate-limit budget before a request",
+    ["operation"], buckets=_BUCKETS,
+)
+RESUMES = PromCounter("talentmatch_resumes_total", "Resumes seen by ingestion, by dedup decision", ["decision"])
+CHUNKS_INDEXED = PromCounter("talentmatch_chunks_indexed_total", "Chunks embedded and written")
+PIPELINE_QUEUE = Gauge(
+    "talentmatch_pipeline_queue_depth", "Items waiting between intake pipeline stages", ["queue"],
+    multiprocess_mode="livesum",
+)
+
+
+# ---------- Timing ----------
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage `name`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+def timed_iter(name: str, iterable: Iterable) -> Iterator:
+    """Yield from `iterable`, timing each step (the producer's work) as stage `name`."""
+    histogram = STAGE_SECONDS.labels(name)
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        histogram.observe(time.perf_counter() - started)
+        yield item
+
+
+# ---------- LLM usage ----------
+
+def _price(model: str) -> Optional[Tuple[float, float]]:
+    matches = [prefix for prefix in PRICES if model.startswith(prefix)]
+    return PRICES[max(matches, key=len)] if matches else None
+
+
+def _outcome(error: BaseException) -> str:
+    return {
+        "RateLimitError": "rate_limited",
+        "APITimeoutError": "timeout",
+        "CancelledError": "cancelled",
+    }.get(type(error).__name__, "error")
+
+
+class LLMCall:
+    """Handle for `llm_call`; pass the API response to `record`."""
+
+    def __init__(self, operation: str, model: str):
+        self.operation = operation
+        self.model = model
+
+    def record(self, response):
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        completion = getattr(usage, "completion_tokens", 0) or 0
+        LLM_TOKENS.labels(self.operation, self.model, "prompt").inc(prompt)
+        if completion:
+            LLM_TOKENS.labels(self.operation, self.model, "completion").inc(completion)
+
+        price = _price(self.model)
+        if price:
+            LLM_COST.labels(self.operation, self.model).inc((prompt * price[0] + completion * price[1]) / 1e6)
+
+
+@contextmanager
+def llm_call(operation: str, model: str):
+    """Count and time one OpenAI request: `with llm_call(...) as call: call.record(response)`."""
+    call = LLMCall(operation, model)
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield call
+    except BaseException as e:
+        outcome = _outcome(e)
+        raise
+    finally:
+        LLM_SECONDS.labels(operation, model).observe(time.perf_counter() - started)
+        LLM_REQUESTS.labels(operation, model, outcome).inc()
+
+
+# ---------- Scrape-time collectors ----------
+
+class _StateCollector:
+    """Job queue and cache state, read when /metrics is scraped."""
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        from . import jobs
+        from .embedding_cache import cache as embedding_cache
+        from .search_cache import query_vectors, search_results, candidate_scores
+
+        state = jobs.queue_stats()
+        by_status = GaugeMetricFamily("talentmatch_jobs", "Ingestion jobs by status", labels=["status"])
+        for status, count in state["jobs"].items():
+            by_status.add_metric([status], count)
+        yield by_status
+
+        items = GaugeMetricFamily(
+            "talentmatch_job_items", "Items of queued and running jobs by status", labels=["status"]
+        )
+        for status, count in state["items"].items():
+            items.add_metric([status], count)
+        yield items
+
+        yield GaugeMetricFamily(
+            "talentmatch_job_queue_oldest_seconds", "Age of the oldest queued job",
+            value=state["oldest_queued_seconds"],
+        )
+
+        caches = {
+            "embeddings": embedding_cache,
+            "query_vectors": query_vectors,
+            "search_results": search_results,
+            "candidate_scores": candidate_scores,
+        }
+        hits = CounterMetricFamily("talentmatch_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("talentmatch_cache_misses", "Cache misses", labels=["cache"])
+        entries = GaugeMetricFamily("talentmatch_cache_entries", "Cached entries", labels=["cache"])
+        for name, cache in caches.items():
+            if cache is None:
+                continue
+            stats = cache.stats()
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            entries.add_metric([name], stats["entries"])
+        yield hits
+        yield misses
+        yield entries
+
+
+_state_collector = _StateCollector()
+REGISTRY.register(_state_collector)
+
+
+def render() -> Tuple[bytes, str]:
+    """(body, content type) for the /metrics endpoint."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_state_collector)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+# ---------- Slow-request sampling ----------
+
+# Leaf frames of threads that are parked, not working
+_IDLE = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+}
+
+
+def _collapse(frame) -> Optional[str]:
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in _IDLE:
+        return None
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _Sampler:
+    """One daemon thread sampling all stacks while any profiled request is open."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._open = {}
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self) -> Counter:
+        samples = Counter()
+        with self._lock:
+            self._open[id(samples)] = samples
+            if not self._running:
+                self._running = True
+                threading.Thread(target=self._run, daemon=True).start()
+        return samples
+
+    def stop(self, samples: Counter):
+        with self._lock:
+            self._open.pop(id(samples), None)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._open:
+                    self._running = False
+                    return
+                targets = list(self._open.values())
+
+            stacks = [
+                stack for ident, frame in sys._current_frames().items()
+                if ident != me and (stack := _collapse(frame))
+            ]
+            for samples in targets:
+                samples.update(stacks)
+            time.sleep(self.interval)
+
+
+_sampler = _Sampler(PROFILE_SAMPLE_INTERVAL)
+
+
+def _write_profile(method: str, route: str, seconds: float, samples: Counter):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = route.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{slug}-{seconds:.1f}s.folded")
+    with open(path, "w") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+
+    leaves = Counter()
+    for stack, count in samples.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    top = ", ".join(f"{leaf} x{count}" for leaf, count in leaves.most_common(3))
+    logger.warning("Slow request %s %s took %.2fs; profile %s (top: %s)", method, route, seconds, path, top)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: request latency by route template, slow-request profiles."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        samples = _sampler.start() if PROFILE_SLOW_REQUESTS else None
+        started = time.perf_counter()
+        try:
+            # Streaming responses are timed until their last chunk is sent
+            await self.app(scope, receive, send_with_status)
+        finally:
+            seconds = time.perf_counter() - started
+            if samples is not None:
+                _sampler.stop(samples)
+
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_SECONDS.labels(scope["method"], route, str(status)).observe(seconds)
+            if seconds >= SLOW_REQUEST_SECONDS:
+                SLOW_REQUESTS.labels(route).inc()
+                if samples:
+                    _write_profile(scope["method"], route, seconds, samples)
+
+
+def stage_summary() -> Dict[str, Dict[str, float]]:
+    """{stage: {"count", "seconds"}} from this process's stage histogram, for benchmarks."""
+    summary = {}
+    for metric in STAGE_SECONDS.collect():
+        for sample in metric.samples:
+            if sample.name.endswith(("_count", "_sum")):
+                entry = summary.setdefault(sample.labels["stage"], {})
+                entry["count" if sample.name.endswith("_count") else "seconds"] = sample.value
+    return summary
@@ -0,0 +1,623 @@
+"""
+Collection migrations: re-embed and/or re-chunk every resume into a
+shadow collection while search keeps serving the current one.
+
+    python -m app.migration start --embedding-model text-embedding-3-large
+    python -m app.migration status
+    python -m app.migration compare MIGRATION_ID --sample 100
+    python -m app.migration cutover MIGRATION_ID
+    python -m app.migration rollback
+    python -m app.migration drop COLLECTION
+
+Lifecycle: building -> ready -> cutting_over -> active
+(-> rolling_back -> rolled_back), or cancelled.
+
+1. Build: candidates from the candidate store are chunked and embedded
+   for the target generation (batched through the embedding engine) and
+   written to the shadow collections, MIGRATION_BATCH_RESUMES at a time
+   in resume_id order. The cursor is checkpointed after every page; the
+   build runs as a "migration" job on the ingestion queue, so a build
+   whose worker dies is claimed again and resumes from the checkpoint.
+   Catch-up passes then rebuild resumes ingested or edited since the
+   previous pass started, until a pass finds nothing: the shadow is ready.
+2. Dual read: with MIGRATION_DUAL_READ=true, /search also queries the
+   ready shadow in the background and records how much of the served
+   top-k it returns; `compare` does the same for a sample of JDs.
+3. Cutover: queued as a "migration" job. Catch-up passes run until one
+   has at most MIGRATION_BATCH_RESUMES resumes left, then the active
+   generation switches in one SQLite transaction, and a last catch-up
+   picks up writes that raced the switch. The old collections stay until
+   dropped, so `rollback` (also a job, the same steps in reverse) only
+   has to catch up on writes since the cutover.
+
+Resumes indexed before the candidate store existed must be backfilled
+first (`python -m app.candidates --backfill`). Resumes without a stored
+text are rebuilt from the current chunks, which is exact for the fixed
+chunker and drops nothing but overlap for the section chunker.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from .config import (
+    COLLECTION_NAME,
+    EMBEDDING_MODEL,
+    CHUNK_STRATEGY,
+    MIGRATION_BATCH_RESUMES,
+    MIGRATION_DUAL_READ,
+)
+from .db import get_connection, ensure_schema
+from .ingestion import write_vectors
+from .models import JobQuery
+from .retriever import retrieve_candidates_batch, retrieve_candidates
+from .search_cache import bump_collection_version
+from .vectorstore import (
+    active_generation,
+    activate_generation,
+    get_collection,
+    get_resume_collection,
+    drop_generation,
+)
+from . import candidates, jobs
+
+# A build stops chasing writes after this many catch-up passes;
+# cutover catches up once more anyway
+_MAX_PASSES = 5
+
+# Background shadow queries allowed in flight; more are skipped, not queued
+_dual_reads = threading.BoundedSemaphore(4)
+
+# Chunk overlap of utils.chunk_text_fixed, stripped when rebuilding texts
+_FIXED_OVERLAP = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS migrations (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    source TEXT NOT NULL,
+    source_model TEXT,
+    source_strategy TEXT,
+    target TEXT NOT NULL,
+    embedding_model TEXT NOT NULL,
+    chunk_strategy TEXT NOT NULL,
+    job_id TEXT,
+    cursor TEXT NOT NULL DEFAULT '',
+    pass_number INTEGER NOT NULL DEFAULT 1,
+    pass_since REAL NOT NULL DEFAULT 0,
+    pass_started REAL NOT NULL,
+    pass_done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    build_seconds REAL NOT NULL DEFAULT 0,
+    synced_at REAL,
+    compared INTEGER NOT NULL DEFAULT 0,
+    overlap_sum REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    cutover_at REAL
+);
+"""
+
+_COLUMNS = (
+    "id", "status", "source", "source_model", "source_strategy", "target",
+    "embedding_model", "chunk_strategy", "job_id", "cursor", "pass_number",
+    "pass_since", "pass_started", "pass_done", "total", "done", "chunks",
+    "build_seconds", "synced_at", "compared", "overlap_sum", "error",
+    "created_at", "updated_at", "cutover_at",
+)
+
+# Migrations holding a shadow collection that is not serving yet
+_OPEN_STATUSES = ("building", "ready")
+# No other migration may start while one is in any of these
+_BUSY_STATUSES = _OPEN_STATUSES + ("cutting_over", "rolling_back")
+
+
+def _connection():
+    ensure_schema(SCHEMA)
+    return get_connection()
+
+
+def _row_dict(row) -> Dict:
+    migration = dict(zip(_COLUMNS, row))
+    migration["progress"] = round(migration["done"] / migration["total"], 4) if migration["total"] else 1.0
+    migration["chunks_per_sec"] = (
+        round(migration["chunks"] / migration["build_seconds"], 1) if migration["build_seconds"] else 0.0
+    )
+    migration["dual_read_overlap"] = (
+        round(migration["overlap_sum"] / migration["compared"], 4) if migration["compared"] else None
+    )
+    return migration
+
+
+def get_migration(migration_id: str) -> Optional[Dict]:
+    row = _connection().execute(
+        f"SELECT {', '.join(_COLUMNS)} FROM migrations WHERE id = ?", (migration_id,)
+    ).fetchone()
+    return _row_dict(row) if row else None
+
+
+def list_migrations() -> List[Dict]:
+    rows = _connection().execute(
+        f"SELECT {', '.join(_COLUMNS)} FROM migrations ORDER BY created_at DESC"
+    ).fetchall()
+    return [_row_dict(row) for row in rows]
+
+
+def _update(migration_id: str, **fields):
+    fields["updated_at"] = time.time()
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+    conn = _connection()
+    with conn:
+        conn.execute(
+            f"UPDATE migrations SET {assignments} WHERE id = ?", (*fields.values(), migration_id)
+        )
+
+
+def target_generation(migration: Dict) -> Dict:
+    return {
+        "name": migration["target"],
+        "embedding_model": migration["embedding_model"],
+        "chunk_strategy": migration["chunk_strategy"],
+    }
+
+
+# ---------- Build ----------
+
+def start_migration(
+    embedding_model: Optional[str] = None,
+    chunk_strategy: Optional[str] = None,
+    queue_build: bool = True,
+) -> Dict:
+    """
+    Create a migration to a new generation and queue its build (unless
+    the caller runs `build` itself). Unset arguments keep the active
+    generation's model / strategy.
+    Raises ValueError while another migration is building or ready.
+    """
+    source = active_generation()
+    embedding_model = embedding_model or source["embedding_model"] or EMBEDDING_MODEL
+    chunk_strategy = chunk_strategy or source["chunk_strategy"] or CHUNK_STRATEGY
+
+    now = time.time()
+    migration_id = str(uuid.uuid4())
+    # Chroma names: 3-63 characters of [a-zA-Z0-9._-]
+    target = f"{COLLECTION_NAME[:40]}_g{int(now)}"
+
+    conn = _connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        placeholders = ",".join("?" * len(_BUSY_STATUSES))
+        busy = conn.execute(
+            f"SELECT id FROM migrations WHERE status IN ({placeholders})", _BUSY_STATUSES
+        ).fetchone()
+        if busy:
+            raise ValueError(f"Migration {busy[0]} is still open")
+
+        conn.execute(
+            "INSERT INTO migrations (id, status, source, source_model, source_strategy, target, "
+            "embedding_model, chunk_strategy, pass_started, total, created_at, updated_at) "
+            "VALUES (?, 'building', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                migration_id, source["name"], source["embedding_model"], source["chunk_strategy"],
+                target, embedding_model, chunk_strategy, now, candidates.count_candidates(), now, now,
+            ),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    if queue_build:
+        _update(migration_id, job_id=jobs.create_job("migration", migration_id))
+    return get_migration(migration_id)
+
+
+def _chunk_texts(resume_ids: List[str]) -> Dict[str, str]:
+    """Resume texts put back together from the active collection's chunks."""
+    generation = active_generation()
+    found = get_collection(generation).get(
+        where={"resume_id": {"$in": resume_ids}}, include=["documents", "metadatas"]
+    )
+
+    pieces = {}
+    for chunk_id, document, meta in zip(found["ids"], found["documents"], found["metadatas"]):
+        _, _, index = chunk_id.rpartition("-")
+        position = int(index) if index.isdigit() else 0
+        pieces.setdefault(meta.get("resume_id"), []).append((position, document or ""))
+
+    texts = {}
+    for resume_id, parts in pieces.items():
+        parts = [document for _, document in sorted(parts, key=lambda part: part[0])]
+        if generation.get("chunk_strategy") == "fixed":
+            texts[resume_id] = parts[0] + "".join(part[_FIXED_OVERLAP:] for part in parts[1:])
+        else:
+            texts[resume_id] = "\n\n".join(parts)
+    return texts
+
+
+def _rebuild(generation: Dict, page: List) -> int:
+    """Rewrite a page of (resume_id, metadata) into `generation`; returns chunks written."""
+    resume_ids = [resume_id for resume_id, _ in page]
+
+    texts = candidates.get_texts(resume_ids)
+    missing = [resume_id for resume_id in resume_ids if resume_id not in texts]
+    if missing:
+        texts.update(_chunk_texts(missing))
+
+    # Replace, don't merge: a re-chunked resume may have fewer chunks
+    get_collection(generation).delete(where={"resume_id": {"$in": resume_ids}})
+    resume_collection = get_resume_collection(generation)
+    existing = resume_collection.get(ids=resume_ids, include=[])["ids"]
+    if existing:
+        resume_collection.delete(ids=existing)
+
+    written = {}
+    write_vectors(
+        [(resume_id, texts[resume_id], metadata, 0) for resume_id, metadata in page if texts.get(resume_id)],
+        generation,
+        on_progress=written.__setitem__,
+    )
+    return sum(written.values())
+
+
+def _sync(generation: Dict, since: float) -> Tuple[float, int]:
+    """Rebuild every candidate updated at or after `since`; (next watermark, resumes rebuilt)."""
+    started = time.time()
+    after, rebuilt = "", 0
+    while True:
+        page = candidates.list_candidates(after, MIGRATION_BATCH_RESUMES, updated_since=since)
+        if not page:
+            return started, rebuilt
+        _rebuild(generation, page)
+        after = page[-1][0]
+        rebuilt += len(page)
+
+
+def _catch_up(generation: Dict, since: float) -> float:
+    """
+    Catch-up passes until one rebuilds at most a page of resumes, so the
+    delta left for after a switch is small; returns the watermark.
+    """
+    for _ in range(_MAX_PASSES):
+        since, rebuilt = _sync(generation, since)
+        if rebuilt <= MIGRATION_BATCH_RESUMES:
+            break
+    return since
+
+
+def build(migration_id: str, stop: Optional[threading.Event] = None):
+    """
+    Run (or resume) a migration's build from its checkpoint until the
+    shadow collections are caught up, or the migration is cancelled.
+    """
+    while not (stop and stop.is_set()):
+        migration = get_migration(migration_id)
+        if migration is None:
+            return
+        if migration["status"] == "cancelled":
+            # A page in flight during `cancel` may have recreated the shadow
+            drop_generation(migration["target"])
+        if migration["status"] != "building":
+            return
+
+        page = candidates.list_candidates(
+            migration["cursor"], MIGRATION_BATCH_RESUMES, updated_since=migration["pass_since"]
+        )
+
+        if page:
+            started = time.perf_counter()
+            chunks = _rebuild(target_generation(migration), page)
+            # Checkpoint: the next page starts after this cursor
+            _update(
+                migration_id,
+                cursor=page[-1][0],
+                pass_done=migration["pass_done"] + len(page),
+                done=migration["done"] + len(page),
+                chunks=migration["chunks"] + chunks,
+                build_seconds=migration["build_seconds"] + time.perf_counter() - started,
+            )
+            continue
+
+        if migration["pass_done"] == 0 or migration["pass_number"] >= _MAX_PASSES:
+            _update(migration_id, status="ready", synced_at=migration["pass_started"])
+            return
+
+        # Catch up on resumes written while the previous pass ran
+        now = time.time()
+        _update(
+            migration_id,
+            cursor="",
+            pass_number=migration["pass_number"] + 1,
+            pass_since=migration["pass_started"],
+            pass_started=now,
+            pass_done=0,
+            total=migration["total"] + candidates.count_candidates(migration["pass_started"]),
+        )
+
+
+def run_job(job: Dict):
+    """Entry point for "migration" jobs claimed by app/worker.py: build, cutover or rollback."""
+    migration_id = job["source"]
+    try:
+        migration = get_migration(migration_id)
+        status = migration["status"] if migration else None
+        if status == "cutting_over":
+            _finish_cutover(migration)
+        elif status == "rolling_back":
+            _finish_rollback(migration)
+        elif status == "active" and (migration["synced_at"] or 0) < (migration["cutover_at"] or 0):
+            # A retried cutover job that died between the switch and the last catch-up
+            generation = target_generation(migration)
+            _update(migration_id, synced_at=_sync(generation, migration["synced_at"] or 0)[0])
+        else:
+            build(migration_id)
+    except Exception as exc:
+        _update(migration_id, error=str(exc))
+        raise
+    jobs.finish_job(job["job_id"], "completed")
+
+
+def cancel(migration_id: str) -> Optional[Dict]:
+    """Stop a migration that has not cut over and drop its shadow collections."""
+    migration = get_migration(migration_id)
+    if migration is None:
+        return None
+    if migration["status"] not in _OPEN_STATUSES:
+        raise ValueError(f"Migration is {migration['status']}")
+
+    _update(migration_id, status="cancelled")
+    drop_generation(migration["target"])
+    return get_migration(migration_id)
+
+
+# ---------- Dual read ----------
+
+def ready_migration() -> Optional[Dict]:
+    row = _connection().execute(
+        f"SELECT {', '.join(_COLUMNS)} FROM migrations WHERE status = 'ready' "
+        f"ORDER BY created_at DESC LIMIT 1"
+    ).fetchone()
+    return _row_dict(row) if row else None
+
+
+def _overlap(served: List[str], shadow: List[str]) -> float:
+    if not served:
+        return 1.0 if not shadow else 0.0
+    return len(set(served) & set(shadow)) / len(served)
+
+
+def _record(migration_id: str, overlaps: List[float]):
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "UPDATE migrations SET compared = compared + ?, overlap_sum = overlap_sum + ? WHERE id = ?",
+            (len(overlaps), sum(overlaps), migration_id),
+        )
+
+
+def _shadow_read(migration: Dict, job_query, served_ids: List[str]):
+    try:
+        shadow = retrieve_candidates(job_query, target_generation(migration))
+        _record(migration["id"], [_overlap(served_ids, [c["resume_id"] for c in shadow])])
+    except Exception:
+        pass  # a comparison must never affect serving
+    finally:
+        _dual_reads.release()
+
+
+def dual_read(job_query, served: List[Dict]):
+    """
+    With MIGRATION_DUAL_READ on and a ready shadow generation, repeat
+    `job_query` against the shadow on a background thread and record
+    the top-k overlap with the `served` candidates.
+    """
+    if not MIGRATION_DUAL_READ:
+        return
+    migration = ready_migration()
+    if migration is None or not _dual_reads.acquire(blocking=False):
+        return
+
+    threading.Thread(
+        target=_shadow_read,
+        args=(migration, job_query, [c["resume_id"] for c in served]),
+        daemon=True,
+    ).start()
+
+
+def _sample_queries(sample: int, top_k: int) -> List[JobQuery]:
+    """JDs made from the opening of randomly chosen stored resumes."""
+    return [
+        JobQuery(job_description=text[:1000], top_k=top_k, min_experience=None)
+        for text in candidates.sample_texts(sample)
+    ]
+
+
+def compare(migration_id: str, queries: Optional[List] = None, sample: int = 50, top_k: int = 10) -> Dict:
+    """
+    Run `queries` (default: `sample` JDs drawn from stored resumes) against
+    the active and the shadow generation and report top-k overlap.
+    """
+    migration = get_migration(migration_id)
+    if migration is None:
+        raise KeyError(migration_id)
+
+    queries = queries or _sample_queries(sample, top_k)
+    served = retrieve_candidates_batch(queries)
+    shadow = retrieve_candidates_batch(queries, target_generation(migration))
+
+    overlaps = [
+        _overlap([c["resume_id"] for c in a], [c["resume_id"] for c in b])
+        for a, b in zip(served, shadow)
+    ]
+    _record(migration_id, overlaps)
+
+    return {
+        "migration_id": migration_id,
+        "queries": len(overlaps),
+        "mean_overlap": round(sum(overlaps) / len(overlaps), 4) if overlaps else None,
+        "min_overlap": round(min(overlaps), 4) if overlaps else None,
+    }
+
+
+# ---------- Cutover ----------
+
+def _queue(migration_id: str, from_status: str, to_status: str, queue_job: bool) -> Dict:
+    """
+    Move a migration to `to_status` and queue the job that completes the
+    switch (or run it here). Asking again while a previous job for it has
+    failed queues a new one.
+    """
+    conn = _connection()
+    with conn:
+        moved = conn.execute(
+            "UPDATE migrations SET status = ?, error = NULL, updated_at = ? WHERE id = ? AND status = ?",
+            (to_status, time.time(), migration_id, from_status),
+        ).rowcount
+
+    migration = get_migration(migration_id)
+    if not moved:
+        if migration["status"] != to_status:
+            raise ValueError(f"Migration is {migration['status']}, not {from_status}")
+        job = jobs.get_job(migration["job_id"], include_items=False) if migration["job_id"] else None
+        if job is not None and job["status"] != "failed":
+            return migration
+
+    if queue_job:
+        _update(migration_id, job_id=jobs.create_job("migration", migration_id))
+    elif to_status == "cutting_over":
+        _finish_cutover(migration)
+    else:
+        _finish_rollback(migration)
+    return get_migration(migration_id)
+
+
+def cutover(migration_id: str, queue_job: bool = True) -> Dict:
+    """
+    Switch serving to the migration's generation: queues a "migration"
+    job that catches up, swaps the active generation and catches up once
+    more (or runs it here). Follow `status` from cutting_over to active.
+    """
+    migration = get_migration(migration_id)
+    if migration is None:
+        raise KeyError(migration_id)
+    return _queue(migration_id, "ready", "cutting_over", queue_job)
+
+
+def _switch(migration_id: str, generation: Dict, from_status: str, to_status: str) -> bool:
+    """Atomically serve `generation` and mark the migration; False if another job already did."""
+    now = time.time()
+    conn = _connection()
+    with conn:
+        switched = conn.execute(
+            "UPDATE migrations SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (to_status, now, migration_id, from_status),
+        ).rowcount
+        if switched:
+            activate_generation(generation, conn)
+            if to_status == "active":
+                conn.execute(
+                    "UPDATE migrations SET status = 'retired' WHERE status = 'active' AND id != ?",
+                    (migration_id,),
+                )
+                conn.execute("UPDATE migrations SET cutover_at = ? WHERE id = ?", (now, migration_id))
+    if switched:
+        bump_collection_version()
+    return bool(switched)
+
+
+def _finish_cutover(migration: Dict):
+    generation = target_generation(migration)
+    watermark = _catch_up(generation, migration["synced_at"] or 0)
+    if _switch(migration["id"], generation, "cutting_over", "active"):
+        # Ingests that resolved the old generation just before the switch
+        _update(migration["id"], synced_at=_sync(generation, watermark)[0])
+
+
+def _previous_generation(migration: Dict) -> Dict:
+    return {
+        "name": migration["source"],
+        "embedding_model": migration["source_model"],
+        "chunk_strategy": migration["source_strategy"],
+    }
+
+
+def rollback(queue_job: bool = True) -> Dict:
+    """
+    Serve the generation the active migration replaced again: queues a
+    "migration" job that catches it up on writes since the cutover and
+    switches back (or runs it here).
+    """
+    row = _connection().execute(
+        f"SELECT {', '.join(_COLUMNS)} FROM migrations WHERE status IN ('active', 'rolling_back') "
+        f"ORDER BY cutover_at DESC LIMIT 1"
+    ).fetchone()
+    if row is None:
+        raise ValueError("No active migration to roll back")
+    return _queue(row[0], "active", "rolling_back", queue_job)
+
+
+def _finish_rollback(migration: Dict):
+    previous = _previous_generation(migration)
+    watermark = _catch_up(previous, migration["cutover_at"] or 0)
+    if _switch(migration["id"], previous, "rolling_back", "rolled_back"):
+        _sync(previous, watermark)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collection migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    start = commands.add_parser("start", help="queue a migration (run workers to build it)")
+    start.add_argument("--embedding-model")
+    start.add_argument("--chunk-strategy", choices=("section", "fixed"))
+    start.add_argument("--build", action="store_true", help="build in this process")
+
+    status = commands.add_parser("status", help="show migrations")
+    status.add_argument("migration_id", nargs="?")
+
+    check = commands.add_parser("compare", help="top-k overlap, active vs shadow")
+    check.add_argument("migration_id")
+    check.add_argument("--sample", type=int, default=50)
+    check.add_argument("--top-k", type=int, default=10)
+
+    switch = commands.add_parser("cutover", help="serve the migrated generation")
+    switch.add_argument("migration_id")
+
+    commands.add_parser("rollback", help="serve the previous generation again")
+
+    stop = commands.add_parser("cancel", help="abandon a migration")
+    stop.add_argument("migration_id")
+
+    drop = commands.add_parser("drop", help="delete an inactive generation's collections")
+    drop.add_argument("name")
+
+    args = parser.parse_args()
+
+    if args.command == "start":
+        result = start_migration(args.embedding_model, args.chunk_strategy, queue_build=not args.build)
+        if args.build:
+            build(result["id"])
+            result = get_migration(result["id"])
+    elif args.command == "status":
+        result = get_migration(args.migration_id) if args.migration_id else list_migrations()
+    elif args.command == "compare":
+        result = compare(args.migration_id, sample=args.sample, top_k=args.top_k)
+    elif args.command == "cutover":
+        result = cutover(args.migration_id, queue_job=False)
+    elif args.command == "rollback":
+        result = rollback(queue_job=False)
+    elif args.command == "cancel":
+        result = cancel(args.migration_id)
+    else:
+        drop_generation(args.name)
+        result = {"dropped": args.name}
+
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,20 @@ class JobQuery(BaseModel):
     min_experience: Optional[int] = 0
     location: Optional[str] = None
     top_k: Optional[int] = 20
+    required_skills: Optional[List[str]] = None
+    preferred_skills: Optional[List[str]] = None
+
+class BatchSearchInput(BaseModel):
+    queries: List[JobQuery]
+
+class MigrationInput(BaseModel):
+    embedding_model: Optional[str] = None
+    chunk_strategy: Optional[str] = None
+
+class MigrationCompareInput(BaseModel):
+    queries: Optional[List[JobQuery]] = None
+    sample: int = 50
+    top_k: int = 10
 
 class ResumeFetchResponse(BaseModel):
     count: int
@@ -0,0 +1,199 @@
+"""
+Resume text extraction service.
+
+Extraction runs in a process pool so a large or malformed file never
+stalls the calling thread. Large PDFs are split into page ranges that
+are extracted in parallel. Every file is bounded by EXTRACTION_TIMEOUT
+seconds, MAX_PDF_PAGES pages and MAX_RESUME_LENGTH characters.
+
+This module is imported by the pool's worker processes, so it must stay
+light: no OpenAI clients or vector store imports.
+"""
+import multiprocessing
+import signal
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Tuple
+from pypdf import PdfReader
+from docx import Document
+from ..config import (
+    EXTRACTION_WORKERS,
+    EXTRACTION_TIMEOUT,
+    MAX_PDF_PAGES,
+    PDF_PAGES_PER_TASK,
+    MAX_RESUME_LENGTH,
+)
+
+
+class ExtractionError(Exception):
+    """Raised when a resume file cannot be turned into text."""
+
+
+_pool = None
+_coordinator = None
+_pool_lock = threading.Lock()
+
+
+# ---------- Worker-side functions (run in pool processes) ----------
+
+def _alarm(seconds: float):
+    # Frees the worker process itself on timeout; not available on Windows
+    if hasattr(signal, "setitimer"):
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+
+
+def _clear_alarm():
+    if hasattr(signal, "setitimer"):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _on_alarm(signum, frame):
+    raise TimeoutError("extraction timed out")
+
+
+def _init_worker():
+    if hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, _on_alarm)
+
+
+def extract_pdf_pages(file_path: str, start: int, stop: int, timeout: float) -> Tuple[str, int]:
+    """
+    Extract pages [start, stop) of a PDF.
+    Returns (text, total page count of the document).
+    """
+    _alarm(timeout)
+    try:
+        reader = PdfReader(file_path)
+        total_pages = len(reader.pages)
+
+        parts = []
+        length = 0
+        for index in range(start, min(stop, total_pages)):
+            page_text = reader.pages[index].extract_text() or ""
+            parts.append(page_text)
+            length += len(page_text)
+            if length >= MAX_RESUME_LENGTH:
+                break
+
+        return "\n".join(parts), total_pages
+    finally:
+        _clear_alarm()
+
+
+def extract_docx(file_path: str, timeout: float) -> str:
+    _alarm(timeout)
+    try:
+        doc = Document(file_path)
+
+        parts = []
+        length = 0
+        for para in doc.paragraphs:
+            parts.append(para.text)
+            length += len(para.text) + 1
+            if length >= MAX_RESUME_LENGTH:
+                break
+
+        return "\n".join(parts)
+    finally:
+        _clear_alarm()
+
+
+# ---------- Service (caller side) ----------
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the server process is multi-threaded
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def _get_coordinator() -> ThreadPoolExecutor:
+    # Threads only wait on pool futures, so a few per process is plenty
+    global _coordinator
+    with _pool_lock:
+        if _coordinator is None:
+            _coordinator = ThreadPoolExecutor(max_workers=EXTRACTION_WORKERS * 2)
+        return _coordinator
+
+
+def _result(future: Future, deadline: float, file_path: str):
+    try:
+        return future.result(timeout=max(deadline - time.monotonic(), 0))
+    except (FutureTimeoutError, TimeoutError):
+        future.cancel()
+        raise ExtractionError(f"Timed out extracting {file_path}")
+
+
+def _extract_pdf(file_path: str, deadline: float) -> str:
+    pool = _get_pool()
+    page_limit = MAX_PDF_PAGES
+
+    # First task extracts the leading pages and reports the page count,
+    # so small resumes take a single round trip
+    first_stop = min(PDF_PAGES_PER_TASK, page_limit)
+    first_text, total_pages = _result(
+        pool.submit(extract_pdf_pages, file_path, 0, first_stop, EXTRACTION_TIMEOUT),
+        deadline,
+        file_path,
+    )
+    parts = [first_text]
+
+    last_page = min(total_pages, page_limit)
+    if last_page > first_stop and len(first_text) < MAX_RESUME_LENGTH:
+        futures = [
+            pool.submit(
+                extract_pdf_pages,
+                file_path,
+                start,
+                min(start + PDF_PAGES_PER_TASK, last_page),
+                EXTRACTION_TIMEOUT,
+            )
+            for start in range(first_stop, last_page, PDF_PAGES_PER_TASK)
+        ]
+        parts.extend(_result(future, deadline, file_path)[0] for future in futures)
+
+    return "\n".join(parts)
+
+
+def extract_text(file_path: str) -> str:
+    """
+    Extract resume text from a PDF or DOCX file via the process pool.
+    Raises ValueError for unsupported types and ExtractionError on failure.
+    """
+    # Not at module level: pool workers import this module and don't need metrics
+    from ..metrics import stage
+
+    extension = file_path.split(".")[-1].lower()
+    deadline = time.monotonic() + EXTRACTION_TIMEOUT
+
+    try:
+        with stage("ingest.extract"):
+            if extension == "pdf":
+                text = _extract_pdf(file_path, deadline)
+            elif extension == "docx":
+                text = _result(
+                    _get_pool().submit(extract_docx, file_path, EXTRACTION_TIMEOUT),
+                    deadline,
+                    file_path,
+                )
+            else:
+                raise ValueError("Unsupported file type")
+    except (ValueError, ExtractionError):
+        raise
+    except Exception as e:
+        raise ExtractionError(f"Failed to extract {file_path}: {e}") from e
+
+    return text[:MAX_RESUME_LENGTH]
+
+
+def submit(file_path: str) -> Future:
+    """Non-blocking `extract_text`; returns a Future with the text."""
+    return _get_coordinator().submit(extract_text, file_path)
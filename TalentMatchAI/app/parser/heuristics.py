@@ -0,0 +1,192 @@
+"""
+Deterministic resume field extraction.
+
+Pulls the fields that follow a fixed shape (email, phone, the skills
+section, a stated "N years of experience") with precompiled regexes, and
+cuts the resume down to the parts an LLM needs for the rest.
+
+Name, location, education and experience from date ranges are only
+guessed: a title line looks like a name, an address line holds more
+than the city. They are returned as hints for the model to confirm or
+correct, never as final values, so `resume_parser` always asks the model
+for them.
+"""
+import re
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from ..utils import split_sections
+
+FIELDS = ("name", "email", "phone", "skills", "experience", "education", "location")
+
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}")
+_PHONE_RE = re.compile(r"(?<![\w+])(\+?\d[\d \-().]{8,}\d)(?!\w)")
+_NAME_RE = re.compile(r"^[A-Z][a-zA-Z'.\-]+(?: [A-Z][a-zA-Z'.\-]*){1,3}$")
+_LOCATION_RE = re.compile(r"^\s*(?:location|city|address|based in)\s*[:\-–]\s*([^|\n]+)", re.I | re.M)
+_YEARS_RE = re.compile(r"(\d{1,2})(?:\.\d)?\+?\s*(?:years?|yrs?)(?:\s+of)?\s+(?:\w+\s+){0,3}?experience", re.I)
+_RANGE_RE = re.compile(
+    r"\b((?:19|20)\d{2})\s*(?:-|–|—|to)\s*((?:19|20)\d{2}|present|current|now|till date|date)\b", re.I
+)
+_SKILL_SPLIT_RE = re.compile(r"\s*(?:,|\||•|;|/|\t|·)\s*")
+
+_EXPERIENCE_SECTIONS = {
+    "experience", "work experience", "professional experience", "employment",
+    "employment history", "work history", "career history",
+}
+_SKILL_SECTIONS = {
+    "skills", "technical skills", "core skills", "key skills", "skills & tools",
+    "tools", "technologies", "competencies", "core competencies",
+}
+_EDUCATION_SECTIONS = {"education", "academic background", "qualifications"}
+_SUMMARY_SECTIONS = {
+    "summary", "profile", "professional summary", "career summary", "objective",
+    "career objective", "about me",
+}
+
+# Top-of-resume lines kept in the prompt (name, contact details, headline)
+HEADER_LINES = 8
+
+
+def _sections(text: str) -> Dict[str, List[str]]:
+    found = {}
+    for heading, lines in split_sections(text):
+        found.setdefault((heading or "").lower(), []).extend(lines)
+    return found
+
+
+def _first(sections: Dict[str, List[str]], names) -> List[str]:
+    return next((sections[name] for name in sections if name in names), [])
+
+
+def _phone(text: str) -> Optional[str]:
+    for match in _PHONE_RE.finditer(text):
+        candidate = match.group(1).strip()
+        digits = re.sub(r"\D", "", candidate)
+        # Date ranges like "2015 - 2019" are 8 digits and never start with +
+        if 10 <= len(digits) <= 15 and not _RANGE_RE.fullmatch(candidate):
+            return candidate
+    return None
+
+
+def _name(header: List[str]) -> Optional[str]:
+    for line in header[:3]:
+        line = line.strip()
+        if _NAME_RE.match(line) and not any(ch.isdigit() for ch in line):
+            return line
+    return None
+
+
+def _skills(lines: List[str]) -> List[str]:
+    skills, seen = [], set()
+    for line in lines:
+        line = line.lstrip("-*• ").split(":", 1)[-1]
+        for skill in _SKILL_SPLIT_RE.split(line):
+            skill = skill.strip(" .")
+            if skill and len(skill) <= 40 and skill.lower() not in seen:
+                seen.add(skill.lower())
+                skills.append(skill)
+    return skills
+
+
+def _experience(lines: List[str]) -> Optional[int]:
+    """Years covered by the union of date ranges in the experience section."""
+    this_year = date.today().year
+    ranges = []
+    for start, end in _RANGE_RE.findall("\n".join(lines)):
+        end = int(end) if end[:1].isdigit() else this_year
+        if int(start) <= end <= this_year:
+            ranges.append((int(start), end))
+    if not ranges:
+        return None
+
+    # Overlapping roles count once
+    total, current_start, current_end = 0, None, None
+    for start, end in sorted(ranges):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    return total + current_end - current_start
+
+
+def extract_fields(text: str) -> Tuple[Dict, Dict]:
+    """
+    (fields, hints): fields that can be read off the text reliably (absent
+    keys are unknown), and guesses for others that the model must check.
+    """
+    sections = _sections(text)
+    header = sections.get("", [])
+    fields, hints = {}, {}
+
+    email = _EMAIL_RE.search(text)
+    if email:
+        fields["email"] = email.group(0)
+
+    phone = _phone("\n".join(header) or text)
+    if phone:
+        fields["phone"] = phone
+
+    skills = _skills(_first(sections, _SKILL_SECTIONS))
+    if skills:
+        fields["skills"] = skills
+
+    stated = [int(years) for years in _YEARS_RE.findall(text)]
+    if stated:
+        fields["experience"] = max(stated)
+    else:
+        experience = _experience(_first(sections, _EXPERIENCE_SECTIONS))
+        if experience is not None:
+            hints["experience"] = experience
+
+    name = _name(header)
+    if name:
+        hints["name"] = name
+
+    location = _LOCATION_RE.search(text)
+    if location:
+        hints["location"] = location.group(1).strip()
+
+    education = _first(sections, _EDUCATION_SECTIONS)
+    if education:
+        hints["education"] = education[0].strip()
+
+    return fields, hints
+
+
+def missing_fields(fields: Dict) -> List[str]:
+    return [field for field in FIELDS if field not in fields]
+
+
+def prompt_excerpt(text: str, needed: List[str], max_chars: int) -> str:
+    """
+    The parts of a resume the model needs to fill `needed`: the header
+    (name, contact, location), summary, role lines with dates for
+    experience, and the skills / education sections.
+    """
+    sections = split_sections(text)
+    # Without a skills section the model has to read them off the role bullets
+    bullets = "skills" in needed and not any((h or "").lower() in _SKILL_SECTIONS for h, _ in sections)
+
+    parts: List[Tuple[str, List[str]]] = []
+    for heading, lines in sections:
+        key = (heading or "").lower()
+        if not heading:
+            parts.append(("", lines[:HEADER_LINES]))
+        elif key in _SUMMARY_SECTIONS and ({"experience", "location"} & set(needed)):
+            parts.append((heading, lines))
+        elif key in _EXPERIENCE_SECTIONS and bullets:
+            parts.append((heading, lines))
+        elif key in _EXPERIENCE_SECTIONS and ({"experience", "location"} & set(needed)):
+            # Role / company / date lines, not the bullet points under them
+            parts.append((heading, [line for line in lines if _RANGE_RE.search(line)] or lines[:4]))
+        elif key in _SKILL_SECTIONS and "skills" in needed:
+            parts.append((heading, lines))
+        elif key in _EDUCATION_SECTIONS and "education" in needed:
+            parts.append((heading, lines))
+
+    excerpt = "\n\n".join(
+        "\n".join(([heading] if heading else []) + lines) for heading, lines in parts if lines
+    )
+    # No recognizable sections: fall back to the start of the resume
+    return (excerpt if len(excerpt) > 200 else text)[:max_chars]
@@ -1,82 +1,242 @@
+import asyncio
 import json
-import re
-from pypdf import PdfReader
-from docx import Document
-from openai import OpenAI
-from ..config import OPENAI_API_KEY
-
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-# ---------- PDF / DOCX Extraction ----------
-
-def extract_text_from_pdf(file_path: str) -> str:
-    reader = PdfReader(file_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
-    return text
-
-
-def extract_text_from_docx(file_path: str) -> str:
-    doc = Document(file_path)
-    return "\n".join([para.text for para in doc.paragraphs])
-
-
-def parse_resume(file_path: str) -> str:
-    extension = file_path.split(".")[-1].lower()
-    if extension == "pdf":
-        return extract_text_from_pdf(file_path)
-    elif extension == "docx":
-        return extract_text_from_docx(file_path)
-    else:
-        raise ValueError("Unsupported file type")
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+import openai
+from ..config import (
+    STRUCTURE_BATCH_SIZE,
+    STRUCTURE_CONCURRENCY,
+    STRUCTURE_MAX_CHARS,
+    STRUCTURE_CACHE_ENABLED,
+)
+from ..db import get_connection, ensure_schema
+from ..embedding_cache import text_hash
+from .. import llm_gateway
+from ..metrics import stage
+from .heuristics import FIELDS, extract_fields, missing_fields, prompt_excerpt
+
+logger = logging.getLogger(__name__)
+
+MODEL = "gpt-4o-mini"
 
 # ---------- AI Structured Parser ----------
+#
+# Fields with a fixed shape come from `heuristics`; the model is asked
+# only for the rest (with the heuristics' guesses as hints to check),
+# sees only the resume sections that hold them, and structures up to
+# STRUCTURE_BATCH_SIZE resumes per request. Results are
+# cached by content hash, so re-uploads and re-fetched emails are free.
+# A batch the API still fails after the gateway's retries keeps its
+# heuristic fields rather than failing every resume in the call.
+
+# Bump when the prompt or heuristics change what a cached result means
+STRUCTURE_VERSION = "3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS structured_resumes (
+    content_hash TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+FIELD_SPECS = {
+    "name": "string",
+    "email": "string",
+    "phone": "string",
+    "skills": "list of strings",
+    "experience": "int (total years of professional experience)",
+    "education": "string (highest degree)",
+    "location": "string (city)",
+}
+
+
+def _cache_key(resume_text: str) -> str:
+    return f"{STRUCTURE_VERSION}:{text_hash(resume_text)}"
+
+
+def _cached(keys: List[str]) -> Dict[str, dict]:
+    if not STRUCTURE_CACHE_ENABLED or not keys:
+        return {}
+    ensure_schema(SCHEMA)
+    found = {}
+    for i in range(0, len(keys), 500):
+        page = keys[i:i + 500]
+        rows = get_connection().execute(
+            f"SELECT content_hash, data FROM structured_resumes "
+            f"WHERE content_hash IN ({','.join('?' * len(page))})",
+            page,
+        ).fetchall()
+        found.update((key, json.loads(data)) for key, data in rows)
+    return found
+
+
+def _store(results: Dict[str, dict]):
+    if not STRUCTURE_CACHE_ENABLED or not results:
+        return
+    ensure_schema(SCHEMA)
+    conn = get_connection()
+    now = time.time()
+    conn.executemany(
+        "INSERT OR REPLACE INTO structured_resumes (content_hash, data, created_at) VALUES (?, ?, ?)",
+        [(key, json.dumps(data), now) for key, data in results.items()],
+    )
+    conn.commit()
 
-def structure_resume(resume_text: str) -> dict:
-    """
-    Uses AI to extract structured resume data.
-    Returns a dict with:
-    name, email, phone, skills (list), experience (numeric years), education, location
-    """
 
-    prompt = f"""
-    Extract structured data in STRICT JSON format with this schema:
+def _structure_prompt(batch: List[dict]) -> str:
+    needed = [field for field in FIELD_SPECS if any(field in entry["needed"] for entry in batch)]
+    schema = ",\n".join(f'            "{field}": {FIELD_SPECS[field]}' for field in needed)
+    resumes = "\n\n".join(
+        f"### Resume {entry['id']} (fields: {', '.join(entry['needed'])})\n"
+        + (f"Guesses: {json.dumps(entry['hints'])}\n" if entry["hints"] else "")
+        + entry["excerpt"]
+        for entry in batch
+    )
+    return f"""
+    Extract structured data from each resume below in STRICT JSON format:
 
     {{
-        "name": string,
-        "email": string,
-        "phone": string,
-        "skills": list of strings,
-        "experience": int,       # total years of experience
-        "education": string,
-        "location": string       # city
+        "resumes": [
+            {{
+            "id": string (the resume id given below),
+{schema}
+            }}
+        ]
     }}
 
     Instructions:
+    - Return one object per resume, with only the fields listed for it.
     - Calculate total professional experience in years and return as an integer.
-    - Extract location as a single clean string (city).
+    - Extract location as a single clean string (city), not a street address.
+    - "Guesses" come from pattern matching and may be wrong (e.g. a job title taken
+      for the name). Use a guess only if the resume text confirms it.
     - Return JSON ONLY. Do not include any extra text.
 
-    Resume:
-    {resume_text}
+{resumes}
     """
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
+
+def _request(batch: List[dict]) -> dict:
+    return dict(
+        model=MODEL,
+        messages=[{"role": "user", "content": _structure_prompt(batch)}],
         response_format={"type": "json_object"},
         temperature=0
     )
 
-    content = response.choices[0].message.content
-    
+
+def _parse_structured(content: str) -> Dict[str, dict]:
+    """{resume id: fields} from a model reply; empty if unparseable."""
     try:
-        structured_data = json.loads(content)
-    except json.JSONDecodeError:
-        structured_data = {}
+        results = json.loads(content).get("resumes", [])
+    except (json.JSONDecodeError, AttributeError, TypeError):
+        return {}
+
+    return {
+        str(result["id"]): result
+        for result in results
+        if isinstance(result, dict) and result.get("id") is not None
+    }
+
+
+def _prepare(texts: List[str]) -> Tuple[List[dict], List[List[dict]]]:
+    """Entries with heuristic fields and cache hits filled in, and the LLM batches for the rest."""
+    keys = [_cache_key(text) for text in texts]
+    cached = _cached(sorted(set(keys)))
+
+    entries, pending, seen = [], [], {}
+    for index, (text, key) in enumerate(zip(texts, keys)):
+        entry = {"id": f"r{index}", "key": key, "fields": cached.get(key)}
+        entries.append(entry)
+        if entry["fields"] is not None:
+            continue
+        if key in seen:
+            # Same resume twice in one call: structure it once
+            entry["same_as"] = seen[key]
+            continue
+        seen[key] = entry
+
+        entry["fields"], hints = extract_fields(text)
+        entry["needed"] = missing_fields(entry["fields"])
+        entry["hints"] = {field: hints[field] for field in entry["needed"] if field in hints}
+        if entry["needed"]:
+            entry["excerpt"] = prompt_excerpt(text, entry["needed"], STRUCTURE_MAX_CHARS)
+            pending.append(entry)
+
+    batches = [pending[i:i + STRUCTURE_BATCH_SIZE] for i in range(0, len(pending), STRUCTURE_BATCH_SIZE)]
+    return entries, batches
+
+
+def _merge(batch: List[dict], parsed: Dict[str, dict]):
+    for entry in batch:
+        result = parsed.get(entry["id"], {})
+        for field in entry["needed"]:
+            if result.get(field) not in (None, ""):
+                entry["fields"][field] = result[field]
+        entry["answered"] = entry["id"] in parsed
+
+
+def _finish(entries: List[dict]) -> List[dict]:
+    # Only cache complete answers; a failed batch is retried next time
+    _store({
+        entry["key"]: entry["fields"]
+        for entry in entries
+        if "needed" in entry and (not entry["needed"] or entry.get("answered"))
+    })
+
+    results = []
+    for entry in entries:
+        fields = (entry.get("same_as") or entry)["fields"]
+        structured_data = {field: fields.get(field) for field in FIELDS if field in fields}
+        # Skills as a list (for Chroma metadata)
+        structured_data["skills"] = structured_data.get("skills") or []
+        results.append(structured_data)
+    return results
+
+
+def _structure_batch(batch: List[dict]):
+    try:
+        response = llm_gateway.complete("structure", **_request(batch))
+    except openai.OpenAIError as e:
+        logger.warning("Structuring a batch of %d resumes failed, keeping heuristic fields: %r", len(batch), e)
+        return
+    _merge(batch, _parse_structured(response.choices[0].message.content))
+
+
+def structure_resumes(resume_texts: List[str]) -> List[dict]:
+    """
+    Structured data for several resumes, in order. Each is a dict with
+    name, email, phone, skills (list), experience (numeric years),
+    education, location (fields that could not be found are left out).
+    """
+    with stage("ingest.structure"):
+        entries, batches = _prepare(resume_texts)
+        if len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(batches), STRUCTURE_CONCURRENCY)) as pool:
+                list(pool.map(_structure_batch, batches))
+        elif batches:
+            _structure_batch(batches[0])
+        return _finish(entries)
 
-    # Flatten skills to string (for Chroma metadata)
-    structured_data["skills"] = structured_data.get("skills", [])
 
-    return structured_data
+async def astructure_resumes(resume_texts: List[str]) -> List[dict]:
+    """
+    Async variant of `structure_resumes` for concurrent pipelines.
+    """
+    with stage("ingest.structure"):
+        entries, batches = await asyncio.to_thread(_prepare, resume_texts)
+
+        async def run(batch):
+            try:
+                response = await llm_gateway.acomplete("structure", **_request(batch))
+            except openai.OpenAIError as e:
+                logger.warning("Structuring a batch of %d resumes failed, keeping heuristic fields: %r",
+                               len(batch), e)
+                return
+            _merge(batch, _parse_structured(response.choices[0].message.content))
+
+        await asyncio.gather(*(run(batch) for batch in batches))
+        return await asyncio.to_thread(_finish, entries)
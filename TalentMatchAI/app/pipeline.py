@@ -0,0 +1,296 @@
+"""
+Staged resume intake pipeline.
+
+    source -> extract text -> structure (LLM) -> embed + index
+
+Each stage runs on its own thread and hands work to the next through a
+bounded queue, so a slow stage applies backpressure instead of buffering
+the whole intake in memory. Text extraction goes through the process-pool
+extraction service and LLM structuring runs as concurrent coroutines on a
+shared event loop, several resumes per request.
+
+The pipeline works on the items of a durable job (app/jobs.py). Every
+stage records its output on the item, so a job that is interrupted and
+claimed again skips the work it already did, down to individual chunks.
+"""
+import asyncio
+import queue
+import threading
+import traceback
+from collections import deque
+from typing import Dict, List
+from .config import (
+    PIPELINE_QUEUE_SIZE,
+    EXTRACTION_WORKERS,
+    PIPELINE_STRUCTURE_CONCURRENCY,
+    PIPELINE_INDEX_BATCH,
+    STRUCTURE_BATCH_SIZE,
+)
+from . import dedup, jobs
+from .ingestion import plan_resumes, index_resumes, count_chunks
+from .search_cache import bump_collection_version
+from .metrics import PIPELINE_QUEUE
+from .parser import extraction
+from .parser.resume_parser import astructure_resumes
+
+_DONE = object()
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Long-lived event loop for LLM calls, shared by all pipeline runs."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, daemon=True).start()
+        return _loop
+
+
+class _StageQueue(queue.Queue):
+    """Bounded hand-off between two stages; its depth is exported as a metric."""
+
+    def __init__(self, name: str):
+        super().__init__(maxsize=PIPELINE_QUEUE_SIZE)
+        self._depth = PIPELINE_QUEUE.labels(name)
+
+    def _put(self, item):
+        super()._put(item)
+        self._depth.inc()
+
+    def _get(self):
+        self._depth.dec()
+        return super()._get()
+
+
+def resume_metadata(file_path: str, structured_data: dict, source: str) -> dict:
+    return {
+        "file_path": file_path,
+        "candidate_name": structured_data.get("name"),
+        "skills": structured_data.get("skills"),
+        "experience": structured_data.get("experience", 0),
+        "location": structured_data.get("location", ""),
+        "source": source
+    }
+
+
+def _fail_item(job: dict, item: dict, error: Exception):
+    jobs.update_item(job["job_id"], item["item_index"], status="failed", error=str(error))
+
+
+# ---------- Stages ----------
+
+def _source_stage(job: dict, out_q: queue.Queue, errors: List[str]):
+    job_id = job["job_id"]
+    try:
+        for item in jobs.open_items(job_id):
+            out_q.put(item)
+
+        if job["kind"] == "gmail" and not job["payload"].get("downloaded"):
+            from .intake import file_storage
+            from .intake.gmail_fetcher import fetch_resume_emails
+
+            for stored in fetch_resume_emails():
+                index = jobs.add_items(job_id, [{"file_path": stored.path}])[0]
+                file_storage.link(stored.sha256, job_id, index)
+                out_q.put({"item_index": index, "status": "queued", "file_path": stored.path})
+
+            jobs.set_payload(job_id, {**job["payload"], "downloaded": True})
+    except Exception:
+        errors.append(traceback.format_exc())
+    finally:
+        out_q.put(_DONE)
+
+
+def _extract_stage(job: dict, in_q: queue.Queue, out_q: queue.Queue):
+    in_flight = deque()
+
+    def drain_one():
+        item, future = in_flight.popleft()
+        try:
+            item["resume_text"] = future.result()
+        except Exception as e:
+            _fail_item(job, item, e)
+            return
+        out_q.put(item)
+
+    while True:
+        item = in_q.get()
+        if item is _DONE:
+            break
+
+        if item["status"] != "queued":
+            out_q.put(item)
+            continue
+
+        in_flight.append((item, extraction.submit(item["file_path"])))
+        if len(in_flight) >= EXTRACTION_WORKERS * 2:
+            drain_one()
+
+    while in_flight:
+        drain_one()
+
+    out_q.put(_DONE)
+
+
+def _structure_stage(job: dict, in_q: queue.Queue, out_q: queue.Queue):
+    loop = _get_loop()
+    in_flight = deque()
+    batch = []
+
+    def drain_one():
+        items, future = in_flight.popleft()
+        try:
+            results = future.result()
+        except Exception as e:
+            for item in items:
+                _fail_item(job, item, e)
+            return
+
+        for item, structured_data in zip(items, results):
+            item["metadata"] = resume_metadata(item["file_path"], structured_data, job["source"])
+            item["status"] = "parsed"
+            jobs.update_item(
+                job["job_id"],
+                item["item_index"],
+                status="parsed",
+                resume_text=item["resume_text"],
+                metadata=item["metadata"],
+            )
+            out_q.put(item)
+
+    def submit():
+        texts = [item["resume_text"] for item in batch]
+        future = asyncio.run_coroutine_threadsafe(astructure_resumes(texts), loop)
+        in_flight.append((list(batch), future))
+        batch.clear()
+        if len(in_flight) >= PIPELINE_STRUCTURE_CONCURRENCY:
+            drain_one()
+
+    while True:
+        item = in_q.get()
+        if item is _DONE:
+            break
+
+        if item["status"] != "queued":
+            out_q.put(item)
+            continue
+
+        # One LLM request per batch; don't hold a partial batch waiting on a slow extractor
+        batch.append(item)
+        if len(batch) >= STRUCTURE_BATCH_SIZE or in_q.empty():
+            submit()
+
+    if batch:
+        submit()
+    while in_flight:
+        drain_one()
+
+    out_q.put(_DONE)
+
+
+def _index_batch(job: dict, items: List[Dict]):
+    job_id = job["job_id"]
+
+    # Dedup decisions for items that haven't been planned yet
+    fresh = [item for item in items if item["status"] == "parsed"]
+    decisions = plan_resumes([item["resume_text"] for item in fresh])
+
+    final_status = {}
+    for item, decision in zip(fresh, decisions):
+        item["resume_id"] = decision["resume_id"]
+        item["content_hash"] = decision["content_hash"]
+
+        if decision["status"] in ("duplicate", "superseded"):
+            item["status"] = "duplicate"
+            jobs.update_item(job_id, item["item_index"], status="duplicate",
+                             resume_id=item["resume_id"], content_hash=item["content_hash"])
+            continue
+
+        item["status"] = "indexing"
+        item["chunks_done"] = 0
+        final_status[item["item_index"]] = "updated" if decision["status"] == "updated" else "indexed"
+        jobs.update_item(job_id, item["item_index"], status="indexing",
+                         resume_id=item["resume_id"], content_hash=item["content_hash"],
+                         chunks_total=count_chunks(item["resume_text"]), chunks_done=0)
+
+    to_index = [item for item in items if item["status"] == "indexing"]
+    by_resume_id = {item["resume_id"]: item for item in to_index}
+
+    def on_progress(resume_id: str, chunks_done: int):
+        jobs.update_item(job_id, by_resume_id[resume_id]["item_index"], chunks_done=chunks_done)
+
+    try:
+        # Resumed items skip the chunks an earlier attempt already wrote
+        index_resumes(
+            [
+                (item["resume_id"], item["resume_text"], item["metadata"], item.get("chunks_done") or 0)
+                for item in to_index
+            ],
+            on_progress=on_progress,
+        )
+    finally:
+        # Cached /search results no longer reflect the collection
+        bump_collection_version()
+
+    dedup.mark_indexed(item["content_hash"] for item in items if item.get("content_hash"))
+    for item in to_index:
+        jobs.update_item(job_id, item["item_index"],
+                         status=final_status.get(item["item_index"], "indexed"))
+
+
+def _index_stage(job: dict, in_q: queue.Queue, errors: List[str]):
+    batch = []
+
+    def flush():
+        # After a failure, keep draining so upstream stages never block
+        if batch and not errors:
+            try:
+                _index_batch(job, batch)
+            except Exception:
+                errors.append(traceback.format_exc())
+        batch.clear()
+
+    while True:
+        item = in_q.get()
+        if item is _DONE:
+            break
+
+        batch.append(item)
+        if len(batch) >= PIPELINE_INDEX_BATCH:
+            flush()
+
+    flush()
+
+
+# ---------- Runner ----------
+
+def run_job(job: dict):
+    """
+    Run a claimed job through the pipeline. Per-file problems fail only
+    that item; a stage-level error (Gmail, embedding, vector store) puts
+    the job back in the queue for another attempt.
+    """
+    to_extract = _StageQueue("extract")
+    to_structure = _StageQueue("structure")
+    to_index = _StageQueue("index")
+    errors = []
+
+    stages = [
+        threading.Thread(target=_source_stage, args=(job, to_extract, errors)),
+        threading.Thread(target=_extract_stage, args=(job, to_extract, to_structure)),
+        threading.Thread(target=_structure_stage, args=(job, to_structure, to_index)),
+        threading.Thread(target=_index_stage, args=(job, to_index, errors)),
+    ]
+
+    for stage in stages:
+        stage.start()
+    for stage in stages:
+        stage.join()
+
+    if not errors:
+        jobs.finish_job(job["job_id"], "completed")
+    else:
+        jobs.retry_or_fail(job["job_id"], errors[0])
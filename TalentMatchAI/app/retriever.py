@@ -1,19 +1,74 @@
+import json
 from collections import defaultdict
-from .vectorstore import collection
-from .embeddings import get_embedding
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from .config import SKILL_FILTER_MAX_IDS, PREFERRED_SKILL_WEIGHT, RESUME_SHORTLIST_FACTOR
+from .vectorstore import active_generation, get_collection, get_resume_collection
+from .embeddings import get_embedding, iter_embeddings
+from .embedding_cache import normalize_text
+from .search_cache import query_vectors
+from .candidates import count_candidates, hydrate
+from .metrics import stage
+from . import skill_index
 
-def retrieve_candidates(job_query):
+# Resume ids per chunk fetch in the batch rerank
+_FETCH_IDS = 500
+# Queries per grouped Chroma call (bounds the rerank's chunk matrix)
+_GROUP_QUERIES = 64
+
+
+def get_query_embedding(job_description: str, model: str):
     """
-    Retrieves and scores candidates based on:
-    - job description (semantic similarity)
-    - min_experience (numeric)
-    - location (flexible match by parts)
+    Embed a job description, reusing the vector of any
+    previously seen JD with the same normalized text.
+    """
+    key = model, normalize_text(job_description)
+    embedding = query_vectors.get(key)
+
+    if embedding is None:
+        embedding = get_embedding(job_description, model)
+        query_vectors.set(key, embedding)
+
+    return embedding
+
+
+def get_query_embeddings(job_descriptions: List[str], model: str) -> List[List[float]]:
     """
+    Batch version of `get_query_embedding`: distinct uncached JDs are
+    embedded together through the multi-input embedding engine.
+    """
+    keys = [(model, normalize_text(jd)) for jd in job_descriptions]
+    vectors = {key: query_vectors.get(key) for key in keys}
+
+    missing = {}
+    for key, jd in zip(keys, job_descriptions):
+        if vectors[key] is None:
+            missing.setdefault(key, jd)
+
+    if missing:
+        missing_keys = list(missing)
+        fresh = [v for batch in iter_embeddings((missing[k] for k in missing_keys), model) for v in batch]
+        for key, vector in zip(missing_keys, fresh):
+            vectors[key] = vector
+            query_vectors.set(key, vector)
 
-    # 1️⃣ Embed the job description
-    query_embedding = get_embedding(job_query.job_description)
+    return [vectors[key] for key in keys]
+
+
+def _where(filters):
+    if len(filters) == 0:
+        return None
+    if len(filters) == 1:
+        return filters[0]
+    return {"$and": filters}
 
-    # 2️⃣ Build filters
+
+def _plan_query(job_query) -> Optional[Tuple[Optional[dict], Optional[Set[str]]]]:
+    """
+    Build the Chroma `where` clause for a query. Returns (where, allowed_ids)
+    where allowed_ids is a skill post-filter too large for `$in`, or None
+    when the required skills rule out every resume.
+    """
     filters = []
 
     # Experience filter
@@ -22,50 +77,286 @@ def retrieve_candidates(job_query):
 
     # Location filter
     if job_query.location:
-        # Split location by comma and strip spaces
         filters.append({"location": {"$eq": job_query.location}})
 
-    # Construct the final 'where' clause
-    if len(filters) == 0:
-        where = None
-    elif len(filters) == 1:
-        where = filters[0]
-    else:
-        where = {"$and": filters}
-
-    # 3️⃣ Query the vector store
-    results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=job_query.top_k * 5,  # fetch extra chunks to allow grouping
-        where=where
-    )
-
-    # 4️⃣ Group chunks by resume_id
+    # Skill gate: intersect skill bitmaps before any vector search
+    allowed_ids = None
+    if job_query.required_skills:
+        allowed_ids = set(skill_index.match_resumes(job_query.required_skills))
+        if not allowed_ids:
+            return None
+
+        if len(allowed_ids) <= SKILL_FILTER_MAX_IDS:
+            filters.append({"resume_id": {"$in": sorted(allowed_ids)}})
+            allowed_ids = None  # already enforced by the query
+
+    return _where(filters), allowed_ids
+
+
+def _shortlist_resumes(generation, query_embeddings, where, n_results: int) -> List[List[str]]:
+    """Stage 1: nearest resumes by their pooled vector (distinct by construction)."""
+    with stage("search.shortlist"):
+        results = get_resume_collection(generation).query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where,
+            include=[]
+        )
+    return results.get("ids") or [[] for _ in query_embeddings]
+
+
+def _fetch_chunks(generation, resume_ids) -> Dict:
+    """Embeddings, documents and metadata of every chunk of `resume_ids`."""
+    collection = get_collection(generation)
+    resume_ids = list(resume_ids)
+    chunks = {"embeddings": [], "documents": [], "metadatas": []}
+
+    with stage("search.fetch_chunks"):
+        for i in range(0, len(resume_ids), _FETCH_IDS):
+            part = collection.get(
+                where={"resume_id": {"$in": resume_ids[i:i + _FETCH_IDS]}},
+                include=["embeddings", "documents", "metadatas"]
+            )
+            for field in chunks:
+                chunks[field].extend(part.get(field) or [])
+
+    return chunks
+
+
+def _normalized(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=-1, keepdims=True), 1e-12)
+
+
+def _best_chunks(chunks: Dict, owners: np.ndarray, similarities: np.ndarray, rows=None) -> List[Dict]:
+    """
+    Keep each resume's best-scoring chunk among `rows` (all rows if None).
+    Returns candidates, best first.
+    """
+    rows = np.arange(len(owners)) if rows is None else rows
+    if len(rows) == 0:
+        return []
+
+    _, groups = np.unique(owners[rows], return_inverse=True)
+    sims = similarities[rows]
+
+    # Sort by resume, then similarity descending: first row per resume is its best chunk
+    order = np.lexsort((-sims, groups))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = groups[order][1:] != groups[order][:-1]
+    best = order[first]
+    best = best[np.argsort(-sims[best], kind="stable")]
+
+    return [
+        {
+            "resume_id": str(owners[rows[i]]),
+            "score": float(sims[i]),
+            "metadata": chunks["metadatas"][rows[i]],
+            "resume_excerpt": chunks["documents"][rows[i]]
+        }
+        for i in best
+    ]
+
+
+def _rerank(generation, query_embeddings, shortlists: List[List[str]]) -> List[List[Dict]]:
+    """
+    Stage 2: score the chunks of the shortlisted resumes against each
+    query (one matrix product for all queries) and keep each resume's
+    best chunk.
+    """
+    chunks = _fetch_chunks(generation, {resume_id for shortlist in shortlists for resume_id in shortlist})
+    if not chunks["embeddings"]:
+        return [[] for _ in shortlists]
+
+    with stage("search.rerank"):
+        # Cosine similarity, same as 1 - Chroma's cosine distance
+        matrix = _normalized(np.asarray(chunks["embeddings"], dtype=np.float32))
+        queries = _normalized(np.asarray(query_embeddings, dtype=np.float32))
+        similarities = matrix @ queries.T
+
+        owners = np.array([meta.get("resume_id") for meta in chunks["metadatas"]])
+
+        if len(shortlists) == 1:
+            return [_best_chunks(chunks, owners, similarities[:, 0])]
+
+        results = []
+        for column, shortlist in enumerate(shortlists):
+            rows = np.flatnonzero(np.isin(owners, shortlist))
+            results.append(_best_chunks(chunks, owners, similarities[:, column], rows))
+        return results
+
+
+def _chunk_search(generation, query_embedding, where, n_results: int):
+    """Chunk-level search for collections without resume-level vectors."""
+    with stage("search.chunk_query"):
+        results = get_collection(generation).query(
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            where=where
+        )
+
+    with stage("search.group"):
+        return _group_chunks(results)
+
+
+def _group_chunks(results) -> List[Dict]:
+    """Each resume's best chunk from a chunk query, best first."""
     grouped = defaultdict(list)
     documents = results.get("documents", [[]])[0]
     metadatas = results.get("metadatas", [[]])[0]
     distances = results.get("distances", [[]])[0]
 
     for doc, meta, dist in zip(documents, metadatas, distances):
-        resume_id = meta.get("resume_id")
-        grouped[resume_id].append({
+        grouped[meta.get("resume_id")].append({
             "resume_excerpt": doc,
             "metadata": meta,
             "distance": dist
         })
 
-    # 5️⃣ Score resumes by best chunk (lowest distance)
-    scored_resumes = []
+    candidates = []
     for resume_id, chunks in grouped.items():
         best_chunk = min(chunks, key=lambda x: x["distance"])
-        scored_resumes.append({
+        candidates.append({
             "resume_id": resume_id,
             "score": 1 - best_chunk["distance"],  # convert distance → similarity
             "metadata": best_chunk["metadata"],
             "resume_excerpt": best_chunk["resume_excerpt"]
         })
 
-    # 6️⃣ Sort by score descending
-    scored_resumes.sort(key=lambda x: x["score"], reverse=True)
+    candidates.sort(key=lambda x: x["score"], reverse=True)
+    return candidates
+
+
+def _finish(job_query, candidates: List[Dict]) -> List[Dict]:
+    """Preferred skills boost, then cut to top_k."""
+    preferred = skill_index.parse_skills(job_query.preferred_skills)
+    if preferred:
+        skills_by_id = skill_index.resume_skills([c["resume_id"] for c in candidates])
+        for candidate in candidates:
+            matched = preferred & skills_by_id.get(candidate["resume_id"], set())
+            candidate["score"] += PREFERRED_SKILL_WEIGHT * len(matched) / len(preferred)
+            candidate["matched_preferred_skills"] = sorted(matched)
+        candidates.sort(key=lambda x: x["score"], reverse=True)
+
+    return candidates[:job_query.top_k]
+
+
+def _has_resume_vectors(generation) -> bool:
+    """
+    Whether every stored candidate has a pooled vector in `generation`.
+    Until a backfill (or an ingest in progress) catches up, the shortlist
+    would silently miss the others, so searches take the chunk-level path.
+    """
+    pooled = get_resume_collection(generation).count()
+    return pooled > 0 and pooled >= count_candidates()
+
+
+def _retrieve_group(generation, job_queries, query_embeddings, where, allowed_ids) -> List[List[Dict]]:
+    """Retrieve for queries that share one filter signature."""
+    # Post-filtering on skills needs a wider net
+    widen = 1 if allowed_ids is None else 4
+
+    if not _has_resume_vectors(generation):
+        results = []
+        for job_query, embedding in zip(job_queries, query_embeddings):
+            candidates = _chunk_search(generation, embedding, where, job_query.top_k * 5 * widen)
+            if allowed_ids is not None:
+                candidates = [c for c in candidates if c["resume_id"] in allowed_ids]
+            results.append(candidates)
+        return results
+
+    n_results = max(q.top_k for q in job_queries) * RESUME_SHORTLIST_FACTOR * widen
+    shortlists = _shortlist_resumes(generation, query_embeddings, where, n_results)
+
+    shortlists = [
+        shortlist[:q.top_k * RESUME_SHORTLIST_FACTOR * widen]
+        for q, shortlist in zip(job_queries, shortlists)
+    ]
+    if allowed_ids is not None:
+        shortlists = [[r for r in shortlist if r in allowed_ids] for shortlist in shortlists]
+
+    return _rerank(generation, query_embeddings, shortlists)
+
+
+def retrieve_candidates(job_query, generation: Optional[Dict] = None):
+    """
+    Retrieves and scores candidates based on:
+    - job description (semantic similarity)
+    - min_experience (numeric)
+    - location (flexible match by parts)
+    - required_skills (exact gate via the skill index)
+    - preferred_skills (ranking boost)
+
+    Two stages: a shortlist of resumes from the resume-level collection,
+    then a chunk rerank inside that shortlist only.
+
+    `generation` selects the collections to search (default: the active
+    ones; a migration's shadow generation for dual reads).
+    """
+    generation = generation or active_generation()
+
+    # 1️⃣ Build filters
+    with stage("search.filters"):
+        plan = _plan_query(job_query)
+    if plan is None:
+        return []
+    where, allowed_ids = plan
+
+    # 2️⃣ Embed the job description
+    with stage("search.embed"):
+        query_embedding = get_query_embedding(job_query.job_description, generation["embedding_model"])
+
+    # 3️⃣ Shortlist resumes, then rerank their chunks
+    candidates = _retrieve_group(generation, [job_query], [query_embedding], where, allowed_ids)[0]
+
+    # 4️⃣ Preferred skills boost, then full metadata from the candidate store
+    with stage("search.hydrate"):
+        return hydrate(_finish(job_query, candidates))
+
+
+def retrieve_candidates_batch(job_queries, generation: Optional[Dict] = None) -> List[List[Dict]]:
+    """
+    `retrieve_candidates` for many queries at once: JDs are embedded in
+    multi-input requests and queries sharing a filter signature go to
+    Chroma as one grouped `query_embeddings` call.
+    """
+    generation = generation or active_generation()
+    results: List[List[Dict]] = [[] for _ in job_queries]
+
+    with stage("search.filters"):
+        plans = [_plan_query(job_query) for job_query in job_queries]
+    live = [i for i, plan in enumerate(plans) if plan is not None]
+    with stage("search.embed"):
+        embeddings = dict(zip(live, get_query_embeddings(
+            [job_queries[i].job_description for i in live], generation["embedding_model"]
+        )))
+
+    groups = defaultdict(list)
+    for i in live:
+        where, allowed_ids = plans[i]
+        signature = json.dumps(where, sort_keys=True), allowed_ids is not None
+        groups[signature].append(i)
+
+    for indexes in groups.values():
+        where, allowed_ids = plans[indexes[0]]
+        if allowed_ids is not None:
+            # Large skill sets differ per query; keep them separate
+            for i in indexes:
+                results[i] = _retrieve_group(
+                    generation, [job_queries[i]], [embeddings[i]], where, plans[i][1]
+                )[0]
+            continue
+
+        for start in range(0, len(indexes), _GROUP_QUERIES):
+            part = indexes[start:start + _GROUP_QUERIES]
+            grouped = _retrieve_group(
+                generation, [job_queries[i] for i in part], [embeddings[i] for i in part], where, None
+            )
+            for i, candidates in zip(part, grouped):
+                results[i] = candidates
+
+    with stage("search.hydrate"):
+        results = [_finish(job_query, candidates) for job_query, candidates in zip(job_queries, results)]
 
-    return scored_resumes[:job_query.top_k]
+        # One candidate-store lookup for every query's results
+        hydrate([candidate for candidates in results for candidate in candidates])
+    return results
@@ -1,49 +1,276 @@
+"""
+LLM candidate scoring.
+
+Candidates are reduced to a compact record, packed into token-budgeted
+mini-batches and scored concurrently; results are merged and ranked by
+score. Scores are cached per (JD, resume, candidate content), so paging
+through or repeating a search only scores new candidates. A batch whose
+reply cannot be parsed falls back to retrieval similarity for its
+candidates instead of failing the whole search.
+"""
+import asyncio
 import json
-from openai import OpenAI
-from .config import OPENAI_API_KEY
-
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-def score_candidates(candidates, job_description: str) -> dict:
-    prompt = f"""
-    Evaluate the following candidates against the job description.
-    score you can obtain directly from the candidates
-    Return STRICT JSON with this schema:
-    
-    {{
-        "retrieved_count": int,
-        "scored_results": [
-            {{
-                "name": string,
-                "score": int,
-                "strengths": list of strings,
-                "gaps": list of strings
-            }}
-        ]
-    }}
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Tuple
+import openai
+from .config import (
+    SCORING_BATCH_TOKENS,
+    SCORING_BATCH_SIZE,
+    SCORING_CONCURRENCY,
+    SCORING_EXCERPT_CHARS,
+)
+from .embedding_cache import text_hash
+from . import llm_gateway
+from .metrics import stage
+from .search_cache import candidate_scores
+from .utils import estimate_tokens
 
-    Job Description:
-    {job_description}
+logger = logging.getLogger(__name__)
 
-    Candidates:
-    {json.dumps(candidates, indent=2)}
+_pool = ThreadPoolExecutor(max_workers=SCORING_CONCURRENCY)
+
+MODEL = "gpt-4o-mini"
+
+PROMPT_TEMPLATE = """
+Evaluate the following candidates against the job description.
+Return STRICT JSON with this schema:
+
+{{
+    "scored_results": [
+        {{
+            "id": string (the candidate id given below),
+            "score": int (0-100),
+            "strengths": list of strings,
+            "gaps": list of strings
+        }}
+    ]
+}}
+
+Job Description:
+{job_description}
+
+Candidates (one JSON object per line):
+{candidates}
+
+Return JSON ONLY. No markdown. No explanation.
+"""
+
+
+def compact_candidate(candidate: Dict) -> Dict:
+    """Only what the model needs to judge fit."""
+    metadata = candidate.get("metadata") or {}
+    return {
+        "name": metadata.get("candidate_name"),
+        "experience": metadata.get("experience"),
+        "location": metadata.get("location"),
+        "skills": metadata.get("skills"),
+        "excerpt": (candidate.get("resume_excerpt") or "")[:SCORING_EXCERPT_CHARS],
+    }
+
+
+def _cache_key(jd_hash: str, candidate: Dict, compact: Dict) -> tuple:
+    fingerprint = text_hash(json.dumps(compact, sort_keys=True, default=str))
+    return jd_hash, candidate.get("resume_id"), fingerprint
+
+
+def _pack(entries: List[Dict], fixed_tokens: int) -> Iterator[List[Dict]]:
+    batch, batch_tokens = [], fixed_tokens
+    for entry in entries:
+        if batch and (
+            batch_tokens + entry["tokens"] > SCORING_BATCH_TOKENS
+            or len(batch) >= SCORING_BATCH_SIZE
+        ):
+            yield batch
+            batch, batch_tokens = [], fixed_tokens
+        batch.append(entry)
+        batch_tokens += entry["tokens"]
+    if batch:
+        yield batch
+
+
+def _fallback(entry: Dict) -> Dict:
+    return {
+        "score": round(float(entry["candidate"].get("score") or 0) * 100),
+        "strengths": [],
+        "gaps": [],
+        "scoring_error": True,
+    }
 
-    Return JSON ONLY. No markdown. No explanation.
-    """
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
+def _build_prompt(job_description: str, batch: List[Dict]) -> str:
+    lines = "\n".join(
+        json.dumps({"id": entry["id"], **entry["compact"]}, default=str) for entry in batch
+    )
+    return PROMPT_TEMPLATE.format(job_description=job_description, candidates=lines)
+
+
+def _request(prompt: str) -> dict:
+    return dict(
+        model=MODEL,
         messages=[{"role": "user", "content": prompt}],
         response_format={"type": "json_object"},
         temperature=0
     )
 
-    content = response.choices[0].message.content
 
+def _parse_scores(content: str) -> Dict[str, Dict]:
+    """{candidate id: score record} from a model reply; empty if unparseable."""
+    try:
+        results = json.loads(content).get("scored_results", [])
+    except (json.JSONDecodeError, AttributeError, TypeError):
+        return {}
+
+    scored = {}
+    for result in results:
+        if isinstance(result, dict) and result.get("id") is not None:
+            scored[str(result["id"])] = {
+                "score": result.get("score", 0),
+                "strengths": result.get("strengths") or [],
+                "gaps": result.get("gaps") or [],
+            }
+    return scored
+
+
+def _score_batch(job_description: str, batch: List[Dict]) -> Dict[str, Dict]:
+    """Score one mini-batch; returns {candidate id: score record}."""
+    try:
+        response = llm_gateway.complete("score", **_request(_build_prompt(job_description, batch)))
+    except openai.OpenAIError as e:
+        logger.warning("Scoring a batch of %d candidates failed, using similarity: %r", len(batch), e)
+        return {}
+    return _parse_scores(response.choices[0].message.content)
+
+
+async def _ascore_batch(job_description: str, batch: List[Dict]) -> Dict[str, Dict]:
+    try:
+        response = await llm_gateway.acomplete("score", **_request(_build_prompt(job_description, batch)))
+    except openai.OpenAIError as e:
+        logger.warning("Scoring a batch of %d candidates failed, using similarity: %r", len(batch), e)
+        return {}
+    return _parse_scores(response.choices[0].message.content)
+
+
+def _prepare(candidates: List[Dict], job_description: str):
+    """Compact candidates, look up cached scores; returns (entries, prompt tokens)."""
+    jd_hash = text_hash(job_description)
+    prompt_tokens = estimate_tokens(PROMPT_TEMPLATE) + estimate_tokens(job_description)
+
+    entries = []
+    for index, candidate in enumerate(candidates):
+        compact = compact_candidate(candidate)
+        key = _cache_key(jd_hash, candidate, compact)
+        entries.append({
+            "id": f"c{index}",
+            "candidate": candidate,
+            "compact": compact,
+            "key": key,
+            "tokens": estimate_tokens(json.dumps(compact, default=str)),
+            "result": candidate_scores.get(key),
+        })
+
+    return entries, prompt_tokens
+
+
+def _merge(batch: List[Dict], scored: Dict[str, Dict]):
+    for entry in batch:
+        result = scored.get(entry["id"])
+        if result is None:
+            entry["result"] = _fallback(entry)
+        else:
+            entry["result"] = result
+            candidate_scores.set(entry["key"], result)
+
+
+def _output(entry: Dict) -> Dict:
+    return {
+        "resume_id": entry["candidate"].get("resume_id"),
+        "name": entry["compact"]["name"],
+        **entry["result"],
+    }
+
+
+def rank(results: List[Dict]) -> List[Dict]:
+    return sorted(results, key=lambda r: _as_number(r["score"]), reverse=True)
+
+
+def score_candidates(candidates: List[Dict], job_description: str) -> List[Dict]:
+    """
+    Score retrieved candidates against a JD.
+    Returns one {resume_id, name, score, strengths, gaps} per candidate,
+    best score first.
+    """
+    with stage("search.score"):
+        entries, prompt_tokens = _prepare(candidates, job_description)
+
+        pending = [entry for entry in entries if entry["result"] is None]
+        futures = [
+            (batch, _pool.submit(_score_batch, job_description, batch))
+            for batch in _pack(pending, prompt_tokens)
+        ]
+
+        for batch, future in futures:
+            _merge(batch, future.result())
+
+    return rank([_output(entry) for entry in entries])
+
+
+def score_many(requests: List[Tuple[List[Dict], str]]) -> List[List[Dict]]:
+    """
+    Score several (candidates, job_description) pairs. Mini-batches of
+    all pairs share the scoring pool, so concurrency stays bounded by
+    SCORING_CONCURRENCY however many JDs are in flight.
+    """
+    with stage("search.score"):
+        prepared = [_prepare(candidates, jd) for candidates, jd in requests]
+
+        futures = []
+        for (entries, prompt_tokens), (_, jd) in zip(prepared, requests):
+            pending = [entry for entry in entries if entry["result"] is None]
+            futures.extend(
+                (batch, _pool.submit(_score_batch, jd, batch))
+                for batch in _pack(pending, prompt_tokens)
+            )
+
+        for batch, future in futures:
+            _merge(batch, future.result())
+
+    return [rank([_output(entry) for entry in entries]) for entries, _ in prepared]
+
+
+async def iter_scores(candidates: List[Dict], job_description: str) -> AsyncIterator[Dict]:
+    """
+    Async variant of `score_candidates` that yields each candidate's
+    score record as soon as its mini-batch completes (cached ones first).
+    """
+    entries, prompt_tokens = _prepare(candidates, job_description)
+
+    for entry in entries:
+        if entry["result"] is not None:
+            yield _output(entry)
+
+    semaphore = asyncio.Semaphore(SCORING_CONCURRENCY)
+
+    async def run(batch):
+        async with semaphore:
+            _merge(batch, await _ascore_batch(job_description, batch))
+        return batch
+
+    pending = [entry for entry in entries if entry["result"] is None]
+    tasks = [asyncio.ensure_future(run(batch)) for batch in _pack(pending, prompt_tokens)]
+
+    try:
+        for finished in asyncio.as_completed(tasks):
+            for entry in await finished:
+                yield _output(entry)
+    finally:
+        # Client went away: stop paying for batches nobody will read
+        for task in tasks:
+            task.cancel()
+
+
+def _as_number(value) -> float:
     try:
-        return json.loads(content)
-    except json.JSONDecodeError:
-        return {
-            "retrieved_count": 0,
-            "scored_results": []
-        }
\ No newline at end of file
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from .config import (
+    CHROMA_PERSIST_DIR,
+    QUERY_CACHE_SIZE,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL,
+    SCORE_CACHE_SIZE,
+)
+from .embedding_cache import text_hash
+from .skill_index import parse_skills
+
+VERSION_FILE = os.path.join(CHROMA_PERSIST_DIR, "collection_version")
+
+
+class LRUCache:
+    """
+    Small thread-safe in-memory LRU with an optional time-to-live.
+    """
+
+    def __init__(self, max_entries: int, ttl: float = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl is None or time.time() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Level 1: (embedding model, normalized JD text) -> query vector
+query_vectors = LRUCache(QUERY_CACHE_SIZE)
+
+# Level 2: (JD hash, filters, top_k, collection version) -> /search response
+search_results = LRUCache(SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
+# Level 3: (JD hash, resume_id, candidate content hash) -> LLM score
+candidate_scores = LRUCache(SCORE_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
+
+def get_collection_version() -> str:
+    """
+    Version token of the resume collection. Stored on disk next to
+    the Chroma data so ingestion in any process invalidates results.
+    """
+    try:
+        with open(VERSION_FILE) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return "0"
+
+
+def bump_collection_version():
+    os.makedirs(os.path.dirname(os.path.abspath(VERSION_FILE)), exist_ok=True)
+
+    # Nanosecond timestamp: unique across processes without a shared counter
+    temp_path = f"{VERSION_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(str(time.time_ns()))
+    os.replace(temp_path, VERSION_FILE)
+
+
+def search_key(job_query) -> tuple:
+    return (
+        text_hash(job_query.job_description),
+        job_query.min_experience,
+        job_query.location,
+        job_query.top_k,
+        tuple(sorted(parse_skills(job_query.required_skills))),
+        tuple(sorted(parse_skills(job_query.preferred_skills))),
+        get_collection_version(),
+    )
@@ -0,0 +1,228 @@
+"""
+Inverted skill index: normalized skill -> bitmap of resumes.
+
+Every indexed resume gets a small integer ordinal; a skill's bitmap has
+bit `ordinal` set for each resume listing that skill. Bitmaps are stored
+as little-endian bytes in SQLite (METADATA_DB_PATH) and combined as
+Python ints, so "must know Kafka and Spark" is a single AND before any
+vector search runs.
+
+Rebuild from the candidate store (e.g. for resumes indexed earlier):
+    python -m app.skill_index --rebuild
+"""
+import argparse
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+import numpy as np
+from .db import get_connection, ensure_schema
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resume_ordinals (
+    ordinal INTEGER PRIMARY KEY AUTOINCREMENT,
+    resume_id TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS resume_skills (
+    resume_id TEXT NOT NULL,
+    skill TEXT NOT NULL,
+    PRIMARY KEY (resume_id, skill)
+);
+CREATE TABLE IF NOT EXISTS skill_bitmaps (
+    skill TEXT PRIMARY KEY,
+    bitmap BLOB NOT NULL
+);
+"""
+
+# Common spellings that should land on the same bitmap
+SKILL_ALIASES = {
+    "js": "javascript",
+    "ts": "typescript",
+    "golang": "go",
+    "k8s": "kubernetes",
+    "node": "node.js",
+    "nodejs": "node.js",
+    "reactjs": "react",
+    "react.js": "react",
+    "postgres": "postgresql",
+    "ml": "machine learning",
+    "amazon web services": "aws",
+    "gcp": "google cloud",
+}
+
+# SQLite's default limit on bound parameters per statement
+_SQL_VARS = 900
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _connection():
+    ensure_schema(SCHEMA)
+    return get_connection()
+
+
+def normalize_skill(skill: str) -> str:
+    skill = _SPACE_RE.sub(" ", str(skill).strip().lower())
+    return SKILL_ALIASES.get(skill, skill)
+
+
+def parse_skills(skills: Union[None, str, Iterable[str]]) -> Set[str]:
+    """Normalize a skills list, or the comma-joined form stored in chunk metadata."""
+    if not skills:
+        return set()
+    if isinstance(skills, str):
+        skills = skills.split(",")
+    return {normalize_skill(s) for s in skills if str(s).strip()}
+
+
+def _to_int(blob: Optional[bytes]) -> int:
+    return int.from_bytes(blob, "little") if blob else 0
+
+
+def _to_blob(bitmap: int) -> bytes:
+    return bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+
+
+def _ordinals(conn, resume_ids: List[str]) -> Dict[str, int]:
+    conn.executemany(
+        "INSERT OR IGNORE INTO resume_ordinals (resume_id) VALUES (?)",
+        [(resume_id,) for resume_id in resume_ids],
+    )
+    ordinals = {}
+    for i in range(0, len(resume_ids), _SQL_VARS):
+        part = resume_ids[i:i + _SQL_VARS]
+        rows = conn.execute(
+            f"SELECT resume_id, ordinal FROM resume_ordinals "
+            f"WHERE resume_id IN ({','.join('?' * len(part))})",
+            part,
+        ).fetchall()
+        ordinals.update(rows)
+    return ordinals
+
+
+def index_skills(entries: Iterable[Tuple[str, Union[None, str, Iterable[str]]]]):
+    """
+    Set the skills of each (resume_id, skills) entry, replacing whatever
+    was indexed for that resume before (re-ingested or updated versions).
+    """
+    entries = {resume_id: parse_skills(skills) for resume_id, skills in entries}
+    if not entries:
+        return
+
+    conn = _connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        ordinals = _ordinals(conn, list(entries))
+
+        # Per-skill bits to set and clear, so each bitmap is rewritten once
+        to_set = defaultdict(int)
+        to_clear = defaultdict(int)
+
+        for resume_id, skills in entries.items():
+            bit = 1 << ordinals[resume_id]
+            previous = {
+                row[0] for row in conn.execute(
+                    "SELECT skill FROM resume_skills WHERE resume_id = ?", (resume_id,)
+                )
+            }
+            for skill in previous - skills:
+                to_clear[skill] |= bit
+            for skill in skills - previous:
+                to_set[skill] |= bit
+
+            conn.execute("DELETE FROM resume_skills WHERE resume_id = ?", (resume_id,))
+            conn.executemany(
+                "INSERT INTO resume_skills (resume_id, skill) VALUES (?, ?)",
+                [(resume_id, skill) for skill in skills],
+            )
+
+        for skill in set(to_set) | set(to_clear):
+            row = conn.execute(
+                "SELECT bitmap FROM skill_bitmaps WHERE skill = ?", (skill,)
+            ).fetchone()
+            bitmap = (_to_int(row[0] if row else None) | to_set[skill]) & ~to_clear[skill]
+
+            if bitmap:
+                conn.execute(
+                    "INSERT OR REPLACE INTO skill_bitmaps (skill, bitmap) VALUES (?, ?)",
+                    (skill, _to_blob(bitmap)),
+                )
+            else:
+                conn.execute("DELETE FROM skill_bitmaps WHERE skill = ?", (skill,))
+
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _bitmap(conn, skill: str) -> int:
+    row = conn.execute("SELECT bitmap FROM skill_bitmaps WHERE skill = ?", (skill,)).fetchone()
+    return _to_int(row[0]) if row else 0
+
+
+def match_resumes(required_skills: Iterable[str]) -> List[str]:
+    """Resume ids that have every one of `required_skills`."""
+    skills = parse_skills(required_skills)
+    if not skills:
+        return []
+
+    conn = _connection()
+    bitmap = -1
+    for skill in skills:
+        bitmap &= _bitmap(conn, skill)
+        if not bitmap:
+            return []
+
+    bits = np.unpackbits(np.frombuffer(_to_blob(bitmap), dtype=np.uint8), bitorder="little")
+    ordinals = np.flatnonzero(bits).tolist()
+
+    resume_ids = []
+    for i in range(0, len(ordinals), _SQL_VARS):
+        part = ordinals[i:i + _SQL_VARS]
+        rows = conn.execute(
+            f"SELECT resume_id FROM resume_ordinals "
+            f"WHERE ordinal IN ({','.join('?' * len(part))})",
+            part,
+        ).fetchall()
+        resume_ids.extend(row[0] for row in rows)
+
+    return resume_ids
+
+
+def resume_skills(resume_ids: List[str]) -> Dict[str, Set[str]]:
+    """Indexed skills of each resume (used to rank preferred skills)."""
+    conn = _connection()
+    skills = defaultdict(set)
+    for i in range(0, len(resume_ids), _SQL_VARS):
+        part = resume_ids[i:i + _SQL_VARS]
+        rows = conn.execute(
+            f"SELECT resume_id, skill FROM resume_skills "
+            f"WHERE resume_id IN ({','.join('?' * len(part))})",
+            part,
+        ).fetchall()
+        for resume_id, skill in rows:
+            skills[resume_id].add(skill)
+    return skills
+
+
+def rebuild_from_candidates(batch_size: int = 5000):
+    """Re-derive the index from the skills in the candidate store."""
+    from .candidates import iter_candidates
+
+    for page in iter_candidates(batch_size):
+        index_skills((resume_id, metadata.get("skills")) for resume_id, metadata in page)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Skill index maintenance")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="rebuild the index from the candidate store")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild_from_candidates()
+        print("Skill index rebuilt")
+
+
+if __name__ == "__main__":
+    main()
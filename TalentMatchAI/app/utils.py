@@ -1,4 +1,213 @@
-def chunk_text(text: str, chunk_size=800, overlap=100):
+"""
+Resume chunking.
+
+`chunk_text` splits a resume along its sections (summary, experience,
+skills, education, ...) instead of fixed character windows. Sections that
+fit the token budget stay whole, small sections are merged with their
+neighbours, and long sections are split on line, then sentence, then word
+boundaries, each piece keeping its section heading for context.
+
+Set CHUNK_STRATEGY=fixed to get the old 800/100-character splitter.
+Strategy and token budget default to the active collection generation's,
+so a migrated collection keeps being chunked the way it was built.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+from .config import (
+    EMBEDDING_MODEL,
+    CHUNK_STRATEGY,
+    CHUNK_MAX_TOKENS,
+    CHUNK_MIN_TOKENS,
+    CHUNK_OVERLAP_TOKENS,
+)
+
+try:
+    import tiktoken
+except ImportError:  # optional: exact token counts for OpenAI models
+    tiktoken = None
+
+SECTION_HEADINGS = {
+    "summary", "profile", "professional summary", "career summary", "objective",
+    "career objective", "about me", "experience", "work experience",
+    "professional experience", "employment", "employment history", "work history",
+    "career history", "projects", "key projects", "skills", "technical skills",
+    "core skills", "key skills", "skills & tools", "tools", "technologies",
+    "competencies", "core competencies", "education", "academic background",
+    "qualifications", "certifications", "certificates", "licenses",
+    "achievements", "awards", "accomplishments", "publications", "languages",
+    "interests", "hobbies", "volunteering", "references", "training", "courses",
+}
+
+_HEADING_RE = re.compile(r"^\s*[#*\-•]*\s*([A-Za-z][A-Za-z &/]{1,40}?)\s*[:\-–]?\s*$")
+_INLINE_HEADING_RE = re.compile(r"^\s*([A-Za-z][A-Za-z &/]{1,40}?)\s*[:–]\s*(\S.*)$")
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+")
+
+_encodings = {}
+_budgets = {}
+
+
+# ---------- Tokens ----------
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text; good enough for packing
+    return len(text) // 4 + 1
+
+
+def count_tokens(text: str, model: Optional[str] = EMBEDDING_MODEL) -> int:
+    """Token count for embedding `model` (tiktoken if installed, else ~4 chars/token)."""
+    if tiktoken is None:
+        return len(text) // 4 + 1
+
+    encoding = _encodings.get(model)
+    if encoding is None:
+        try:
+            # "text-embedding-3-small@256" is tokenized like its base model
+            encoding = tiktoken.encoding_for_model((model or "").split("@")[0])
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        _encodings[model] = encoding
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def chunk_budget(model: Optional[str] = EMBEDDING_MODEL) -> int:
+    """CHUNK_MAX_TOKENS, capped at what the embedding backend accepts."""
+    budget = _budgets.get(model)
+    if budget is None:
+        from .embedding_providers import get_provider
+
+        limit = get_provider(model).max_input_tokens if model else None
+        budget = _budgets[model] = min(CHUNK_MAX_TOKENS, limit) if limit else CHUNK_MAX_TOKENS
+    return budget
+
+
+# ---------- Sections ----------
+
+def _heading(line: str) -> Optional[Tuple[str, str]]:
+    """(heading, inline text) if `line` opens a resume section."""
+    match = _HEADING_RE.match(line)
+    if match and match.group(1).strip().lower() in SECTION_HEADINGS:
+        return match.group(1).strip(), ""
+
+    match = _INLINE_HEADING_RE.match(line)
+    if match and match.group(1).strip().lower() in SECTION_HEADINGS:
+        return match.group(1).strip(), match.group(2).strip()
+
+    return None
+
+
+def split_sections(text: str) -> List[Tuple[Optional[str], List[str]]]:
+    """[(heading or None for the top of the resume, body lines)]"""
+    sections = [(None, [])]
+    for line in text.splitlines():
+        found = _heading(line)
+        if found:
+            heading, inline = found
+            sections.append((heading, [inline] if inline else []))
+        elif line.strip():
+            sections[-1][1].append(line.strip())
+    return [(heading, lines) for heading, lines in sections if heading or lines]
+
+
+# ---------- Splitting ----------
+
+def _split_words(unit: str, budget: int, model: Optional[str]) -> List[str]:
+    """
+    Word windows of at most `budget` tokens, overlapping by
+    CHUNK_OVERLAP_TOKENS but never by more than half a window, so each
+    window moves at least half a budget forward.
+    """
+    words = unit.split()
+    if tiktoken is None:
+        costs = [(len(word) + 1) / 4 for word in words]
+    else:
+        costs = [count_tokens(word + " ", model) for word in words]
+    max_overlap = min(CHUNK_OVERLAP_TOKENS, budget // 2)
+
+    pieces = []
+    start = 0
+    while start < len(words):
+        end, used = start, 0
+        while end < len(words) and (end == start or used + costs[end] <= budget):
+            used += costs[end]
+            end += 1
+        pieces.append(" ".join(words[start:end]))
+        if end >= len(words):
+            break
+
+        # Step back into the window for overlap, but always make progress
+        back, overlap = end, 0
+        while back > start + 1 and overlap + costs[back - 1] <= max_overlap:
+            back -= 1
+            overlap += costs[back]
+        start = back
+
+    return pieces
+
+
+def _units(lines: List[str], budget: int, model: Optional[str]) -> List[str]:
+    """Lines, broken into sentences and then word windows when too long."""
+    units = []
+    for line in lines:
+        if count_tokens(line, model) <= budget:
+            units.append(line)
+            continue
+        for sentence in _SENTENCE_RE.split(line):
+            if count_tokens(sentence, model) <= budget:
+                units.append(sentence)
+            else:
+                units.extend(_split_words(sentence, budget, model))
+    return units
+
+
+def _section_pieces(heading: Optional[str], lines: List[str], budget: int, model: Optional[str]) -> List[str]:
+    """One section as pieces within `budget`, each prefixed with its heading."""
+    prefix = f"{heading}\n" if heading else ""
+    body_budget = max(budget - count_tokens(prefix, model), 1)
+
+    pieces = []
+    current, used = [], 0
+    for unit in _units(lines, body_budget, model):
+        cost = count_tokens(unit + "\n", model)
+        if current and used + cost > body_budget:
+            pieces.append(prefix + "\n".join(current))
+            current, used = [], 0
+        current.append(unit)
+        used += cost
+
+    if current or heading:
+        pieces.append(prefix + "\n".join(current))
+    return pieces
+
+
+def _chunk_sections(text: str, model: Optional[str]) -> List[str]:
+    budget = chunk_budget(model)
+
+    pieces = [
+        piece
+        for heading, lines in split_sections(text)
+        for piece in _section_pieces(heading, lines, budget, model)
+    ]
+
+    # Merge small sections into their neighbours, never past the budget
+    chunks = []
+    current, used = [], 0
+    for piece in pieces:
+        cost = count_tokens(piece + "\n\n", model)
+        if current and (
+            used + cost > budget
+            or (used >= CHUNK_MIN_TOKENS and cost >= CHUNK_MIN_TOKENS)
+        ):
+            chunks.append("\n\n".join(current))
+            current, used = [], 0
+        current.append(piece)
+        used += cost
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def chunk_text_fixed(text: str, chunk_size=800, overlap=100):
     chunks = []
     start = 0
 
@@ -8,3 +217,15 @@ def chunk_text(text: str, chunk_size=800, overlap=100):
         start += chunk_size - overlap
 
     return chunks
+
+
+def chunk_text(text: str, generation: Optional[Dict] = None) -> List[str]:
+    """Chunk `text` the way `generation` (default: the active one) is built."""
+    if generation is None:
+        from .vectorstore import active_generation
+
+        generation = active_generation()
+
+    if (generation.get("chunk_strategy") or CHUNK_STRATEGY) == "fixed":
+        return chunk_text_fixed(text)
+    return _chunk_sections(text, generation.get("embedding_model"))
@@ -1,15 +1,217 @@
+"""
+Vector collections (Chroma, or the flat in-process index).
+
+The collection pair that search and ingestion use (chunks plus one
+pooled vector per resume) is a "generation": a base collection name with
+the embedding model and chunking strategy its vectors were built with.
+The active generation is a row in METADATA_DB_PATH, so a migration
+(app/migration.py) can switch every process to a rebuilt collection in
+one transaction. On first use the row is created for COLLECTION_NAME
+with EMBEDDING_MODEL (reduced to EMBEDDING_DIMENSIONS, see
+app/dimensions.py) and CHUNK_STRATEGY. From then on the recorded spec is
+what the collection is served with: changing those settings later only
+logs a warning, because the stored vectors were not built with them. Use
+a migration to change them.
+
+Always resolve collections through `get_collection()` /
+`get_resume_collection()` rather than holding on to them.
+
+VECTOR_BACKEND=flat serves the same collections from the in-process
+memory-mapped index in app/flat_index.py instead of Chroma.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
 import chromadb
 from chromadb.config import Settings
-from .config import CHROMA_PERSIST_DIR, COLLECTION_NAME
+from .config import (
+    CHROMA_PERSIST_DIR,
+    COLLECTION_NAME,
+    CHROMA_HOST,
+    CHROMA_PORT,
+    VECTOR_BACKEND,
+    EMBEDDING_MODEL,
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_REDUCTION,
+    CHUNK_STRATEGY,
+)
+from .db import get_connection, ensure_schema
+from . import flat_index
+from .dimensions import model_spec
+
+logger = logging.getLogger(__name__)
 
-client = chromadb.PersistentClient(
-    path=CHROMA_PERSIST_DIR,
-    settings=Settings(
-        anonymized_telemetry=False
+FLAT_DIR = os.path.join(CHROMA_PERSIST_DIR, "flat")
+
+if VECTOR_BACKEND == "flat":
+    client = None
+elif CHROMA_HOST:
+    # Shared server: lets separate worker processes write to the same collection
+    client = chromadb.HttpClient(
+        host=CHROMA_HOST,
+        port=CHROMA_PORT,
+        settings=Settings(
+            anonymized_telemetry=False
+        )
+    )
+else:
+    client = chromadb.PersistentClient(
+        path=CHROMA_PERSIST_DIR,
+        settings=Settings(
+            anonymized_telemetry=False
+        )
     )
-)
 
-collection = client.get_or_create_collection(
-    name=COLLECTION_NAME,
-    metadata={"hnsw:space": "cosine"}
-)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS active_generation (
+    alias TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    embedding_model TEXT,
+    chunk_strategy TEXT,
+    previous TEXT,
+    updated_at REAL NOT NULL
+);
+"""
+
+_collections = {}
+_collections_lock = threading.Lock()
+# Generation names whose spec mismatch has been logged
+_warned = set()
+
+
+def _connection():
+    ensure_schema(SCHEMA)
+    return get_connection()
+
+
+def default_generation() -> Dict:
+    return {
+        "name": COLLECTION_NAME,
+        "embedding_model": model_spec(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, EMBEDDING_REDUCTION),
+        "chunk_strategy": CHUNK_STRATEGY,
+    }
+
+
+def _read_active(conn):
+    return conn.execute(
+        "SELECT name, embedding_model, chunk_strategy, previous FROM active_generation "
+        "WHERE alias = ?",
+        (COLLECTION_NAME,),
+    ).fetchone()
+
+
+def _check_settings(generation: Dict):
+    """Warn (once) when the settings no longer describe the collection they used to build."""
+    configured = default_generation()
+    if generation["name"] != configured["name"] or generation["name"] in _warned:
+        return
+    if (generation["embedding_model"], generation["chunk_strategy"]) != \
+            (configured["embedding_model"], configured["chunk_strategy"]):
+        _warned.add(generation["name"])
+        logger.warning(
+            "Collection %s was built with embedding model %s and %s chunking; the settings now say "
+            "%s and %s. Serving it as built: start a migration to change it.",
+            generation["name"], generation["embedding_model"], generation["chunk_strategy"],
+            configured["embedding_model"], configured["chunk_strategy"],
+        )
+
+
+def active_generation() -> Dict:
+    """{name, embedding_model, chunk_strategy} of the generation being served."""
+    conn = _connection()
+    row = _read_active(conn)
+
+    if row is None:
+        # First use: record the spec the default collection is built with
+        default = default_generation()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO active_generation "
+                "(alias, name, embedding_model, chunk_strategy, previous, updated_at) "
+                "VALUES (?, ?, ?, ?, NULL, ?)",
+                (COLLECTION_NAME, default["name"], default["embedding_model"],
+                 default["chunk_strategy"], time.time()),
+            )
+        row = _read_active(conn)
+        if row is None:
+            return default
+
+    name, embedding_model, chunk_strategy, previous = row
+    generation = {
+        "name": name,
+        "embedding_model": embedding_model,
+        "chunk_strategy": chunk_strategy,
+        "previous": previous,
+    }
+    _check_settings(generation)
+    return generation
+
+
+def activate_generation(generation: Dict, conn=None):
+    """
+    Point COLLECTION_NAME at `generation`. Pass `conn` to make the switch
+    part of a larger transaction; the caller commits.
+    """
+    current = active_generation()
+    own = conn is None
+    conn = conn or _connection()
+
+    conn.execute(
+        "INSERT OR REPLACE INTO active_generation "
+        "(alias, name, embedding_model, chunk_strategy, previous, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            COLLECTION_NAME,
+            generation["name"],
+            generation["embedding_model"],
+            generation["chunk_strategy"],
+            current["name"] if current["name"] != generation["name"] else current.get("previous"),
+            time.time(),
+        ),
+    )
+    if own:
+        conn.commit()
+
+
+def _open(name: str):
+    with _collections_lock:
+        found = _collections.get(name)
+        if found is None:
+            if client is None:
+                found = flat_index.FlatIndex(os.path.join(FLAT_DIR, name))
+            else:
+                found = client.get_or_create_collection(
+                    name=name,
+                    metadata={"hnsw:space": "cosine"}
+                )
+            _collections[name] = found
+        return found
+
+
+def get_collection(generation: Optional[Dict] = None):
+    """Chunk collection of `generation` (default: the active one)."""
+    return _open((generation or active_generation())["name"])
+
+
+def get_resume_collection(generation: Optional[Dict] = None):
+    """One mean-pooled vector per resume, for the first retrieval stage."""
+    return _open(f"{(generation or active_generation())['name']}_resumes")
+
+
+def drop_generation(name: str):
+    """Delete a generation's collections (never the active one)."""
+    if name == active_generation()["name"]:
+        raise ValueError(f"{name} is the active generation")
+
+    with _collections_lock:
+        for collection_name in (name, f"{name}_resumes"):
+            _collections.pop(collection_name, None)
+            if client is None:
+                flat_index.drop(os.path.join(FLAT_DIR, collection_name))
+                continue
+            try:
+                client.delete_collection(collection_name)
+            except ValueError:
+                pass  # already gone
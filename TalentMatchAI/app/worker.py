@@ -0,0 +1,88 @@
+"""
+Ingestion job workers.
+
+    python -m app.worker --concurrency 4
+
+Each worker claims one job at a time from the durable queue (app/jobs.py)
+and runs it through the intake pipeline, or builds the shadow collection
+of a "migration" job (app/migration.py). The API server also starts
+JOB_WORKERS worker threads of its own; separate worker processes need a
+Chroma server (CHROMA_HOST) so every process sees the same collection.
+"""
+import argparse
+import multiprocessing
+import threading
+import traceback
+from typing import List
+from .config import JOB_WORKERS, JOB_LEASE_SECONDS, JOB_POLL_INTERVAL
+from . import jobs
+from .pipeline import run_job
+from . import migration
+
+
+def _heartbeat_until(job_id: str, done: threading.Event):
+    while not done.wait(JOB_LEASE_SECONDS / 3):
+        jobs.heartbeat(job_id)
+
+
+def work_loop(stop: threading.Event = None, name: str = None):
+    """Claim and run jobs until `stop` is set."""
+    stop = stop or threading.Event()
+    worker = name or jobs.worker_name()
+
+    while not stop.is_set():
+        job = jobs.claim_job(worker)
+        if job is None:
+            stop.wait(JOB_POLL_INTERVAL)
+            continue
+
+        done = threading.Event()
+        threading.Thread(target=_heartbeat_until, args=(job["job_id"], done), daemon=True).start()
+        try:
+            if job["kind"] == "migration":
+                migration.run_job(job)
+            else:
+                run_job(job)
+        except Exception:
+            jobs.retry_or_fail(job["job_id"], traceback.format_exc())
+        finally:
+            done.set()
+
+
+def start_worker_threads(count: int = JOB_WORKERS) -> threading.Event:
+    """Run `count` workers inside this process; set the returned event to stop them."""
+    stop = threading.Event()
+    for i in range(count):
+        threading.Thread(
+            target=work_loop,
+            args=(stop, f"{jobs.worker_name()}:{i}"),
+            daemon=True,
+        ).start()
+    return stop
+
+
+def start_worker_processes(count: int) -> List[multiprocessing.Process]:
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=work_loop) for _ in range(count)]
+    for process in processes:
+        process.start()
+    return processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run TalentMatchAI ingestion workers")
+    parser.add_argument("--concurrency", type=int, default=max(JOB_WORKERS, 1),
+                        help="number of worker processes")
+    args = parser.parse_args()
+
+    processes = start_worker_processes(args.concurrency)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
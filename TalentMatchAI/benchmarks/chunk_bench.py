@@ -0,0 +1,96 @@
+"""
+Chunker benchmark: fixed 800/100-character windows vs the section-aware,
+token-budgeted chunker.
+
+Usage (from TalentMatchAI/):
+    python -m benchmarks.chunk_bench --resumes 500 --queries 200
+
+Each strategy runs in its own process (config is read at import time)
+with the local hashing embedder and a temporary Chroma directory. Reports
+chunk count, ingest time and recall@1/5/10 of /search retrieval for
+queries built from facts spread over a resume's experience and skills
+sections.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from .corpus import structured_resumes
+
+
+def run(strategy: str, resumes: int, queries: int):
+    from app.ingestion import ingest_bulk_resumes
+    from app.models import JobQuery
+    from app.retriever import retrieve_candidates
+    from app.utils import chunk_text
+
+    records = structured_resumes(resumes, seed=11)
+    texts = [record["text"] for record in records]
+    metadatas = [{"candidate_name": f"Candidate {i}", "experience": 5, "location": "Chennai",
+                  "benchmark_index": i} for i in range(resumes)]
+
+    chunks = sum(len(chunk_text(text)) for text in texts)
+    start = time.perf_counter()
+    ingest_bulk_resumes(texts, metadatas)
+    ingest_time = time.perf_counter() - start
+
+    hits = {1: 0, 5: 0, 10: 0}
+    for i, record in enumerate(records[:queries]):
+        jd = (f"{record['project']} for the {record['domain']} business at {record['company']}, "
+              f"strong {' '.join(record['skills'][:3])}")
+        results = retrieve_candidates(JobQuery(job_description=jd, top_k=10))
+        ranked = [r["metadata"].get("benchmark_index") for r in results]
+        for k in hits:
+            hits[k] += i in ranked[:k]
+
+    print(json.dumps({
+        "strategy": strategy,
+        "chunks": chunks,
+        "ingest_seconds": round(ingest_time, 2),
+        "recall": {k: round(v / queries, 3) for k, v in hits.items()},
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--resumes", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--model", default="local:hashing-768",
+                        help="EMBEDDING_MODEL to benchmark with")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(args.run, args.resumes, args.queries)
+        return
+
+    print(f"{args.resumes} resumes, {args.queries} queries, {args.model}")
+    for strategy in ("fixed", "section"):
+        with tempfile.TemporaryDirectory() as persist_dir:
+            env = dict(
+                os.environ,
+                CHUNK_STRATEGY=strategy,
+                EMBEDDING_MODEL=args.model,
+                OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "unused"),
+                CHROMA_PERSIST_DIR=persist_dir,
+                COLLECTION_NAME="chunk_bench",
+                EMBEDDING_CACHE_PATH=os.path.join(persist_dir, "embedding_cache.sqlite3"),
+            )
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.chunk_bench", "--run", strategy,
+                 "--resumes", str(args.resumes), "--queries", str(args.queries)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+
+        recall = "  ".join(f"R@{k}={v:.3f}" for k, v in result["recall"].items())
+        print(f"  {strategy:8s} {result['chunks']:6d} chunks  "
+              f"ingest {result['ingest_seconds']:6.2f}s  {recall}")
+
+
+if __name__ == "__main__":
+    main()
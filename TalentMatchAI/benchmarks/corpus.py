@@ -0,0 +1,194 @@
+"""
+Synthetic resume corpora for the benchmarks: plain text, DOCX and PDF.
+
+PDFs are written by hand (Helvetica text objects, one content stream per
+page) so no PDF authoring library is needed.
+"""
+import os
+import random
+import textwrap
+from typing import List, Sequence
+
+# Corpus sizes used by the benchmark suite
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+FORMATS = ("text", "pdf", "docx")
+
+WORDS = (
+    "python java kafka spark aws docker kubernetes react sql postgres "
+    "led team built designed migrated pipeline service api platform "
+    "engineer senior data backend frontend cloud scalable reduced latency "
+    "improved delivered mentored architecture microservices testing"
+).split()
+
+
+def synthetic_resumes(count: int, length: int = 3000, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    texts = []
+    for i in range(count):
+        words = []
+        size = 0
+        while size < length:
+            word = rng.choice(WORDS)
+            words.append(word)
+            size += len(word) + 1
+        texts.append(f"Candidate {i}\n" + " ".join(words))
+    return texts
+
+
+COMPANIES = "Acme Globex Initech Umbrella Stark Wayne Hooli Vandelay Soylent Cyberdyne".split()
+ROLES = ["Software Engineer", "Data Engineer", "Backend Developer", "Platform Engineer",
+         "Frontend Developer", "ML Engineer", "DevOps Engineer", "Tech Lead"]
+DOMAINS = "payments logistics healthcare retail insurance telecom gaming media banking travel".split()
+DEGREES = ["B.Tech Computer Science", "B.E. Electronics", "M.Tech Data Science", "MCA", "B.Sc Physics"]
+
+
+def structured_resumes(count: int, seed: int = 7) -> List[dict]:
+    """
+    Resumes with real sections (summary, experience, skills, education).
+    Each record is {"text", "skills", "domain", "company", "project"}; the
+    distinctive fields let the chunk benchmark build queries with a known
+    best match.
+    """
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        skills = rng.sample(WORDS[:10], 4)
+        domain = rng.choice(DOMAINS)
+        company = rng.choice(COMPANIES)
+        project = f"{rng.choice(DOMAINS)} {rng.choice(['ledger', 'router', 'scheduler', 'gateway', 'catalog'])}"
+
+        roles = []
+        for r in range(rng.randint(2, 4)):
+            bullets = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 18))) + "."
+                for _ in range(rng.randint(3, 6))
+            ]
+            roles.append(
+                f"{rng.choice(ROLES)}, {rng.choice(COMPANIES)} ({2010 + r * 3}-{2013 + r * 3})\n"
+                + "\n".join(f"- {b}" for b in bullets)
+            )
+        roles[0] = roles[0] + f"\n- Built the {project} for the {domain} business at {company}."
+
+        text = "\n".join([
+            f"Candidate {i}",
+            f"candidate{i}@example.com | +91 90000 {i:05d}",
+            "",
+            "Summary",
+            f"{rng.choice(ROLES)} with {rng.randint(2, 15)} years in {domain} systems.",
+            "",
+            "Experience",
+            "\n\n".join(roles),
+            "",
+            "Skills",
+            ", ".join(skills),
+            "",
+            "Education",
+            rng.choice(DEGREES),
+        ])
+        records.append({"text": text, "skills": skills, "domain": domain,
+                        "company": company, "project": project})
+    return records
+
+
+def write_docx(path: str, text: str):
+    from docx import Document
+
+    document = Document()
+    for line in text.split("\n"):
+        document.add_paragraph(line)
+    document.save(path)
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: List[str]):
+    """Write a minimal valid PDF with one text page per entry in `pages`."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+
+    for page_text in pages:
+        lines = []
+        for paragraph in page_text.split("\n"):
+            lines.extend(textwrap.wrap(paragraph, 95) or [""])
+        stream = "BT /F1 9 Tf 36 806 Td 11 TL " + " ".join(
+            f"({_pdf_escape(line)}) '" for line in lines[:70]
+        ) + " ET"
+        stream_bytes = stream.encode("latin-1", "replace")
+
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(stream_bytes) + stream_bytes + b"\nendstream"
+        )
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_refs)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref_at
+    )
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_docx_corpus(directory: str, count: int, seed: int) -> List[str]:
+    paths = []
+    for i, text in enumerate(synthetic_resumes(count, seed=seed)):
+        path = os.path.join(directory, f"resume_{seed}_{i}.docx")
+        write_docx(path, text)
+        paths.append(path)
+    return paths
+
+
+def write_pdf_corpus(directory: str, count: int, pages: int, seed: int) -> List[str]:
+    paths = []
+    texts = synthetic_resumes(count * pages, seed=seed)
+    for i in range(count):
+        path = os.path.join(directory, f"resume_{seed}_{i}_{pages}p.pdf")
+        write_pdf(path, texts[i * pages:(i + 1) * pages])
+        paths.append(path)
+    return paths
+
+
+def write_corpus(directory: str, texts: Sequence[str], formats: Sequence[str]) -> List[str]:
+    """
+    Write each text as a file, cycling through `formats` ("text", "pdf",
+    "docx"). Files that already exist are kept, so a corpus directory can
+    be reused across runs of the same seed.
+    """
+    paths = []
+    for i, text in enumerate(texts):
+        kind = formats[i % len(formats)]
+        path = os.path.join(directory, f"resume_{i}.{'txt' if kind == 'text' else kind}")
+        if not os.path.exists(path):
+            if kind == "pdf":
+                write_pdf(path, [text])
+            elif kind == "docx":
+                write_docx(path, text)
+            else:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(text)
+        paths.append(path)
+    return paths
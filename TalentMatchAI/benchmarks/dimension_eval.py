@@ -0,0 +1,140 @@
+"""
+Offline evaluation of reduced-dimension embeddings.
+
+Usage (from TalentMatchAI/):
+    python -m benchmarks.dimension_eval --resumes 2000 --queries 200
+    python -m benchmarks.dimension_eval --model text-embedding-3-small   # real API, needs OPENAI_API_KEY
+
+Embeds chunks of structured synthetic resumes and JD-style queries once
+at full size, then for every dimension and method (truncate, pca) loads
+the reduced vectors into a fresh index of the chosen backend and reports
+recall@k against exact full-size search, on-disk index size and query
+latency. PCA is fitted on the first --pca-sample chunk vectors, as
+`python -m app.dimensions fit-pca` fits on the candidate store.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from .corpus import structured_resumes
+from .vector_bench import percentile
+
+
+def jd_queries(records, count: int, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(records), size=min(count, len(records)), replace=False)
+    return [
+        f"{records[i]['domain']} engineer with {', '.join(records[i]['skills'])} "
+        f"who has built a {records[i]['project']}"
+        for i in picks
+    ]
+
+
+def directory_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def exact_top_k(vectors, queries, k):
+    sims = queries @ vectors.T
+    return [set(np.argsort(-row)[:k].tolist()) for row in sims]
+
+
+def open_index(backend: str, path: str):
+    if backend == "flat":
+        from app.flat_index import FlatIndex
+        return FlatIndex(path)
+
+    import chromadb
+    from chromadb.config import Settings
+    client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+    return client.create_collection("eval", metadata={"hnsw:space": "cosine"})
+
+
+def evaluate(backend, path, vectors, queries, truth, k):
+    index = open_index(backend, path)
+    ids = [str(i) for i in range(len(vectors))]
+    for i in range(0, len(vectors), 5000):
+        index.add(ids=ids[i:i + 5000], embeddings=vectors[i:i + 5000].tolist(),
+                  metadatas=[{"resume_id": "0"}] * len(ids[i:i + 5000]))
+
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = index.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latencies.append(time.perf_counter() - start)
+        hits += len({int(i) for i in result["ids"][0]} & expected)
+
+    return {
+        "recall": hits / max(sum(len(expected) for expected in truth), 1),
+        "size": directory_size(path),
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="local:hashing-768", help="full-size embedding model")
+    parser.add_argument("--resumes", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[512, 256, 128, 64])
+    parser.add_argument("--methods", nargs="+", default=["truncate", "pca"], choices=["truncate", "pca"])
+    parser.add_argument("--backend", default="flat", choices=["flat", "chroma"])
+    parser.add_argument("--pca-sample", type=int, default=5000)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as persist_dir:
+        # Must run before any `app.*` import: config is read at import time
+        os.environ["CHROMA_PERSIST_DIR"] = persist_dir
+        os.environ["METADATA_DB_PATH"] = os.path.join(persist_dir, "talentmatch.sqlite3")
+        os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(persist_dir, "embedding_cache.sqlite3")
+        os.environ["EMBEDDING_MODEL"] = args.model
+
+        from app import dimensions
+        from app.embeddings import iter_embeddings
+        from app.utils import chunk_text
+
+        generation = {"name": "eval", "embedding_model": args.model, "chunk_strategy": "section"}
+        records = structured_resumes(args.resumes)
+        chunks = [chunk for record in records for chunk in chunk_text(record["text"], generation)]
+
+        def embed(texts):
+            start = time.perf_counter()
+            rows = [vector for batch in iter_embeddings(texts, args.model) for vector in batch]
+            return np.asarray(rows, dtype=np.float32), time.perf_counter() - start
+
+        vectors, seconds = embed(chunks)
+        queries, _ = embed(jd_queries(records, args.queries))
+        truth = exact_top_k(vectors, queries, args.top_k)
+        full = vectors.shape[1]
+        print(f"{args.model}: {len(chunks)} chunks x {full}d embedded in {seconds:.1f} s, "
+              f"{len(queries)} queries, {args.backend} backend, recall@{args.top_k} vs exact {full}d")
+        print(f"  {'dims':>5} {'method':<9} {'recall':>7} {'index MB':>9} {'p50 ms':>8} {'p99 ms':>8}")
+
+        configs = [(full, "full")] + [
+            (dims, method) for dims in args.dimensions if dims < full for method in args.methods
+        ]
+        for dims, method in configs:
+            if method == "full":
+                reduced, reduced_queries = vectors, queries
+            else:
+                components = dimensions.fit_pca(vectors[:args.pca_sample], dims) if method == "pca" else None
+                reduced = dimensions.reduce(vectors, dims, method, components)
+                reduced_queries = dimensions.reduce(queries, dims, method, components)
+
+            result = evaluate(args.backend, os.path.join(persist_dir, f"{method}-{dims}"),
+                              reduced, reduced_queries, truth, args.top_k)
+            print(f"  {dims:>5} {method:<9} {result['recall']:>7.3f} {result['size'] / 2 ** 20:>9.1f} "
+                  f"{result['p50']:>8.2f} {result['p99']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Text extraction benchmark over a synthetic PDF + DOCX corpus.
+
+Usage (from TalentMatchAI/):
+    python -m benchmarks.extraction_bench --files 40 --pages 1 4 40
+
+For each PDF size, compares the old in-process extraction (one page at a
+time, `+=` concatenation) with the process-pool extraction service. Also
+checks that a malformed PDF fails fast instead of stalling the caller.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from .corpus import write_docx_corpus, write_pdf_corpus
+
+
+def legacy_extract(file_path: str) -> str:
+    """The pre-service extraction path from resume_parser."""
+    from pypdf import PdfReader
+    from docx import Document
+
+    if file_path.endswith(".pdf"):
+        reader = PdfReader(file_path)
+        text = ""
+        for page in reader.pages:
+            text += page.extract_text() or ""
+        return text
+    return "\n".join(para.text for para in Document(file_path).paragraphs)
+
+
+def timed(label: str, paths, extract):
+    started = time.perf_counter()
+    chars = sum(len(text) for text in extract(paths))
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<8} {len(paths) / elapsed:8.1f} files/sec  {chars:>10} chars")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 4, 40])
+    parser.add_argument("--max-length", type=int, default=None,
+                        help="override MAX_RESUME_LENGTH for the service")
+    args = parser.parse_args()
+
+    if args.max_length:
+        os.environ["MAX_RESUME_LENGTH"] = str(args.max_length)
+
+    from app.parser import extraction
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Warm the pool so process start-up isn't billed to the first run
+        warm = write_docx_corpus(workdir, extraction.EXTRACTION_WORKERS, seed=0)
+        [f.result() for f in [extraction.submit(p) for p in warm]]
+
+        corpora = [("docx", write_docx_corpus(workdir, args.files, seed=1))]
+        for pages in args.pages:
+            corpora.append((f"pdf x{pages}p", write_pdf_corpus(workdir, args.files, pages, seed=pages)))
+
+        for name, paths in corpora:
+            print(f"{name} ({len(paths)} files)")
+            timed("legacy", paths, lambda ps: [legacy_extract(p) for p in ps])
+            timed("service", paths, lambda ps: [f.result() for f in [extraction.submit(p) for p in ps]])
+
+        broken = os.path.join(workdir, "broken.pdf")
+        with open(broken, "wb") as f:
+            f.write(b"%PDF-1.4\n" + os.urandom(4096))
+        started = time.perf_counter()
+        try:
+            extraction.extract_text(broken)
+            outcome = "extracted"
+        except Exception as e:
+            outcome = type(e).__name__
+        print(f"malformed pdf: {outcome} after {time.perf_counter() - started:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
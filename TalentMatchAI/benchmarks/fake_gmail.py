@@ -0,0 +1,225 @@
+"""
+Local stand-in for the Gmail API, for intake benchmarks and dry runs.
+
+Serves the endpoints the intake uses (profile, labels, messages list /
+get in raw and full format, attachments, history) plus the `/batch`
+multipart endpoint. It counts HTTP round trips and the API calls inside
+them, and sleeps `latency` per round trip plus `call_latency` per call.
+
+Point the app at it with GMAIL_API_ROOT=<server.root_url>.
+"""
+import base64
+import email.message
+import email.parser
+import email.policy
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+LABEL_NAME = "Resume Inbox"
+LABEL_ID = "Label_1"
+
+_BOUNDARY = "batch_fake_gmail"
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+class FakeGmailServer:
+    """
+    latency:       seconds slept per HTTP round trip
+    call_latency:  extra seconds slept per API call (each call inside a batch counts)
+    history_floor: history ids below this answer 404, like expired history
+    """
+
+    def __init__(self, latency=0.05, call_latency=0.005, port=0):
+        self.latency = latency
+        self.call_latency = call_latency
+        self.round_trips = 0
+        self.calls = 0
+        self.history_floor = 0
+        self.messages = {}
+        self.history = []
+        self.history_id = 1000
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def root_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---------- Mailbox ----------
+
+    def add_message(self, attachments, unread=True) -> str:
+        """Deliver a message to the resume label; attachments are (filename, bytes)."""
+        with self._lock:
+            message_id = f"m{next(self._ids):06d}"
+            self.history_id += 1
+            self.messages[message_id] = {
+                "id": message_id,
+                "attachments": {f"a{i}": (name, data) for i, (name, data) in enumerate(attachments)},
+                "unread": unread,
+                "history_id": self.history_id,
+            }
+            self.history.append((self.history_id, message_id))
+            return message_id
+
+    def _raw(self, message: dict) -> bytes:
+        mime = email.message.EmailMessage()
+        mime["Subject"] = "Application"
+        mime.set_content("Please find my resume attached.")
+        for name, data in message["attachments"].values():
+            mime.add_attachment(data, maintype="application", subtype="octet-stream", filename=name)
+        return mime.as_bytes()
+
+    def _full(self, message: dict) -> dict:
+        parts = [{"partId": "0", "mimeType": "text/plain", "filename": "",
+                  "body": {"size": 31, "data": _b64(b"Please find my resume attached.")}}]
+        for i, (attachment_id, (name, data)) in enumerate(message["attachments"].items(), 1):
+            parts.append({"partId": str(i), "mimeType": "application/octet-stream", "filename": name,
+                          "body": {"attachmentId": attachment_id, "size": len(data)}})
+        return {"id": message["id"], "historyId": str(message["history_id"]),
+                "labelIds": [LABEL_ID], "payload": {"mimeType": "multipart/mixed", "parts": parts}}
+
+    # ---------- API ----------
+
+    def call(self, method: str, target: str):
+        """(status, JSON body) for one API call."""
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.call_latency)
+
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path = url.path.lstrip("/")
+        prefix = "gmail/v1/users/me/"
+        if not path.startswith(prefix) or method != "GET":
+            return 404, {"error": {"code": 404, "message": "Not found"}}
+        path = path[len(prefix):]
+
+        with self._lock:
+            if path == "profile":
+                return 200, {"emailAddress": "recruiting@example.com", "historyId": str(self.history_id)}
+
+            if path == "labels":
+                return 200, {"labels": [{"id": "INBOX", "name": "INBOX"}, {"id": LABEL_ID, "name": LABEL_NAME}]}
+
+            if path == "messages":
+                ids = [m["id"] for m in self.messages.values()
+                       if m["unread"] or "is:unread" not in query.get("q", "")]
+                start = int(query.get("pageToken", 0))
+                size = int(query.get("maxResults", 100))
+                page = {"messages": [{"id": i, "threadId": i} for i in ids[start:start + size]],
+                        "resultSizeEstimate": len(ids)}
+                if start + size < len(ids):
+                    page["nextPageToken"] = str(start + size)
+                return 200, page
+
+            if path == "history":
+                start_id = int(query["startHistoryId"])
+                if start_id < self.history_floor:
+                    return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+                records = [(h, m) for h, m in self.history if h > start_id]
+                offset = int(query.get("pageToken", 0))
+                size = int(query.get("maxResults", 100))
+                page = {
+                    "history": [{"id": str(h), "messagesAdded": [
+                        {"message": {"id": m, "threadId": m, "labelIds": [LABEL_ID]}}]}
+                        for h, m in records[offset:offset + size]],
+                    "historyId": str(self.history_id),
+                }
+                if offset + size < len(records):
+                    page["nextPageToken"] = str(offset + size)
+                return 200, page
+
+            match = re.fullmatch(r"messages/([^/]+)(?:/attachments/([^/]+))?", path)
+            message = self.messages.get(match.group(1)) if match else None
+            if message is None:
+                return 404, {"error": {"code": 404, "message": "Not found"}}
+
+            if match.group(2):
+                found = message["attachments"].get(match.group(2))
+                if found is None:
+                    return 404, {"error": {"code": 404, "message": "Not found"}}
+                return 200, {"size": len(found[1]), "data": _b64(found[1])}
+
+            if query.get("format") == "raw":
+                return 200, {"id": message["id"], "raw": _b64(self._raw(message))}
+            return 200, self._full(message)
+
+    def batch(self, content_type: str, body: bytes) -> bytes:
+        parsed = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+        )
+        out = []
+        for part in parsed.iter_parts():
+            request_line = part.get_payload(decode=True).decode("utf-8").lstrip().splitlines()[0]
+            method, target = request_line.split()[:2]
+            status, payload = self.call(method, target)
+            data = json.dumps(payload)
+            out.append(
+                f"--{_BOUNDARY}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'].strip('<>')}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Not Found'}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n{data}\r\n"
+            )
+        out.append(f"--{_BOUNDARY}--\r\n")
+        return "".join(out).encode("utf-8")
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, data: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                with server._lock:
+                    server.round_trips += 1
+                time.sleep(server.latency)
+                status, payload = server.call("GET", self.path)
+                self._reply(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+            def do_POST(self):
+                with server._lock:
+                    server.round_trips += 1
+                time.sleep(server.latency)
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if urlsplit(self.path).path != "/batch":
+                    self._reply(404, b"{}", "application/json")
+                    return
+                data = server.batch(self.headers["Content-Type"], body)
+                self._reply(200, data, f"multipart/mixed; boundary={_BOUNDARY}")
+
+        return Handler
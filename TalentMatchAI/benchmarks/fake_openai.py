@@ -0,0 +1,286 @@
+"""
+Local stand-in for the OpenAI HTTP API used by the benchmarks.
+
+Embeddings are deterministic (seeded from the input text) so repeated runs
+produce the same vectors, and every request sleeps for a configurable
+latency to mimic a network round-trip. Chat completions return a fixed-shape
+JSON resume record so the structuring step can run offline, or per-candidate
+scores when the prompt is a scoring prompt.
+
+With `rpm` / `tpm` set, requests beyond the per-minute budget are answered
+429 with `retry-after`, and every response carries OpenAI's
+`x-ratelimit-*` headers.
+"""
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def fake_vector(text: str, dimensions: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions)
+    vector /= np.linalg.norm(vector)
+    return vector.astype(np.float32)
+
+
+def truncated(vector: np.ndarray, dimensions: int) -> np.ndarray:
+    vector = vector[:dimensions]
+    return vector / np.linalg.norm(vector)
+
+
+def encode_vector(vector: np.ndarray, encoding_format: str):
+    # The SDK asks for base64 whenever numpy is installed, like the real API
+    if encoding_format == "base64":
+        return base64.b64encode(vector.tobytes()).decode("ascii")
+    return vector.tolist()
+
+
+def estimate_tokens(payload: dict) -> int:
+    """Rough request size in tokens (4 characters each), for usage and rate limits."""
+    if "messages" in payload:
+        return sum(len(m.get("content") or "") for m in payload["messages"]) // 4
+    inputs = payload.get("input", [])
+    return sum(len(text) for text in ([inputs] if isinstance(inputs, str) else inputs)) // 4
+
+
+class FakeOpenAIServer:
+    """
+    Threaded HTTP server exposing POST /v1/embeddings and
+    POST /v1/chat/completions.
+
+    latency:        seconds slept per embeddings request
+    input_latency:  extra seconds slept per input in the request
+    chat_latency:   seconds slept per chat completion
+    chat_item_latency: extra seconds per candidate scored (output generation)
+    rpm, tpm:       requests / tokens per minute before answering 429 (0: unlimited)
+    """
+
+    def __init__(self, latency=0.05, input_latency=0.0005, dimensions=1536,
+                 chat_latency=0.3, chat_item_latency=0.05, rpm=0, tpm=0, port=0):
+        self.latency = latency
+        self.input_latency = input_latency
+        self.dimensions = dimensions
+        self.chat_latency = chat_latency
+        self.chat_item_latency = chat_item_latency
+        self.requests = 0
+        self.inputs = 0
+        self.chat_requests = 0
+        self.chat_prompt_tokens = 0
+        self.rate_limited = 0
+        self.rpm = rpm
+        self.tpm = tpm
+        # Token buckets, refilled continuously over the minute
+        self._budget = {"requests": float(rpm), "tokens": float(tpm)}
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                path = self.path.rstrip("/")
+                if path.endswith("/embeddings"):
+                    handle = server.embeddings
+                elif path.endswith("/chat/completions"):
+                    handle = server.chat_completion
+                else:
+                    self.send_error(404)
+                    return
+
+                admitted, headers = server.admit(estimate_tokens(payload))
+                if admitted:
+                    status, body = 200, handle(payload)
+                else:
+                    status, body = 429, {"error": {
+                        "message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded",
+                    }}
+
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def admit(self, tokens: int):
+        """(admitted, rate-limit headers) for a request of about `tokens` tokens."""
+        if not (self.rpm or self.tpm):
+            return True, {}
+
+        with self._lock:
+            now = time.monotonic()
+            elapsed, self._refilled = now - self._refilled, now
+            limits = {"requests": self.rpm, "tokens": self.tpm}
+            for kind, limit in limits.items():
+                self._budget[kind] = min(limit, self._budget[kind] + elapsed * limit / 60)
+
+            # A request bigger than the whole budget waits for a full bucket
+            cost = {"requests": 1, "tokens": min(tokens, self.tpm)}
+            waits = {
+                kind: max(cost[kind] - self._budget[kind], 0) * 60 / limit
+                for kind, limit in limits.items() if limit
+            }
+            admitted = not any(waits.values())
+            if admitted:
+                for kind in waits:
+                    self._budget[kind] -= cost[kind]
+            else:
+                self.rate_limited += 1
+
+            headers = {}
+            for kind, limit in limits.items():
+                if limit:
+                    headers[f"x-ratelimit-limit-{kind}"] = str(limit)
+                    headers[f"x-ratelimit-remaining-{kind}"] = str(max(int(self._budget[kind]), 0))
+                    refill = (limit - self._budget[kind]) * 60 / limit
+                    headers[f"x-ratelimit-reset-{kind}"] = f"{refill:.3f}s"
+            if not admitted:
+                wait = max(waits.values())
+                headers["retry-after-ms"] = str(int(wait * 1000) + 1)
+                headers["retry-after"] = str(int(wait) + 1)
+            return admitted, headers
+
+    def embeddings(self, payload: dict) -> dict:
+        inputs = payload.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        with self._lock:
+            self.requests += 1
+            self.inputs += len(inputs)
+
+        time.sleep(self.latency + self.input_latency * len(inputs))
+        encoding_format = payload.get("encoding_format", "float")
+        # Like text-embedding-3: a requested size is the re-normalized prefix
+        dimensions = payload.get("dimensions") or self.dimensions
+
+        return {
+            "object": "list",
+            "model": payload.get("model"),
+            "data": [
+                {
+                    "object": "embedding",
+                    "index": i,
+                    "embedding": encode_vector(
+                        truncated(fake_vector(text, self.dimensions), dimensions), encoding_format
+                    ),
+                }
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": estimate_tokens(payload), "total_tokens": estimate_tokens(payload)},
+        }
+
+    def chat_completion(self, payload: dict) -> dict:
+        prompt = "".join(m.get("content") or "" for m in payload.get("messages", []))
+
+        with self._lock:
+            self.chat_requests += 1
+            self.chat_prompt_tokens += len(prompt) // 4
+
+        seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:4], "little")
+
+        if '"scored_results"' in prompt:
+            ids = re.findall(r'\{"id": "([^"]+)"', prompt)
+            time.sleep(self.chat_latency + self.chat_item_latency * len(ids))
+            content = json.dumps({"scored_results": [
+                {"id": cid, "score": 50 + (seed + i) % 50,
+                 "strengths": ["relevant experience"], "gaps": []}
+                for i, cid in enumerate(ids)
+            ]})
+            return self._chat_response(payload, seed, prompt, content)
+
+        resumes = re.findall(r"### Resume (\S+) \(fields: ([^)]*)\)", prompt)
+        time.sleep(self.chat_latency + self.chat_item_latency * max(len(resumes) - 1, 0))
+
+        def structured(seed: int) -> dict:
+            return {
+                "name": f"Candidate {seed % 10000}",
+                "email": f"candidate{seed % 10000}@example.com",
+                "phone": "+91 90000 00000",
+                "skills": ["python", "sql", "kafka", "aws"][: 1 + seed % 4],
+                "experience": seed % 15,
+                "education": "B.Tech",
+                "location": ["Chennai", "Bangalore", "Pune"][seed % 3],
+            }
+
+        if resumes:
+            content = json.dumps({"resumes": [
+                {"id": rid, **{field: value for field, value in structured(seed + i).items()
+                               if field in fields.split(", ")}}
+                for i, (rid, fields) in enumerate(resumes)
+            ]})
+        else:
+            content = json.dumps(structured(seed))
+        return self._chat_response(payload, seed, prompt, content)
+
+    def _chat_response(self, payload: dict, seed: int, prompt: str, content: str) -> dict:
+        return {
+            "id": f"chatcmpl-{seed}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the fake OpenAI server")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--chat-latency", type=float, default=0.3)
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute (0: unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="tokens per minute (0: unlimited)")
+    args = parser.parse_args()
+
+    fake = FakeOpenAIServer(latency=args.latency, chat_latency=args.chat_latency,
+                            rpm=args.rpm, tpm=args.tpm, port=args.port)
+    print(f"Fake OpenAI listening on {fake.base_url}")
+    fake._server.serve_forever()
@@ -0,0 +1,85 @@
+"""
+Gmail intake benchmark: per-message raw downloads vs batched, incremental sync.
+
+Usage (from TalentMatchAI/):
+    python -m benchmarks.gmail_bench --messages 200 --new 20
+
+Runs against the local fake Gmail API (benchmarks/fake_gmail.py). Prints
+HTTP round trips, API calls, files and seconds for the old fetch (list,
+then one raw `messages.get` per message), the first batched sync, an
+incremental sync after --new more messages arrive, and a sync with no
+new mail.
+"""
+import argparse
+import base64
+import os
+import tempfile
+import time
+from email import message_from_bytes
+
+from .fake_gmail import FakeGmailServer
+
+
+def legacy_fetch(service, store_bytes, max_results):
+    """The pre-batching fetch: whole raw MIME per message, every run."""
+    results = service.users().messages().list(
+        userId="me", q="is:unread has:attachment", maxResults=max_results,
+    ).execute()
+
+    stored = []
+    for msg in results.get("messages", []):
+        msg_data = service.users().messages().get(userId="me", id=msg["id"], format="raw").execute()
+        for part in message_from_bytes(base64.urlsafe_b64decode(msg_data["raw"])).walk():
+            filename = part.get_filename()
+            if part.get_content_disposition() == "attachment" and filename and filename.lower().endswith(".pdf"):
+                stored.append(store_bytes(part.get_payload(decode=True), filename).path)
+    return stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--new", type=int, default=20)
+    parser.add_argument("--attachment-kb", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per HTTP round trip")
+    args = parser.parse_args()
+
+    with FakeGmailServer(latency=args.latency) as gmail, tempfile.TemporaryDirectory() as workdir:
+        # Must run before any `app.*` import: config is read at import time
+        os.environ["GMAIL_API_ROOT"] = gmail.root_url
+        os.environ["CHROMA_PERSIST_DIR"] = workdir
+        os.environ["METADATA_DB_PATH"] = os.path.join(workdir, "talentmatch.sqlite3")
+        os.environ["UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+
+        from app.intake import gmail_fetcher
+        from app.intake.file_storage import store_bytes
+
+        def deliver(count, start):
+            for i in range(start, start + count):
+                payload = b"%PDF-1.4 " + os.urandom(args.attachment_kb * 1024)
+                # Cover letters and images ride along and must be skipped
+                gmail.add_message([(f"resume_{i}.pdf", payload), (f"photo_{i}.png", b"\x89PNG")])
+
+        def measure(label, run):
+            round_trips, calls = gmail.round_trips, gmail.calls
+            started = time.perf_counter()
+            files = len(run())
+            elapsed = time.perf_counter() - started
+            print(f"  {label:<22} {gmail.round_trips - round_trips:>5} round trips  "
+                  f"{gmail.calls - calls:>5} API calls  {files:>5} files  {elapsed:>7.2f} s")
+
+        deliver(args.messages, 0)
+        print(f"{args.messages} messages, {args.attachment_kb} KB attachments, "
+              f"{args.latency * 1000:.0f} ms per round trip")
+
+        service = gmail_fetcher.get_gmail_service()
+        measure("per-message raw", lambda: legacy_fetch(service, store_bytes, args.messages))
+        measure("batched first sync", lambda: list(gmail_fetcher.fetch_resume_emails()))
+
+        deliver(args.new, args.messages)
+        measure(f"incremental (+{args.new})", lambda: list(gmail_fetcher.fetch_resume_emails()))
+        measure("incremental (no mail)", lambda: list(gmail_fetcher.fetch_resume_emails()))
+
+
+if __name__ == "__main__":
+    main()
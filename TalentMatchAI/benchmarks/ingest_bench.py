@@ -0,0 +1,103 @@
+"""
+Ingestion throughput benchmark against the local fake OpenAI server.
+
+Usage (from TalentMatchAI/):
+    python -m benchmarks.ingest_bench --resumes 200 --latency 0.05
+
+Compares the old one-request-per-chunk path with the batched embedding
+engine used by `ingest_bulk_resumes`. Then it re-ingests the corpus twice:
+unchanged (rejected by the dedup stage) and lightly edited (near-duplicate
+updates served mostly from the embedding cache). Prints chunks/sec per run.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from .corpus import synthetic_resumes
+from .fake_openai import FakeOpenAIServer
+
+
+def configure_env(base_url: str, persist_dir: str):
+    # Must run before any `app.*` import: config is read at import time
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = "fake-key"
+    os.environ.setdefault("EMBEDDING_MODEL", "text-embedding-3-small")
+    os.environ["CHROMA_PERSIST_DIR"] = persist_dir
+    os.environ["COLLECTION_NAME"] = "bench_resumes"
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(persist_dir, "embedding_cache.sqlite3")
+
+
+def serial_ingest(resume_texts, metadatas):
+    """The pre-engine ingestion path: one embeddings request per chunk."""
+    import uuid
+    from app.embeddings import get_embedding
+    from app.ingestion import sanitize_metadata, BATCH_SIZE
+    from app.utils import chunk_text
+    from app.vectorstore import get_collection
+
+    collection = get_collection()
+    documents, metadata_batch, embeddings, ids = [], [], [], []
+    for resume_text, metadata in zip(resume_texts, metadatas):
+        resume_id = str(uuid.uuid4())
+        for chunk in chunk_text(resume_text):
+            metadata_with_id = metadata.copy()
+            metadata_with_id["resume_id"] = resume_id
+            documents.append(chunk)
+            metadata_batch.append(sanitize_metadata(metadata_with_id))
+            embeddings.append(get_embedding(chunk))
+            ids.append(str(uuid.uuid4()))
+            if len(documents) >= BATCH_SIZE:
+                collection.add(documents=documents, metadatas=metadata_batch,
+                               embeddings=embeddings, ids=ids)
+                documents, metadata_batch, embeddings, ids = [], [], [], []
+    if documents:
+        collection.add(documents=documents, metadatas=metadata_batch,
+                       embeddings=embeddings, ids=ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--resumes", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="fake server latency per request (seconds)")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency=args.latency) as server, \
+            tempfile.TemporaryDirectory() as persist_dir:
+        configure_env(server.base_url, persist_dir)
+
+        from app.ingestion import ingest_bulk_resumes
+        from app.utils import chunk_text
+        from app.vectorstore import get_collection
+
+        # Separate corpora so the serial run doesn't warm the cache for the engine
+        serial_texts = synthetic_resumes(args.resumes, seed=1)
+        engine_texts = synthetic_resumes(args.resumes, seed=2)
+        metadatas = [{"candidate_name": f"Candidate {i}", "experience": i % 15,
+                      "location": "Chennai", "skills": ["python", "sql"]}
+                     for i in range(args.resumes)]
+        total_chunks = sum(len(chunk_text(t)) for t in engine_texts)
+
+        runs = (
+            ("serial", serial_ingest, serial_texts),
+            ("engine", ingest_bulk_resumes, engine_texts),
+            ("reupload", ingest_bulk_resumes, engine_texts),
+            ("edited", ingest_bulk_resumes, [t + "\nUpdated contact details" for t in engine_texts]),
+        )
+
+        results = {}
+        for label, ingest, texts in runs:
+            requests_before = server.requests
+            started = time.perf_counter()
+            ingest(texts, metadatas)
+            elapsed = time.perf_counter() - started
+            results[label] = (total_chunks / elapsed, server.requests - requests_before)
+
+        print(f"chunks per run: {total_chunks}  collection size: {get_collection().count()}")
+        for label, (rate, requests) in results.items():
+            print(f"{label:>8}: {rate:10.1f} chunks/sec  ({requests} embedding requests)")
+
+
+if __name__ == "__main__":
+    main()
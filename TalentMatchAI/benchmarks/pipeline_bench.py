@@ -0,0 +1,53 @@
+"""
+End-to-end intake pipeline benchmark over synthetic DOCX resumes.
+
+Usage (from TalentMatchAI/):
+    python -m benchmarks.pipeline_bench --files 40 --workers 1 2 4 8
+
+Runs the staged pipeline (extract -> structure -> embed + index) against
+the fake OpenAI server once per structuring-concurrency setting and prints
+resumes/sec. Extraction uses --extract-workers processes (default: CPU count).
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from .corpus import write_docx_corpus
+from .fake_openai import FakeOpenAIServer
+from .ingest_bench import configure_env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--extract-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chat-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(chat_latency=args.chat_latency) as server, \
+            tempfile.TemporaryDirectory() as workdir:
+        configure_env(server.base_url, workdir)
+        os.environ["EXTRACTION_WORKERS"] = str(args.extract_workers)
+
+        from app import jobs, pipeline
+
+        for workers in args.workers:
+            # Fresh corpus per run so dedup doesn't short-circuit indexing
+            paths = write_docx_corpus(workdir, args.files, seed=workers)
+
+            pipeline.PIPELINE_STRUCTURE_CONCURRENCY = workers
+
+            job_id = jobs.create_job("upload", "benchmark", [{"file_path": p} for p in paths])
+            started = time.perf_counter()
+            pipeline.run_job(jobs.claim_job("benchmark"))
+            elapsed = time.perf_counter() - started
+
+            job = jobs.get_job(job_id, include_items=False)
+            print(f"workers={workers:<3} {args.files / elapsed:8.2f} resumes/sec  "
+                  f"status={job['status']} items={job['progress']['by_status']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Bulk matching benchmark: N separate /search calls vs one /search/batch.
+
+Usage (from TalentMatchAI/):
+    python -m benchmarks.search_bench --resumes 500 --queries 50
+
+Runs against the local fake OpenAI server (embeddings and scoring) and a
+temporary Chroma directory. Each mode uses its own set of JDs so neither
+run is served from the other's caches. Prints JDs/sec per mode.
+"""
+import argparse
+import tempfile
+import time
+
+from .corpus import synthetic_resumes
+from .fake_openai import FakeOpenAIServer
+from .ingest_bench import configure_env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--resumes", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="fake embeddings latency per request (seconds)")
+    parser.add_argument("--chat-latency", type=float, default=0.2,
+                        help="fake chat latency per request (seconds)")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency=args.latency, chat_latency=args.chat_latency,
+                          chat_item_latency=0.01) as server, \
+            tempfile.TemporaryDirectory() as persist_dir:
+        configure_env(server.base_url, persist_dir)
+
+        from fastapi.testclient import TestClient
+        from app.ingestion import ingest_bulk_resumes
+        from app.main import app
+
+        texts = synthetic_resumes(args.resumes, seed=1)
+        ingest_bulk_resumes(texts, [
+            {"candidate_name": f"Candidate {i}", "experience": i % 15,
+             "location": ["Chennai", "Pune"][i % 2], "skills": ["python", "sql"]}
+            for i in range(args.resumes)
+        ])
+
+        client = TestClient(app)
+
+        def queries(seed):
+            return [
+                {"job_description": jd[:800], "top_k": args.top_k,
+                 "min_experience": i % 5, "location": ["Chennai", "Pune"][i % 2]}
+                for i, jd in enumerate(synthetic_resumes(args.queries, seed=seed))
+            ]
+
+        sequential = queries(seed=100)
+        embed_requests, chat_requests = server.requests, server.chat_requests
+        start = time.perf_counter()
+        for query in sequential:
+            client.post("/search", json=query).raise_for_status()
+        seq_time = time.perf_counter() - start
+        seq_calls = (server.requests - embed_requests, server.chat_requests - chat_requests)
+
+        batch = queries(seed=200)
+        embed_requests, chat_requests = server.requests, server.chat_requests
+        start = time.perf_counter()
+        response = client.post("/search/batch", json={"queries": batch})
+        response.raise_for_status()
+        batch_time = time.perf_counter() - start
+        batch_calls = (server.requests - embed_requests, server.chat_requests - chat_requests)
+
+        print(f"{args.queries} JDs over {args.resumes} resumes, top_k={args.top_k}")
+        print(f"  /search x{args.queries}: {args.queries / seq_time:8.2f} JDs/sec  "
+              f"({seq_calls[0]} embedding, {seq_calls[1]} chat requests)")
+        print(f"  /search/batch:  {args.queries / batch_time:8.2f} JDs/sec  "
+              f"({batch_calls[0]} embedding, {batch_calls[1]} chat requests)")
+
+
+if __name__ == "__main__":
+    main()
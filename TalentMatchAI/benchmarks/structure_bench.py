@@ -0,0 +1,98 @@
+"""
+Resume structuring benchmark: one full-text LLM request per resume vs
+the heuristic fast-path with trimmed, batched requests.
+
+Usage (from TalentMatchAI/):
+    python -m benchmarks.structure_bench --resumes 200
+
+Runs against the fake OpenAI server. Prints requests, prompt tokens per
+resume and resumes/sec for the old per-resume prompt, for
+`structure_resumes` on a cold cache, and again on a warm cache.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+from .corpus import structured_resumes
+from .fake_openai import FakeOpenAIServer
+from .ingest_bench import configure_env
+
+LEGACY_PROMPT = """
+    Extract structured data in STRICT JSON format with this schema:
+
+    {{
+        "name": string,
+        "email": string,
+        "phone": string,
+        "skills": list of strings,
+        "experience": int,       # total years of experience
+        "education": string,
+        "location": string       # city
+    }}
+
+    Instructions:
+    - Calculate total professional experience in years and return as an integer.
+    - Extract location as a single clean string (city).
+    - Return JSON ONLY. Do not include any extra text.
+
+    Resume:
+    {resume_text}
+    """
+
+
+def legacy_structure(texts, concurrency):
+    """The pre-batching path: whole resume, one request each."""
+    from openai import AsyncOpenAI
+
+    async_client = AsyncOpenAI()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(text):
+        async with semaphore:
+            await async_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": LEGACY_PROMPT.format(resume_text=text)}],
+                response_format={"type": "json_object"},
+                temperature=0,
+            )
+
+    async def run():
+        await asyncio.gather(*(one(text) for text in texts))
+
+    asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--resumes", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--chat-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(chat_latency=args.chat_latency, chat_item_latency=0.05) as server, \
+            tempfile.TemporaryDirectory() as workdir:
+        configure_env(server.base_url, workdir)
+
+        from app.parser import resume_parser
+        resume_parser.STRUCTURE_CONCURRENCY = args.concurrency
+
+        texts = [record["text"] for record in structured_resumes(args.resumes)]
+
+        def measure(label, run):
+            requests, tokens = server.chat_requests, server.chat_prompt_tokens
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            print(f"  {label:<18} {server.chat_requests - requests:>5} requests  "
+                  f"{(server.chat_prompt_tokens - tokens) / len(texts):>7.0f} prompt tokens/resume  "
+                  f"{len(texts) / elapsed:>8.1f} resumes/sec")
+
+        print(f"{len(texts)} resumes, concurrency {args.concurrency}, chat latency {args.chat_latency}s")
+        measure("per-resume", lambda: legacy_structure(texts, args.concurrency))
+        measure("heuristic+batch", lambda: resume_parser.structure_resumes(texts))
+        measure("cached", lambda: resume_parser.structure_resumes(texts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+End-to-end benchmark suite: extraction, `ingest_bulk_resumes`,
+`retrieve_candidates` and the `/search` endpoint, reported as JSON.
+
+Usage (from TalentMatchAI/):
+    python -m benchmarks.suite run --scale 10k --formats text pdf docx --output bench/HEAD.json
+    python -m benchmarks.suite compare bench/base.json bench/HEAD.json --threshold 0.1
+
+Runs offline against the local fake OpenAI server (deterministic
+embeddings, configurable latency and RPM/TPM limits) and a temporary
+vector store. Each stage reports its count, throughput and p50/p95/p99
+latency: per file for extraction, per `MAX_BATCH_SIZE` batch for
+ingestion, per query for retrieval and search, plus the mean time of the
+app's own stages (talentmatch_stage_seconds). The JSON also records the
+commit and settings, so runs can be compared across commits with
+`compare`, which exits non-zero when a stage regressed past the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .corpus import FORMATS, SCALES, structured_resumes, write_corpus
+from .fake_openai import FakeOpenAIServer
+from .ingest_bench import configure_env
+
+LOCATIONS = ["Chennai", "Bangalore", "Pune"]
+
+
+def _commit() -> Optional[str]:
+    try:
+        head = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return head + ("-dirty" if dirty else "")
+
+
+def stage_stats(latencies: List[float], seconds: float, items: int, errors: int = 0) -> Dict:
+    """Count, throughput (items/s) and latency percentiles in milliseconds."""
+    stats = {"count": len(latencies), "items": items, "errors": errors, "seconds": round(seconds, 3),
+             "throughput": round(items / seconds, 2) if seconds else None}
+    if latencies:
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+        stats.update(p50_ms=round(p50, 2), p95_ms=round(p95, 2), p99_ms=round(p99, 2),
+                     max_ms=round(max(latencies) * 1000, 2))
+    return stats
+
+
+def _timed(fn: Callable, *args):
+    """(seconds, error) for one call."""
+    started = time.perf_counter()
+    try:
+        fn(*args)
+    except Exception as e:
+        return time.perf_counter() - started, e
+    return time.perf_counter() - started, None
+
+
+def _run_stage(label: str, calls: List[tuple], items: int, workers: int = 1) -> Dict:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(lambda call: _timed(*call), calls))
+    seconds = time.perf_counter() - started
+
+    failures = [error for _, error in outcomes if error is not None]
+    if failures:
+        print(f"  {label}: {len(failures)} failed, first: {failures[0]!r}", file=sys.stderr)
+    return stage_stats([elapsed for elapsed, _ in outcomes], seconds, items, len(failures))
+
+
+def _queries(count: int, seed: int, top_k: int) -> List[Dict]:
+    """JDs drawn from another seed's resumes, with a mix of filters."""
+    queries = []
+    for i, record in enumerate(structured_resumes(count, seed=seed)):
+        query = {"job_description": record["text"][:800], "top_k": top_k, "min_experience": i % 5}
+        if i % 2:
+            query["location"] = LOCATIONS[i % len(LOCATIONS)]
+        if i % 4 == 0:
+            query["required_skills"] = record["skills"][:1]
+        if i % 3 == 0:
+            query["preferred_skills"] = record["skills"][1:3]
+        queries.append(query)
+    return queries
+
+
+def run(args) -> Dict:
+    resumes = SCALES.get(args.scale) or int(args.scale)
+
+    with FakeOpenAIServer(latency=args.latency, chat_latency=args.chat_latency,
+                          chat_item_latency=0.01, rpm=args.rpm, tpm=args.tpm) as server, \
+            tempfile.TemporaryDirectory() as workdir:
+        configure_env(server.base_url, workdir)
+        os.environ["METADATA_DB_PATH"] = os.path.join(workdir, "talentmatch.sqlite3")
+
+        from fastapi.testclient import TestClient
+        from app.config import EMBEDDING_MODEL, MAX_BATCH_SIZE, EXTRACTION_WORKERS, VECTOR_BACKEND
+        from app.ingestion import ingest_bulk_resumes
+        from app.main import app
+        from app.metrics import stage_summary
+        from app.models import JobQuery
+        from app.retriever import retrieve_candidates
+
+        records = structured_resumes(resumes, seed=args.seed)
+        metadatas = [
+            {"candidate_name": f"Candidate {i}", "experience": i % 15,
+             "location": LOCATIONS[i % len(LOCATIONS)], "skills": record["skills"]}
+            for i, record in enumerate(records)
+        ]
+        stages = {}
+
+        # Extraction: a file corpus goes through the process pool, plain text is read as is
+        texts = [record["text"] for record in records]
+        if args.formats != ["text"]:
+            from app.parser.extraction import extract_text
+
+            corpus_dir = os.path.join(args.corpus_dir or workdir, f"corpus-{resumes}-{args.seed}")
+            os.makedirs(corpus_dir, exist_ok=True)
+            started = time.perf_counter()
+            paths = write_corpus(corpus_dir, texts, args.formats)
+            print(f"corpus: {len(paths)} files in {time.perf_counter() - started:.1f} s ({corpus_dir})")
+
+            def read(i, path):
+                if path.endswith(".txt"):
+                    with open(path, encoding="utf-8") as f:
+                        texts[i] = f.read()
+                else:
+                    texts[i] = extract_text(path)
+
+            stages["extract"] = _run_stage(
+                "extract", [(read, i, path) for i, path in enumerate(paths)], len(paths), EXTRACTION_WORKERS,
+            )
+
+        # Ingestion, in the batches /add-resumes jobs are processed in
+        embed_inputs = server.inputs
+        batches = [
+            (ingest_bulk_resumes, texts[i:i + MAX_BATCH_SIZE], metadatas[i:i + MAX_BATCH_SIZE])
+            for i in range(0, resumes, MAX_BATCH_SIZE)
+        ]
+        stages["ingest"] = _run_stage("ingest", batches, resumes, args.ingest_workers)
+        stages["ingest"]["chunks_embedded"] = server.inputs - embed_inputs
+
+        # Retrieval and search use separate JDs so neither is served from the other's caches
+        retrieve_candidates(JobQuery(**_queries(1, seed=args.seed + 99, top_k=args.top_k)[0]))
+        retrieval = [(retrieve_candidates, JobQuery(**query))
+                     for query in _queries(args.queries, seed=args.seed + 100, top_k=args.top_k)]
+        stages["retrieve"] = _run_stage("retrieve", retrieval, len(retrieval), args.concurrency)
+
+        client = TestClient(app)
+
+        def search(query):
+            client.post("/search", json=query).raise_for_status()
+
+        searches = [(search, query)
+                    for query in _queries(args.search_queries, seed=args.seed + 200, top_k=args.top_k)]
+        stages["search"] = _run_stage("search", searches, len(searches), args.concurrency)
+
+        return {
+            "commit": _commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "config": {
+                "resumes": resumes, "formats": args.formats, "seed": args.seed,
+                "queries": args.queries, "search_queries": args.search_queries, "top_k": args.top_k,
+                "concurrency": args.concurrency, "ingest_workers": args.ingest_workers,
+                "latency": args.latency, "chat_latency": args.chat_latency,
+                "rpm": args.rpm, "tpm": args.tpm, "batch_size": MAX_BATCH_SIZE,
+                "embedding_model": EMBEDDING_MODEL, "vector_backend": VECTOR_BACKEND,
+            },
+            "stages": stages,
+            # Where the time went inside the app, from its stage histogram (all runs above)
+            "breakdown": {
+                name: {"count": int(entry["count"]),
+                       "mean_ms": round(entry["seconds"] / entry["count"] * 1000, 2) if entry["count"] else None}
+                for name, entry in sorted(stage_summary().items())
+            },
+            "openai": {
+                "embedding_requests": server.requests, "embedding_inputs": server.inputs,
+                "chat_requests": server.chat_requests, "rate_limited": server.rate_limited,
+            },
+        }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """Print stage-by-stage changes; returns the regressions beyond `threshold` (fraction)."""
+    if baseline.get("config") != current.get("config"):
+        print("warning: runs used different settings", file=sys.stderr)
+
+    regressions = []
+    print(f"{'stage':<10} {'metric':<11} {baseline.get('commit') or 'baseline':>14} "
+          f"{current.get('commit') or 'current':>14} {'change':>8}")
+    for stage, after in current["stages"].items():
+        before = baseline["stages"].get(stage)
+        if not before:
+            continue
+        for metric, higher_is_better in (("throughput", True), ("p50_ms", False),
+                                         ("p95_ms", False), ("p99_ms", False)):
+            old, new = before.get(metric), after.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = " !" if worse > threshold else ""
+            if flag:
+                regressions.append(f"{stage} {metric}")
+            print(f"{stage:<10} {metric:<11} {old:>14} {new:>14} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bench = commands.add_parser("run", help="run the suite and write a JSON report")
+    bench.add_argument("--scale", default="1k", help=f"{', '.join(SCALES)} or a resume count")
+    bench.add_argument("--formats", nargs="+", choices=FORMATS, default=["text"])
+    bench.add_argument("--corpus-dir", help="keep generated files here for later runs")
+    bench.add_argument("--seed", type=int, default=7)
+    bench.add_argument("--queries", type=int, default=200, help="retrieve_candidates calls")
+    bench.add_argument("--search-queries", type=int, default=50, help="/search requests")
+    bench.add_argument("--top-k", type=int, default=10)
+    bench.add_argument("--concurrency", type=int, default=1, help="parallel retrieval/search calls")
+    bench.add_argument("--ingest-workers", type=int, default=1, help="parallel ingestion batches")
+    bench.add_argument("--latency", type=float, default=0.05, help="fake embeddings latency (seconds)")
+    bench.add_argument("--chat-latency", type=float, default=0.2, help="fake chat latency (seconds)")
+    bench.add_argument("--rpm", type=int, default=0, help="fake requests-per-minute limit (0: none)")
+    bench.add_argument("--tpm", type=int, default=0, help="fake tokens-per-minute limit (0: none)")
+    bench.add_argument("--output", help="JSON report path (default: stdout)")
+
+    diff = commands.add_parser("compare", help="compare two JSON reports")
+    diff.add_argument("baseline")
+    diff.add_argument("current")
+    diff.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown (fraction)")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"regressed: {', '.join(regressions)}")
+            sys.exit(1)
+        return
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+        print(f"wrote {args.output}")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Vector backend benchmark: Chroma (HNSW) vs the flat memory-mapped index.
+
+Usage (from TalentMatchAI/):
+    python -m benchmarks.vector_bench --chunks 100000 --queries 200
+
+Loads the same clustered synthetic embeddings and filter metadata into a
+Chroma collection and into flat indexes (float16 and int8), then times
+single-query calls, unfiltered and with experience + location filters.
+Recall@k is measured against exact float32 search with the same filter.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+LOCATIONS = ["Chennai", "Pune", "Bengaluru", "Hyderabad", "Mumbai"]
+
+
+def synthetic_vectors(count: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors around a few hundred topic centers, like resume chunks."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(256, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.8 * rng.normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def percentile(values, q: float) -> float:
+    return float(np.percentile(values, q)) * 1000
+
+
+def exact_top_k(vectors, queries, mask, k):
+    sims = queries @ vectors.T
+    sims[:, ~mask] = -np.inf
+    return [set(np.argsort(-row)[:k].tolist()) for row in sims]
+
+
+def run(name, collection, queries, where, truth, k):
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, where=where, include=[])
+        latencies.append(time.perf_counter() - start)
+        hits += len({int(i) for i in result["ids"][0]} & expected)
+
+    recall = hits / max(sum(len(expected) for expected in truth), 1)
+    print(f"  {name:<14} p50 {percentile(latencies, 50):8.2f} ms   p99 {percentile(latencies, 99):8.2f} ms   "
+          f"recall@{k} {recall:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as persist_dir:
+        os.environ["CHROMA_PERSIST_DIR"] = persist_dir
+        os.environ["METADATA_DB_PATH"] = os.path.join(persist_dir, "talentmatch.sqlite3")
+
+        import chromadb
+        from chromadb.config import Settings
+        from app.flat_index import FlatIndex
+
+        vectors = synthetic_vectors(args.chunks, args.dim)
+        rng = np.random.default_rng(1)
+        experience = rng.integers(0, 15, args.chunks)
+        location = rng.integers(0, len(LOCATIONS), args.chunks)
+        ids = [str(i) for i in range(args.chunks)]
+        metadatas = [{"resume_id": str(i // 4), "experience": int(e), "location": LOCATIONS[l]}
+                     for i, (e, l) in enumerate(zip(experience, location))]
+
+        picks = rng.integers(0, args.chunks, args.queries)
+        queries = vectors[picks] + 0.5 * rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        client = chromadb.PersistentClient(path=os.path.join(persist_dir, "chroma"),
+                                           settings=Settings(anonymized_telemetry=False))
+        backends = [("chroma", client.create_collection("bench", metadata={"hnsw:space": "cosine"}))]
+        backends += [(f"flat-{dtype}", FlatIndex(os.path.join(persist_dir, f"flat-{dtype}"), dtype))
+                     for dtype in ("float16", "int8")]
+
+        print(f"{args.chunks} vectors x {args.dim}d, {args.queries} queries, top_k={args.top_k}")
+        for name, collection in backends:
+            start = time.perf_counter()
+            for i in range(0, args.chunks, 5000):
+                collection.add(ids=ids[i:i + 5000], embeddings=vectors[i:i + 5000].tolist(),
+                               metadatas=metadatas[i:i + 5000])
+            print(f"  load {name:<9} {time.perf_counter() - start:8.1f} s")
+
+        filters = (
+            ("unfiltered", None, np.ones(args.chunks, dtype=bool)),
+            ("experience>=5 & location", {"$and": [{"experience": {"$gte": 5}}, {"location": {"$eq": "Pune"}}]},
+             (experience >= 5) & (location == LOCATIONS.index("Pune"))),
+        )
+        for label, where, mask in filters:
+            print(f"{label} ({int(mask.sum())} matching vectors)")
+            truth = exact_top_k(vectors, queries, mask, args.top_k)
+            for name, collection in backends:
+                run(name, collection, queries, where, truth, args.top_k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Point every store at a throwaway directory before `app` is imported."""
+import os
+import tempfile
+import pytest
+
+_data_dir = tempfile.mkdtemp(prefix="talentmatch-tests-")
+os.environ["CHROMA_PERSIST_DIR"] = _data_dir
+os.environ["METADATA_DB_PATH"] = os.path.join(_data_dir, "talentmatch.sqlite3")
+os.environ["UPLOAD_DIR"] = os.path.join(_data_dir, "uploads")
+# In-process index and local embeddings: no Chroma server or API calls
+os.environ["VECTOR_BACKEND"] = "flat"
+os.environ["COLLECTION_NAME"] = "resumes"
+os.environ["EMBEDDING_MODEL"] = "local:hashing-256"
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+
+@pytest.fixture
+def store():
+    """Empty collections and metadata tables, for tests that ingest resumes."""
+    from app import db, vectorstore
+
+    conn = db.get_connection()
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    )]
+    with conn:
+        for table in tables:
+            conn.execute(f"DELETE FROM {table}")
+    # Emptied rather than removed: threads keep connections to their files
+    for collection in list(vectorstore._collections.values()):
+        collection.delete()
+    vectorstore._warned.clear()
@@ -0,0 +1,105 @@
+import pytest
+from app import utils
+from app.utils import chunk_text, count_tokens
+
+MODEL = "local:hashing-256"
+SECTIONS = {"embedding_model": MODEL, "chunk_strategy": "section"}
+BUDGET = 60
+
+
+@pytest.fixture(autouse=True)
+def small_budget(monkeypatch):
+    monkeypatch.setattr(utils, "CHUNK_MAX_TOKENS", BUDGET)
+    monkeypatch.setattr(utils, "CHUNK_MIN_TOKENS", 15)
+    monkeypatch.setattr(utils, "_budgets", {})
+
+
+def _resume():
+    long_line = " ".join(f"delivered{n} platform migration work" for n in range(80))
+    return "\n".join([
+        "Jane Doe", "jane@example.com",
+        "Summary", "Backend engineer focused on data platforms.",
+        "Skills", "Python, Kafka",
+        "Languages", "English",
+        "Experience", "Acme Corp 2019 - 2024", long_line, "Led a team of five.",
+    ])
+
+
+def test_chunks_fit_the_budget():
+    chunks = chunk_text(_resume(), SECTIONS)
+    assert len(chunks) > 3
+    assert all(count_tokens(chunk, MODEL) <= BUDGET for chunk in chunks)
+
+
+def test_split_sections_keep_their_heading():
+    experience = [chunk for chunk in chunk_text(_resume(), SECTIONS) if "delivered" in chunk]
+    assert len(experience) > 1
+    assert all(chunk.startswith("Experience\n") for chunk in experience)
+
+
+def test_small_sections_are_merged():
+    chunks = chunk_text(_resume(), SECTIONS)
+    assert any("Summary\n" in chunk and "Skills\nPython, Kafka" in chunk and "Languages\nEnglish" in chunk
+               for chunk in chunks)
+
+
+def _windows(overlap: int, budget: int, monkeypatch):
+    monkeypatch.setattr(utils, "CHUNK_OVERLAP_TOKENS", overlap)
+    words = [f"word{n:04d}" for n in range(1000)]
+    return words, utils._split_words(" ".join(words), budget, MODEL)
+
+
+def _overlap(previous: str, piece: str) -> int:
+    """Words at the start of `piece` repeated from the end of `previous`."""
+    previous, piece = previous.split(), piece.split()
+    return len(set(previous) & set(piece))
+
+
+def test_word_windows_overlap(monkeypatch):
+    words, pieces = _windows(overlap=10, budget=40, monkeypatch=monkeypatch)
+    assert pieces[0].split()[0] == words[0]
+    assert pieces[-1].split()[-1] == words[-1]
+    assert all(count_tokens(piece, MODEL) <= 40 for piece in pieces)
+    # ~2.5 tokens per word without tiktoken: a 10-token overlap repeats 4 words
+    assert all(1 <= _overlap(a, b) <= 4 for a, b in zip(pieces, pieces[1:]))
+
+
+@pytest.mark.parametrize("overlap", [20, 40, 1000])
+def test_overlap_is_capped_at_half_the_window(monkeypatch, overlap):
+    words, pieces = _windows(overlap=overlap, budget=40, monkeypatch=monkeypatch)
+    per_window = len(pieces[0].split())
+    assert all(_overlap(a, b) <= per_window // 2 for a, b in zip(pieces, pieces[1:]))
+    # Each window moves at least half a window forward
+    assert len(pieces) <= 2 * len(words) / per_window + 2
+
+
+def test_fixed_strategy():
+    text = "x" * 2000
+    chunks = chunk_text(text, {"embedding_model": MODEL, "chunk_strategy": "fixed"})
+    assert [len(chunk) for chunk in chunks] == [800, 800, 600]
+
+
+class _FakeTiktoken:
+    """Counts words; records which model each encoding was asked for."""
+
+    def __init__(self):
+        self.models = []
+
+    def encoding_for_model(self, name):
+        self.models.append(name)
+        return self
+
+    def get_encoding(self, name):
+        return self
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+def test_tokens_are_counted_for_the_generations_model(monkeypatch):
+    fake = _FakeTiktoken()
+    monkeypatch.setattr(utils, "tiktoken", fake)
+    monkeypatch.setattr(utils, "_encodings", {})
+
+    chunk_text(_resume(), {"embedding_model": "text-embedding-3-large@256", "chunk_strategy": "section"})
+    assert set(fake.models) == {"text-embedding-3-large"}
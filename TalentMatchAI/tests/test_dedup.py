@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from app import dedup
+from app.dedup import SHINGLE_SIZE
+
+
+@pytest.fixture(autouse=True)
+def empty_tables():
+    conn = dedup._connection()
+    with conn:
+        conn.executescript("DELETE FROM resume_hashes; DELETE FROM resume_signatures; DELETE FROM lsh_buckets;")
+
+
+def _words(seed: int, count: int):
+    return [f"w{n}" for n in np.random.RandomState(seed).randint(0, 5000, size=count)]
+
+
+def _shingles(words):
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def test_content_hash_ignores_case_and_punctuation():
+    assert dedup.content_hash("Jane Doe -- Python, SQL.") == dedup.content_hash("jane doe\npython sql")
+    assert dedup.content_hash("Jane Doe") != dedup.content_hash("John Doe")
+
+
+def test_short_texts_have_no_signature():
+    assert dedup.minhash_signature("too short to shingle") is None
+
+
+@pytest.mark.parametrize("changed", [10, 60, 150])
+def test_signature_estimates_jaccard(changed):
+    words = _words(1, 400)
+    edited = words[:200] + _words(2, changed) + words[200 + changed:]
+
+    a, b = _shingles(words), _shingles(edited)
+    jaccard = len(a & b) / len(a | b)
+    estimate = float(np.mean(dedup.minhash_signature(" ".join(words)) ==
+                             dedup.minhash_signature(" ".join(edited))))
+    # 128 permutations: standard error ~0.045
+    assert abs(estimate - jaccard) < 0.15
+
+
+def test_near_duplicate_found_through_lsh_buckets():
+    original = " ".join(_words(3, 400))
+    dedup.register(dedup.content_hash(original), "resume-1", dedup.minhash_signature(original))
+    other = " ".join(_words(4, 400))
+    dedup.register(dedup.content_hash(other), "resume-2", dedup.minhash_signature(other))
+
+    words = original.split()
+    lightly_edited = " ".join(words[:100] + ["updated", "phone", "number"] + words[103:])
+    assert dedup.find_near_duplicate(dedup.minhash_signature(lightly_edited)) == "resume-1"
+    assert dedup.find_near_duplicate(dedup.minhash_signature(" ".join(_words(5, 400)))) is None
+    assert dedup.find_near_duplicate(None) is None
+
+
+def test_exact_duplicate_counts_once_indexed():
+    text = " ".join(_words(6, 50))
+    text_hash = dedup.content_hash(text)
+    assert dedup.find_exact(text_hash) is None
+
+    dedup.register(text_hash, "resume-1", dedup.minhash_signature(text))
+    assert dedup.find_exact(text_hash) == ("resume-1", False)
+    dedup.mark_indexed([text_hash])
+    assert dedup.find_exact(text_hash) == ("resume-1", True)
+
+
+def test_registering_a_new_version_replaces_its_buckets():
+    first = " ".join(_words(7, 300))
+    dedup.register(dedup.content_hash(first), "resume-1", dedup.minhash_signature(first))
+    second = " ".join(_words(8, 300))
+    dedup.register(dedup.content_hash(second), "resume-1", dedup.minhash_signature(second))
+
+    assert dedup.find_near_duplicate(dedup.minhash_signature(first)) is None
+    assert dedup.find_near_duplicate(dedup.minhash_signature(second)) == "resume-1"
+
+
+def test_updating_a_resume_forgets_its_previous_version():
+    words = _words(9, 300)
+    first = " ".join(words)
+    second = " ".join(words[:150] + ["new", "role", "added"] + words[150:])
+    for text in (first, second):
+        dedup.register(dedup.content_hash(text), "resume-1", dedup.minhash_signature(text))
+        dedup.mark_indexed([dedup.content_hash(text)])
+
+    assert dedup.find_exact(dedup.content_hash(first)) is None
+    assert dedup.find_exact(dedup.content_hash(second)) == ("resume-1", True)
+    # Re-ingesting the old text is an update of the same resume
+    assert dedup.find_near_duplicate(dedup.minhash_signature(first)) == "resume-1"
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+import pytest
+from app.parser import extraction
+from benchmarks.corpus import write_pdf
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = str(tmp_path / "resume.pdf")
+    write_pdf(path, [f"Marker page{n} end" for n in range(1, 11)])
+    return path
+
+
+def _pages(text: str):
+    return [n for n in range(1, 11) if f"page{n} " in text]
+
+
+@pytest.mark.parametrize("max_pages, per_task, expected", [
+    (2, 5, [1, 2]),     # limit below one task's range
+    (7, 3, list(range(1, 8))),
+    (50, 4, list(range(1, 11))),
+])
+def test_pdf_page_limit(pdf, monkeypatch, max_pages, per_task, expected):
+    monkeypatch.setattr(extraction, "MAX_PDF_PAGES", max_pages)
+    monkeypatch.setattr(extraction, "PDF_PAGES_PER_TASK", per_task)
+    assert _pages(extraction.extract_text(pdf)) == expected
+
+
+def test_workers_do_not_import_metrics():
+    imported = subprocess.run(
+        [sys.executable, "-c", "import sys, app.parser.extraction; print('app.metrics' in sys.modules)"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    assert imported == "False"
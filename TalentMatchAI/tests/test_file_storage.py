@@ -0,0 +1,153 @@
+import hashlib
+import io
+import os
+import pytest
+from app import jobs
+from app.ingestion import ingest_bulk_resumes
+from app.intake import file_storage
+from app.intake.file_storage import UploadRejected, gc, link, lookup, store_bytes, store_stream, verify
+
+PDF = b"%PDF-1.4 resume one"
+
+
+@pytest.fixture
+def uploads(store, tmp_path, monkeypatch):
+    """An empty upload directory for each test."""
+    tmp_dir = tmp_path / "tmp"
+    tmp_dir.mkdir()
+    monkeypatch.setattr(file_storage, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(file_storage, "TMP_DIR", str(tmp_dir))
+    return tmp_path
+
+
+def _age(sha256: str, seconds: float):
+    """Pretend a stored file was written `seconds` ago."""
+    conn = file_storage._connection()
+    with conn:
+        conn.execute("UPDATE upload_files SET created_at = created_at - ? WHERE sha256 = ?", (seconds, sha256))
+
+
+def test_store_stream_is_content_addressed(uploads, monkeypatch):
+    monkeypatch.setattr(file_storage, "UPLOAD_CHUNK_BYTES", 4)
+    stored = store_stream(io.BytesIO(PDF), "Resume.PDF")
+
+    sha256 = hashlib.sha256(PDF).hexdigest()
+    assert stored.sha256 == sha256
+    assert stored.size == len(PDF)
+    assert stored.path == os.path.join(str(uploads), sha256[:2], sha256[2:4], f"{sha256}.pdf")
+    with open(stored.path, "rb") as f:
+        assert f.read() == PDF
+    assert lookup([sha256])[sha256]["original_name"] == "Resume.PDF"
+    # Nothing left behind in the temporary directory
+    assert os.listdir(file_storage.TMP_DIR) == []
+
+
+def test_same_content_is_stored_once(uploads):
+    first = store_bytes(PDF, "a.pdf")
+    assert not first.duplicate
+
+    # Stored but not ingested yet: not a duplicate
+    assert not store_bytes(PDF, "b.pdf").duplicate
+
+    job_id = jobs.create_job("upload", "test", [{"file_path": first.path}])
+    link(first.sha256, job_id, 0)
+    again = store_bytes(PDF, "c.pdf")
+    assert again.duplicate
+    assert (again.path, again.job_id, again.item_index) == (first.path, job_id, 0)
+
+    # A failed item may be uploaded again
+    jobs.update_item(job_id, 0, status="failed")
+    assert not store_bytes(PDF, "d.pdf").duplicate
+
+
+@pytest.mark.parametrize("name", ["resume.txt", "resume", ""])
+def test_unsupported_types_are_rejected(uploads, name):
+    with pytest.raises(UploadRejected):
+        store_bytes(PDF, name)
+
+
+def test_oversized_uploads_leave_nothing_behind(uploads, monkeypatch):
+    monkeypatch.setattr(file_storage, "MAX_UPLOAD_BYTES", 8)
+    monkeypatch.setattr(file_storage, "UPLOAD_CHUNK_BYTES", 4)
+    with pytest.raises(UploadRejected):
+        store_bytes(PDF, "big.pdf")
+    assert os.listdir(file_storage.TMP_DIR) == []
+    assert lookup([hashlib.sha256(PDF).hexdigest()]) == {}
+
+
+def test_verify_finds_missing_and_corrupt_files(uploads):
+    kept = store_bytes(PDF, "kept.pdf")
+    missing = store_bytes(b"%PDF-1.4 resume two", "missing.pdf")
+    corrupt = store_bytes(b"%PDF-1.4 resume three", "corrupt.pdf")
+    os.remove(missing.path)
+    with open(corrupt.path, "ab") as f:
+        f.write(b"tampered")
+
+    assert verify() == {"missing": [missing.sha256], "corrupt": [corrupt.sha256]}
+    assert os.path.exists(corrupt.path)
+
+    verify(fix=True)
+    assert not os.path.exists(corrupt.path)
+    assert set(lookup([kept.sha256, missing.sha256, corrupt.sha256])) == {kept.sha256}
+    assert verify() == {"missing": [], "corrupt": []}
+
+
+def test_gc_removes_orphans(uploads):
+    stored = store_bytes(PDF, "a.pdf")
+    gone = store_bytes(b"%PDF-1.4 resume two", "gone.pdf")
+    os.remove(gone.path)
+
+    orphan = uploads / "ab" / "cd" / "orphan.pdf"
+    orphan.parent.mkdir(parents=True, exist_ok=True)
+    orphan.write_bytes(b"not in the manifest")
+    stale = uploads / "tmp" / "crashed.part"
+    stale.write_bytes(b"partial")
+    os.utime(stale, (0, 0))
+    fresh = uploads / "tmp" / "writing.part"
+    fresh.write_bytes(b"partial")
+    unrelated = uploads / "notes.txt"
+    unrelated.write_bytes(b"not a shard directory")
+
+    assert gc(dry_run=True) == {"rows_removed": 1, "files_removed": 2}
+    assert orphan.exists()
+
+    assert gc() == {"rows_removed": 1, "files_removed": 2}
+    assert not orphan.exists() and not stale.exists()
+    assert fresh.exists() and unrelated.exists()
+    assert os.path.exists(stored.path)
+    assert set(lookup([stored.sha256, gone.sha256])) == {stored.sha256}
+
+
+def test_gc_keeps_linked_files(uploads):
+    linked = store_bytes(PDF, "linked.pdf")
+    failed = store_bytes(b"%PDF-1.4 resume two", "failed.pdf")
+    unlinked = store_bytes(b"%PDF-1.4 resume three", "unlinked.pdf")
+    recent = store_bytes(b"%PDF-1.4 resume four", "recent.pdf")
+
+    job_id = jobs.create_job("upload", "test", [{"file_path": linked.path}, {"file_path": failed.path}])
+    link(linked.sha256, job_id, 0)
+    link(failed.sha256, job_id, 1)
+    jobs.update_item(job_id, 1, status="failed")
+    for stored in (linked, failed, unlinked):
+        _age(stored.sha256, 30 * 86400)
+
+    # Without --unreferenced nothing that exists is touched
+    assert gc() == {"rows_removed": 0, "files_removed": 0}
+
+    assert gc(unreferenced=True) == {"rows_removed": 2, "files_removed": 2}
+    assert os.path.exists(linked.path) and os.path.exists(recent.path)
+    assert not os.path.exists(failed.path) and not os.path.exists(unlinked.path)
+    assert set(lookup([linked.sha256, failed.sha256, unlinked.sha256, recent.sha256])) == \
+        {linked.sha256, recent.sha256}
+
+
+def test_gc_keeps_files_candidates_point_at(uploads):
+    stored = store_bytes(PDF, "indexed.pdf")
+    _age(stored.sha256, 30 * 86400)
+    ingest_bulk_resumes(
+        ["Experience\nPlatform engineer on Kubernetes.\nSkills\nGo, Kubernetes"],
+        [{"experience": 3, "file_path": stored.path}],
+    )
+
+    assert gc(unreferenced=True) == {"rows_removed": 0, "files_removed": 0}
+    assert os.path.exists(stored.path)
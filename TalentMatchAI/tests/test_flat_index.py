@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from app import flat_index
+from app.flat_index import FlatIndex
+
+ROWS, DIM, K = 500, 32, 10
+
+
+@pytest.fixture
+def vectors():
+    return np.random.RandomState(7).normal(size=(ROWS, DIM)).astype(np.float32)
+
+
+@pytest.fixture(params=["float16", "int8"])
+def index(request, tmp_path, vectors, monkeypatch):
+    # Small blocks so queries merge top-k across several of them
+    monkeypatch.setattr(flat_index, "VECTOR_FLAT_BLOCK_ROWS", 64)
+    index = FlatIndex(str(tmp_path / "index"), dtype=request.param)
+    index.upsert(
+        ids=[f"v{i}" for i in range(ROWS)],
+        embeddings=vectors,
+        metadatas=[{"resume_id": f"r{i % 50}", "experience": i % 12} for i in range(ROWS)],
+        documents=[f"doc {i}" for i in range(ROWS)],
+    )
+    return index
+
+
+def _cosine(vectors, queries):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries @ vectors.T
+
+
+def _check_top_k(result, similarities, allowed):
+    """Returned rows are the brute-force top k over `allowed`, up to quantization error."""
+    for column, row_similarities in enumerate(similarities):
+        expected = np.sort(row_similarities[allowed])[::-1][:K]
+        rows = [int(row_id[1:]) for row_id in result["ids"][column]]
+
+        assert len(rows) == K
+        assert set(rows) <= set(allowed.tolist())
+        # Ranked by the index's own scores, which track the exact ones
+        np.testing.assert_allclose(1 - np.asarray(result["distances"][column]), expected, atol=0.02)
+        np.testing.assert_allclose(row_similarities[rows], expected, atol=0.02)
+
+
+def test_query_matches_brute_force(index, vectors):
+    queries = np.random.RandomState(8).normal(size=(5, DIM)).astype(np.float32)
+    result = index.query(queries, n_results=K)
+    _check_top_k(result, _cosine(vectors, queries), np.arange(ROWS))
+
+
+def test_filtered_query_matches_brute_force(index, vectors):
+    queries = np.random.RandomState(9).normal(size=(3, DIM)).astype(np.float32)
+    result = index.query(queries, n_results=K, where={"experience": {"$gte": 9}})
+    allowed = np.flatnonzero(np.arange(ROWS) % 12 >= 9)
+    _check_top_k(result, _cosine(vectors, queries), allowed)
+
+
+def test_query_survives_reopening(index, vectors, tmp_path):
+    queries = vectors[:2]
+    reopened = FlatIndex(str(tmp_path / "index"))
+    assert reopened.count() == ROWS
+    assert reopened.query(queries, n_results=K)["ids"] == index.query(queries, n_results=K)["ids"]
+
+
+def test_get_returns_rows_in_the_order_of_ids(index, vectors):
+    index.delete(ids=["v3"])
+    result = index.get(ids=["v42", "v7", "v3", "missing", "v100", "v7"],
+                       include=["embeddings", "documents", "metadatas"])
+
+    assert result["ids"] == ["v42", "v7", "v100"]
+    assert result["documents"] == ["doc 42", "doc 7", "doc 100"]
+    assert [meta["resume_id"] for meta in result["metadatas"]] == ["r42", "r7", "r0"]
+    expected = vectors[[42, 7, 100]] / np.linalg.norm(vectors[[42, 7, 100]], axis=1, keepdims=True)
+    np.testing.assert_allclose(result["embeddings"], expected, atol=0.01)
+
+
+def test_get_with_where_and_no_ids_is_in_row_order(index):
+    result = index.get(where={"resume_id": "r5"}, include=[])
+    assert result["ids"] == [f"v{i}" for i in range(5, ROWS, 50)]
+
+
+def test_upsert_overwrites_and_delete_hides_rows(index, vectors):
+    index.upsert(ids=["v1"], embeddings=vectors[2:3], metadatas=[{"resume_id": "r2"}])
+    hit = index.query(vectors[2:3], n_results=2)["ids"][0]
+    assert set(hit) == {"v1", "v2"}
+
+    index.delete(where={"resume_id": "r2"})
+    assert index.count() == ROWS - 11
+    assert not set(index.query(vectors[2:3], n_results=K)["ids"][0]) & {"v1", "v2"}
@@ -0,0 +1,52 @@
+from app.candidates import get_texts, list_candidates
+from app import ingestion
+from app.ingestion import ingest_bulk_resumes
+from app.vectorstore import get_collection, get_resume_collection
+
+BASE = ("Experience\nSenior data engineer building Kafka streaming pipelines, Flink jobs and "
+        "warehouse models for a payments company, mentoring four engineers and owning the "
+        "on-call rotation for the ingestion platform across three regions.\n"
+        "Skills\nKafka, Flink, Scala, SQL, Airflow")
+UPDATED = BASE + ", dbt"
+
+
+def _ingest(text: str):
+    return ingest_bulk_resumes([text], [{"experience": 6}])
+
+
+def test_reingesting_an_old_version_is_an_update(store):
+    assert _ingest(BASE)["indexed"] == 1
+    assert _ingest(UPDATED)["updated"] == 1
+    assert _ingest(UPDATED)["duplicates"] == 1
+
+    assert _ingest(BASE)["updated"] == 1
+    (resume_id, _), = list_candidates()
+    assert get_texts([resume_id])[resume_id] == BASE
+
+
+def test_chunks_are_embedded_as_they_are_made(store, monkeypatch):
+    made = []
+    make_chunks = ingestion._iter_chunks
+
+    def counted(entries, generation):
+        for record in make_chunks(entries, generation):
+            made.append(record)
+            yield record
+
+    made_when_embedded = []
+    embed = ingestion.iter_embeddings
+
+    def one_at_a_time(texts, model):
+        for text in texts:
+            made_when_embedded.append(len(made))
+            yield from embed([text], model)
+
+    monkeypatch.setattr(ingestion, "_iter_chunks", counted)
+    monkeypatch.setattr(ingestion, "iter_embeddings", one_at_a_time)
+    resumes = [f"{BASE}\nProject {number}: a ledger migration." for number in range(5)]
+    assert ingest_bulk_resumes(resumes, [{"experience": 6}] * len(resumes))["indexed"] == 5
+
+    # Each chunk was embedded before the next one was made
+    assert made_when_embedded == list(range(1, len(made) + 1))
+    assert get_resume_collection().count() == 5
+    assert get_collection().count() == len(made)
@@ -0,0 +1,249 @@
+import asyncio
+import time
+from email.utils import formatdate
+import httpx
+import openai
+import pytest
+from openai import AsyncOpenAI, OpenAI
+from app import llm_gateway
+from app.llm_gateway import _Bucket, _retry_after
+
+REQUEST = dict(model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}], temperature=0)
+
+
+def _completion(content: str = "ok", headers=None) -> httpx.Response:
+    return httpx.Response(200, headers=headers or {}, json={
+        "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+    })
+
+
+def _error(status: int, headers=None) -> httpx.Response:
+    return httpx.Response(status, headers=headers or {}, json={"error": {"message": "nope"}})
+
+
+class FakeAPI:
+    """Queued responses (the last one repeats), served through httpx's mock transport."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses) or [_completion()]
+        self.requests = 0
+        self.entered = asyncio.Event()
+        self.release = None  # asyncio.Event the next async request waits on
+
+    def _next(self) -> httpx.Response:
+        self.requests += 1
+        return self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        return self._next()
+
+    async def ahandle(self, request: httpx.Request) -> httpx.Response:
+        release, self.release = self.release, None
+        self.entered.set()
+        if release is not None:
+            await release.wait()
+        return self._next()
+
+
+@pytest.fixture
+def api(monkeypatch):
+    fake = FakeAPI()
+    monkeypatch.setattr(llm_gateway, "client", OpenAI(
+        api_key="test", base_url="http://fake/v1", max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(fake.handle)),
+    ))
+
+    state = {}
+
+    def async_state():
+        if not state:
+            state["value"] = (
+                AsyncOpenAI(api_key="test", base_url="http://fake/v1", max_retries=0,
+                            http_client=httpx.AsyncClient(transport=httpx.MockTransport(fake.ahandle))),
+                asyncio.Semaphore(8),
+            )
+        return state["value"]
+
+    monkeypatch.setattr(llm_gateway, "_async_state", async_state)
+    monkeypatch.setattr(llm_gateway, "scheduler", llm_gateway._Scheduler(0, 0))
+    monkeypatch.setattr(llm_gateway, "LLM_MAX_RETRIES", 3)
+    monkeypatch.setattr(llm_gateway, "LLM_RETRY_BASE_SECONDS", 0.001)
+    monkeypatch.setattr(llm_gateway, "LLM_RETRY_MAX_SECONDS", 0.01)
+    return fake
+
+
+# ---------- Headers ----------
+
+def test_retry_after_forms():
+    assert _retry_after(httpx.Headers({"retry-after-ms": "1500", "retry-after": "9"})) == 1.5
+    assert _retry_after(httpx.Headers({"retry-after": "3"})) == 3.0
+    in_ten = _retry_after(httpx.Headers({"retry-after": formatdate(time.time() + 10, usegmt=True)}))
+    assert 8 <= in_ten <= 10
+    assert _retry_after(httpx.Headers({"retry-after": formatdate(time.time() - 10, usegmt=True)})) == 0.0
+    assert _retry_after(httpx.Headers({"retry-after": "soon"})) is None
+    assert _retry_after(httpx.Headers({})) is None
+    assert _retry_after(None) is None
+
+
+def test_bucket_without_limit_never_waits():
+    bucket = _Bucket(0)
+    assert bucket.reserve(10 ** 6, now=0.0) == 0.0
+
+
+def test_bucket_follows_reported_limits():
+    bucket = _Bucket(0)
+    bucket.follow("60", "0", now=0.0)
+    # Empty at 60/minute: one request per second
+    assert bucket.reserve(1, now=0.0) == pytest.approx(1.0)
+    assert bucket.reserve(1, now=0.0) == pytest.approx(2.0)
+    # Refills while time passes
+    assert bucket.reserve(1, now=5.0) == pytest.approx(0.0)
+
+    bucket.follow("60", "2", now=5.0)
+    assert bucket.level == 2
+    bucket.follow("60", "garbage", now=5.0)
+    assert bucket.level == 2
+
+
+def test_bucket_keeps_the_lower_configured_limit():
+    bucket = _Bucket(30)
+    bucket.follow("60", None, now=bucket.updated)
+    assert bucket.capacity == 30
+
+
+def test_scheduler_reads_ratelimit_headers(api):
+    api.responses = [_completion(headers={
+        "x-ratelimit-limit-requests": "120", "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-limit-tokens": "100000", "x-ratelimit-remaining-tokens": "99000",
+    })]
+    llm_gateway.complete("test", **REQUEST)
+
+    buckets = llm_gateway.scheduler.buckets
+    assert buckets["requests"].capacity == 120
+    assert buckets["tokens"].capacity == 100000
+    assert llm_gateway.scheduler.reserve(1) == pytest.approx(0.5, abs=0.05)
+
+
+# ---------- Retries ----------
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_rate_limits_and_server_errors(api, status):
+    api.responses = [_error(status, {"retry-after-ms": "1"}), _error(status), _completion("done")]
+    response = llm_gateway.complete("test", **REQUEST)
+    assert response.choices[0].message.content == "done"
+    assert api.requests == 3
+
+
+def test_rate_limit_pauses_every_caller(api):
+    api.responses = [_error(429, {"retry-after-ms": "5"}), _completion()]
+    llm_gateway.complete("test", **REQUEST)
+    assert llm_gateway.scheduler.paused_until > 0
+
+
+def test_bad_request_is_not_retried(api):
+    api.responses = [_error(400), _completion()]
+    with pytest.raises(openai.BadRequestError):
+        llm_gateway.complete("test", **REQUEST)
+    assert api.requests == 1
+
+
+def test_gives_up_after_max_retries(api):
+    api.responses = [_error(503)]
+    with pytest.raises(openai.InternalServerError):
+        llm_gateway.complete("test", **REQUEST)
+    assert api.requests == llm_gateway.LLM_MAX_RETRIES + 1
+
+
+def test_async_retries(api):
+    api.responses = [_error(429), _completion("done")]
+    response = asyncio.run(llm_gateway.acomplete("test", **REQUEST))
+    assert response.choices[0].message.content == "done"
+    assert api.requests == 2
+
+
+# ---------- Coalescing ----------
+
+async def _start_leader(api):
+    """A leader request that stays in flight until `api.release` is set."""
+    release = api.release = asyncio.Event()
+    api.entered.clear()
+    leader = asyncio.create_task(llm_gateway.acomplete("test", **REQUEST))
+    await api.entered.wait()
+    return leader, release
+
+
+async def _join_followers(count: int):
+    followers = [asyncio.create_task(llm_gateway.acomplete("test", **REQUEST)) for _ in range(count)]
+    for _ in range(5):
+        await asyncio.sleep(0)
+    return followers
+
+
+def test_followers_get_the_leaders_response(api):
+    async def run():
+        leader, release = await _start_leader(api)
+        followers = await _join_followers(2)
+        release.set()
+        return await asyncio.gather(leader, *followers)
+
+    responses = asyncio.run(run())
+    assert api.requests == 1
+    assert all(response is responses[0] for response in responses)
+
+
+def test_followers_get_the_leaders_api_error(api):
+    api.responses = [_error(400)]
+
+    async def run():
+        leader, release = await _start_leader(api)
+        followers = await _join_followers(1)
+        release.set()
+        return await asyncio.gather(leader, *followers, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert api.requests == 1
+    assert all(isinstance(result, openai.BadRequestError) for result in results)
+
+
+def test_cancelled_leader_does_not_cancel_followers(api):
+    api.responses = [_completion("resent")]
+
+    async def run():
+        leader, _ = await _start_leader(api)
+        followers = await _join_followers(2)
+        resend = api.release = asyncio.Event()
+        leader.cancel()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        resend.set()
+        return await asyncio.gather(leader, *followers, return_exceptions=True)
+
+    leader, *followers = asyncio.run(run())
+    assert isinstance(leader, asyncio.CancelledError)
+    # The leader's request never completed; one follower re-sends and the other joins it
+    assert [response.choices[0].message.content for response in followers] == ["resent", "resent"]
+    assert api.requests == 1
+    assert not llm_gateway._inflight
+
+
+def test_cancelled_follower_does_not_cancel_the_request(api):
+    async def run():
+        leader, release = await _start_leader(api)
+        quitter, stayer = await _join_followers(2)
+        quitter.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(leader, quitter, stayer, return_exceptions=True)
+
+    leader, quitter, stayer = asyncio.run(run())
+    assert isinstance(quitter, asyncio.CancelledError)
+    assert stayer is leader
+    assert api.requests == 1
+
+
+def test_coalesce_off_sends_every_request(api):
+    llm_gateway.complete("test", coalesce=False, **REQUEST)
+    llm_gateway.complete("test", coalesce=False, **REQUEST)
+    assert api.requests == 2
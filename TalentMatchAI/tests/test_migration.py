@@ -0,0 +1,139 @@
+import itertools
+import pytest
+from app import migration
+from app.candidates import list_candidates
+from app.ingestion import ingest_bulk_resumes
+from app.models import JobQuery
+from app.vectorstore import active_generation, get_collection, get_resume_collection
+
+RESUMES = [
+    "Experience\nBackend engineer building Django and PostgreSQL services for a logistics "
+    "platform.\nSkills\nPython, Django, PostgreSQL, Celery",
+    "Experience\nData engineer running Kafka and Flink pipelines into a Snowflake "
+    "warehouse.\nSkills\nKafka, Flink, Scala, SQL",
+    "Experience\nFrontend engineer shipping React and TypeScript dashboards with design "
+    "systems.\nSkills\nReact, TypeScript, CSS, Storybook",
+]
+QUERY = JobQuery(job_description="Kafka and Flink streaming data engineer", top_k=3)
+_targets = itertools.count()
+
+
+@pytest.fixture
+def ingested(store, monkeypatch):
+    # Targets are named by the second they start in: keep each test's apart
+    monkeypatch.setattr(migration, "COLLECTION_NAME", f"shadow{next(_targets)}")
+    ingest_bulk_resumes(RESUMES, [{"experience": 5}] * len(RESUMES))
+    return active_generation()
+
+
+def _ready(**kwargs):
+    started = migration.start_migration(queue_build=False, **kwargs)
+    migration.build(started["id"])
+    return migration.get_migration(started["id"])
+
+
+def test_build_fills_the_shadow_generation(ingested):
+    ready = _ready(embedding_model="local:hashing-128", chunk_strategy="fixed")
+    assert ready["status"] == "ready"
+    assert ready["done"] == len(RESUMES)
+
+    shadow = migration.target_generation(ready)
+    assert get_resume_collection(shadow).count() == len(RESUMES)
+    assert get_collection(shadow).count() >= len(RESUMES)
+    # Serving has not moved
+    assert active_generation()["name"] == ingested["name"]
+
+
+def test_only_one_open_migration(ingested):
+    migration.start_migration(queue_build=False)
+    with pytest.raises(ValueError):
+        migration.start_migration(queue_build=False)
+
+
+def test_cutover_and_rollback(ingested):
+    ready = _ready(embedding_model="local:hashing-128")
+
+    active = migration.cutover(ready["id"], queue_job=False)
+    assert active["status"] == "active"
+    assert active["cutover_at"] is not None
+    generation = active_generation()
+    assert generation["name"] == ready["target"]
+    assert generation["embedding_model"] == "local:hashing-128"
+    assert generation["previous"] == ingested["name"]
+
+    # A resume written after the cutover lands in the new generation only...
+    ingest_bulk_resumes(
+        ["Experience\nSite reliability engineer on Kubernetes and Terraform.\nSkills\nKubernetes, Go"],
+        [{"experience": 4}],
+    )
+    assert get_resume_collection().count() == len(RESUMES) + 1
+
+    # ...and rollback catches the old one up before serving it again
+    rolled_back = migration.rollback(queue_job=False)
+    assert rolled_back["status"] == "rolled_back"
+    assert active_generation()["name"] == ingested["name"]
+    assert get_resume_collection().count() == len(RESUMES) + 1
+
+    with pytest.raises(ValueError):
+        migration.rollback(queue_job=False)
+
+
+def test_cutover_needs_a_ready_migration(ingested):
+    started = migration.start_migration(queue_build=False)
+    with pytest.raises(ValueError):
+        migration.cutover(started["id"], queue_job=False)
+    with pytest.raises(KeyError):
+        migration.cutover("missing", queue_job=False)
+
+
+def test_cutover_job(ingested):
+    ready = _ready()
+    queued = migration.cutover(ready["id"])
+    assert queued["status"] == "cutting_over"
+    # Asking again while the job is pending does not queue another
+    assert migration.cutover(ready["id"])["job_id"] == queued["job_id"]
+
+    migration.run_job({"job_id": queued["job_id"], "source": ready["id"]})
+    assert migration.get_migration(ready["id"])["status"] == "active"
+
+
+def test_compare_records_overlap(ingested):
+    # Same model and chunking: the shadow must return what is served
+    ready = _ready()
+    report = migration.compare(ready["id"], queries=[QUERY])
+    assert report["queries"] == 1
+    assert report["mean_overlap"] == 1.0
+
+    recorded = migration.get_migration(ready["id"])
+    assert recorded["compared"] == 1
+    assert recorded["overlap_sum"] == 1.0
+
+
+def test_dual_read_compares_against_the_ready_shadow(ingested, monkeypatch):
+    ready = _ready()
+    served = [{"resume_id": resume_id} for resume_id, _ in list_candidates()[:1]]
+
+    monkeypatch.setattr(migration.threading, "Thread", _InlineThread)
+    monkeypatch.setattr(migration, "MIGRATION_DUAL_READ", True)
+    migration.dual_read(QUERY, served)
+
+    recorded = migration.get_migration(ready["id"])
+    assert recorded["compared"] == 1
+    # One served candidate, found among the shadow's top 3
+    assert recorded["overlap_sum"] == 1.0
+
+
+def test_dual_read_off_by_default(ingested):
+    ready = _ready()
+    migration.dual_read(QUERY, [])
+    assert migration.get_migration(ready["id"])["compared"] == 0
+
+
+class _InlineThread:
+    """Thread stand-in that runs its target on start."""
+
+    def __init__(self, target, args, daemon=None):
+        self.target, self.args = target, args
+
+    def start(self):
+        self.target(*self.args)
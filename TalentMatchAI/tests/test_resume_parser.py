@@ -0,0 +1,83 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import httpx
+import openai
+import pytest
+from app import llm_gateway
+from app.parser import resume_parser
+
+RESUMES = [
+    f"Candidate {n}\ncandidate{n}@example.com\n+1 555 010 {1000 + n}\n\nSkills\nPython, SQL\n"
+    for n in range(4)
+]
+
+
+def _reply(request: dict):
+    prompt = request["messages"][0]["content"]
+    ids = [line.split()[2] for line in prompt.splitlines() if line.startswith("### Resume ")]
+    content = json.dumps({"resumes": [{"id": rid, "name": f"Name {rid}", "location": "Berlin"} for rid in ids]})
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class FlakyAPI:
+    """Structures every batch except the `failing` calls, which raise a connection error."""
+
+    def __init__(self, failing):
+        self.failing = set(failing)
+        self.calls = 0
+
+    def _answer(self, request):
+        call, self.calls = self.calls, self.calls + 1
+        if call in self.failing:
+            raise openai.APIConnectionError(request=httpx.Request("POST", "http://fake/v1"))
+        return _reply(request)
+
+    def complete(self, operation, **request):
+        return self._answer(request)
+
+    async def acomplete(self, operation, **request):
+        return self._answer(request)
+
+
+@pytest.fixture
+def flaky(monkeypatch):
+    def install(*failing):
+        api = FlakyAPI(failing)
+        monkeypatch.setattr(llm_gateway, "complete", api.complete)
+        monkeypatch.setattr(llm_gateway, "acomplete", api.acomplete)
+        return api
+
+    monkeypatch.setattr(resume_parser, "STRUCTURE_BATCH_SIZE", 2)
+    monkeypatch.setattr(resume_parser, "STRUCTURE_CONCURRENCY", 1)
+    monkeypatch.setattr(resume_parser, "STRUCTURE_CACHE_ENABLED", False)
+    return install
+
+
+def _check(results):
+    # The failed first batch keeps its heuristic fields; the second is structured
+    assert [result["email"] for result in results] == [f"candidate{n}@example.com" for n in range(4)]
+    assert all(result["skills"] for result in results)
+    assert [result.get("name") for result in results] == [None, None, "Name r2", "Name r3"]
+
+
+def test_failed_batch_keeps_heuristic_fields(flaky):
+    flaky(0)
+    _check(resume_parser.structure_resumes(RESUMES))
+
+
+def test_failed_batch_keeps_heuristic_fields_async(flaky):
+    flaky(0)
+    _check(asyncio.run(resume_parser.astructure_resumes(RESUMES)))
+
+
+def test_failed_batch_is_not_cached(flaky, monkeypatch):
+    monkeypatch.setattr(resume_parser, "STRUCTURE_CACHE_ENABLED", True)
+    texts = [text + "\nUncached run" for text in RESUMES]
+    flaky(0)
+    resume_parser.structure_resumes(texts)
+
+    api = flaky()
+    results = resume_parser.structure_resumes(texts)
+    assert api.calls == 1
+    assert [result["name"] for result in results] == ["Name r0", "Name r1", "Name r2", "Name r3"]
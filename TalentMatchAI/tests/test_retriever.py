@@ -0,0 +1,36 @@
+import pytest
+from app import retriever
+from app.candidates import list_candidates
+from app.ingestion import ingest_bulk_resumes
+from app.models import JobQuery
+from app.vectorstore import get_resume_collection
+
+RESUMES = {
+    "kafka": "Experience\nBuilt Kafka streaming pipelines and Flink jobs for payments.\n"
+             "Skills\nKafka, Flink, Scala",
+    "react": "Experience\nBuilt React dashboards and design systems in TypeScript.\n"
+             "Skills\nReact, TypeScript, CSS",
+    "ml": "Experience\nTrained PyTorch ranking models and feature pipelines.\n"
+          "Skills\nPyTorch, Python, Spark",
+}
+
+
+@pytest.fixture
+def indexed(store):
+    ingest_bulk_resumes(list(RESUMES.values()), [{"name": name, "experience": 5} for name in RESUMES])
+    return {meta["name"]: resume_id for resume_id, meta in list_candidates()}
+
+
+def _search(text: str):
+    return [c["resume_id"] for c in retriever.retrieve_candidates(JobQuery(job_description=text, top_k=3))]
+
+
+def test_shortlist_path_when_every_resume_has_a_vector(indexed, monkeypatch):
+    monkeypatch.setattr(retriever, "_chunk_search", None)  # must not be used
+    assert _search("Kafka Flink streaming pipelines")[0] == indexed["kafka"]
+
+
+def test_resumes_without_a_pooled_vector_are_still_found(indexed):
+    # A partial backfill: one resume has chunks but no resume-level vector
+    get_resume_collection().delete(ids=[indexed["kafka"]])
+    assert _search("Kafka Flink streaming pipelines")[0] == indexed["kafka"]
@@ -0,0 +1,49 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app import main
+from app.ingestion import ingest_bulk_resumes
+
+RESUMES = [
+    "Experience\nBuilt Kafka streaming pipelines for payments.\nSkills\nKafka, Flink",
+    "Experience\nBuilt React dashboards in TypeScript.\nSkills\nReact, TypeScript",
+]
+QUERY = {"job_description": "Kafka streaming engineer", "top_k": 2}
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    ingest_bulk_resumes(RESUMES, [{"candidate_name": "A", "experience": 3}, {"candidate_name": "B", "experience": 3}])
+
+    async def fake_scores(candidates, job_description):
+        for candidate in candidates:
+            yield {"resume_id": candidate["resume_id"], "score": 50, "strengths": [], "gaps": []}
+
+    dual_reads = []
+    monkeypatch.setattr(main, "iter_scores", fake_scores)
+    monkeypatch.setattr(main.migration, "dual_read", lambda query, served: dual_reads.append(served))
+    client = TestClient(main.app)
+    client.dual_reads = dual_reads
+    return client
+
+
+def _events(client):
+    response = client.post("/search/stream", json=QUERY)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_stream_previews_candidates_then_scores(client):
+    events = _events(client)
+    assert [e["event"] for e in events] == ["candidates", "score", "score", "done"]
+    for preview in events[0]["candidates"]:
+        assert set(preview) == {"resume_id", "name", "score", "metadata"}
+    assert len(events[-1]["scored_results"]) == 2
+    assert len(client.dual_reads) == 1
+
+
+def test_cached_stream_sends_only_done(client):
+    first = _events(client)
+    again = _events(client)
+    assert again == [first[-1]]
+    assert len(client.dual_reads) == 1
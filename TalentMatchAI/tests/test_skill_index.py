@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from app import skill_index
+
+
+@pytest.fixture(autouse=True)
+def empty_tables():
+    conn = skill_index._connection()
+    with conn:
+        conn.executescript("DELETE FROM resume_ordinals; DELETE FROM resume_skills; DELETE FROM skill_bitmaps;")
+
+
+def test_skills_are_normalized():
+    assert skill_index.parse_skills("Python,  K8s , golang,,") == {"python", "kubernetes", "go"}
+    assert skill_index.parse_skills(["Node", "ReactJS", "  machine   learning "]) == {
+        "node.js", "react", "machine learning"
+    }
+    assert skill_index.parse_skills(None) == set()
+
+
+def test_match_requires_every_skill():
+    skill_index.index_skills([
+        ("r1", ["Python", "k8s"]),
+        ("r2", "python, Go"),
+        ("r3", ["golang", "Kafka"]),
+    ])
+    assert sorted(skill_index.match_resumes(["python"])) == ["r1", "r2"]
+    assert skill_index.match_resumes(["Go", "kafka"]) == ["r3"]
+    assert skill_index.match_resumes(["kubernetes", "Python"]) == ["r1"]
+    assert skill_index.match_resumes(["python", "kafka"]) == []
+    assert skill_index.match_resumes(["cobol"]) == []
+    assert skill_index.match_resumes([]) == []
+
+
+def test_reindexing_a_resume_clears_its_old_skills():
+    skill_index.index_skills([("r1", ["python", "sql"]), ("r2", ["python"])])
+    skill_index.index_skills([("r1", ["go"])])
+
+    assert skill_index.match_resumes(["python"]) == ["r2"]
+    assert skill_index.match_resumes(["sql"]) == []
+    assert skill_index.match_resumes(["go"]) == ["r1"]
+    assert skill_index.resume_skills(["r1", "r2"]) == {"r1": {"go"}, "r2": {"python"}}
+
+
+def test_bitmaps_match_brute_force():
+    # Enough resumes that bitmaps span many bytes and queries many SQL batches
+    rng = np.random.RandomState(11)
+    skills = [f"skill{n}" for n in range(12)]
+    resumes = {
+        f"r{i}": {skills[n] for n in np.flatnonzero(rng.random_sample(len(skills)) < 0.4)}
+        for i in range(2000)
+    }
+    skill_index.index_skills(resumes.items())
+
+    for query in (skills[:1], skills[:2], skills[3:6], [skills[0], skills[11]]):
+        expected = sorted(rid for rid, owned in resumes.items() if set(query) <= owned)
+        assert sorted(skill_index.match_resumes(query)) == expected